@@ -1,7 +1,7 @@
 #version 330
 
-in vec3 position;
-in vec3 normal;
+layout(location = 0) in vec3 position;
+layout(location = 2) in vec3 normal;
 
 uniform mat4 u_model = mat4(1.0);
 uniform mat4 u_view = mat4(1.0);
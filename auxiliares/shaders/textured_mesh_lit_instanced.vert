@@ -0,0 +1,29 @@
+#version 330
+
+// Mismas ubicaciones que textured_mesh_lit.vert, para poder reutilizar sus VAO
+layout(location = 0) in vec3 position;
+layout(location = 1) in vec2 texCoord;
+layout(location = 2) in vec3 normal;
+
+// Matriz de modelo por instancia, una columna por atributo
+layout(location = 4) in vec4 a_model0;
+layout(location = 5) in vec4 a_model1;
+layout(location = 6) in vec4 a_model2;
+layout(location = 7) in vec4 a_model3;
+
+uniform mat4 u_view = mat4(1.0);
+uniform mat4 u_projection = mat4(1.0);
+
+out vec3 fragPos;
+out vec2 fragTexCoord;
+out vec3 fragNormal;
+
+void main()
+{
+    mat4 model = mat4(a_model0, a_model1, a_model2, a_model3);
+    fragPos = vec3(model * vec4(position, 1.0f));
+    fragTexCoord = texCoord;
+    fragNormal = mat3(transpose(inverse(model))) * normal;
+    
+    gl_Position = u_projection * u_view * model * vec4(position, 1.0f);
+}
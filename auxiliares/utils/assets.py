@@ -0,0 +1,90 @@
+import os
+import threading
+from collections import OrderedDict
+
+class AssetManager():
+    """
+    Caché de recursos compartida por todo el proceso.
+
+    - La caché de CPU guarda datos ya leídos (meshes, imágenes decodificadas)
+      y descarta el menos usado cuando supera max_entries.
+    - Los recursos de GPU (texturas) se comparten con conteo de referencias
+      y se liberan cuando nadie los usa.
+
+    Las llaves incluyen la ruta canónica y la fecha de modificación del
+    archivo, así un archivo modificado se vuelve a cargar.
+
+    get se puede llamar desde varios hilos (ver auxiliares.utils.async_loader);
+    acquire y release crean recursos de OpenGL y van solo en el hilo de dibujo.
+    """
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.cpu_cache = OrderedDict()
+        self.gpu_resources = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "gpu_hits": 0,
+            "gpu_misses": 0,
+            "gpu_releases": 0 }
+
+    @staticmethod
+    def key(path, *extra):
+        path = os.path.realpath(path)
+        return (path, os.path.getmtime(path)) + extra
+
+    def get(self, key, load):
+        """Devuelve el dato guardado con key, o lo carga con load() si no está"""
+        with self._lock:
+            if key in self.cpu_cache:
+                self.cpu_cache.move_to_end(key)
+                self.stats["hits"] += 1
+                return self.cpu_cache[key]
+            self.stats["misses"] += 1
+
+        # La carga va fuera del lock para que otros hilos no esperen
+        value = load()
+
+        with self._lock:
+            # Otro hilo pudo cargar lo mismo mientras tanto; se conserva el primero
+            value = self.cpu_cache.setdefault(key, value)
+            self.cpu_cache.move_to_end(key)
+            while len(self.cpu_cache) > self.max_entries:
+                self.cpu_cache.popitem(last=False)
+                self.stats["evictions"] += 1
+        return value
+
+    def acquire(self, key, create, destroy):
+        """
+        Devuelve el recurso de GPU asociado a key, creándolo con create() la
+        primera vez. destroy(recurso) se llama cuando se libera la última referencia
+        """
+        entry = self.gpu_resources.get(key)
+        if entry is not None:
+            entry[1] += 1
+            self.stats["gpu_hits"] += 1
+            return entry[0]
+
+        self.stats["gpu_misses"] += 1
+        resource = create()
+        self.gpu_resources[key] = [resource, 1, destroy]
+        return resource
+
+    def release(self, key):
+        entry = self.gpu_resources.get(key)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self.gpu_resources[key]
+            entry[2](entry[0])
+            self.stats["gpu_releases"] += 1
+
+    def clear(self):
+        with self._lock:
+            self.cpu_cache.clear()
+
+# Instancia compartida por helpers.mesh_from_file y drawables.Texture
+asset_manager = AssetManager()
@@ -0,0 +1,235 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from OpenGL.GL import GL_TRIANGLES, GL_TEXTURE_2D, glBindTexture
+from auxiliares.utils.assets import asset_manager
+from auxiliares.utils.drawables import Texture, load_image
+from auxiliares.utils.helpers import load_mesh_data, upload_mesh_data
+
+class PendingAsset():
+    """
+    Recurso que se está cargando en otro hilo. Se completa en
+    AsyncLoader.process_uploads, en el hilo de OpenGL
+    """
+    def __init__(self, future, key):
+        self.future = future
+        self.key = key
+        self.ready = False
+        self._callbacks = []
+
+    def add_done_callback(self, callback):
+        """callback(asset) se llama en el hilo de OpenGL cuando el recurso ya está en GPU"""
+        if self.ready:
+            callback(self)
+        else:
+            self._callbacks.append(callback)
+
+    def _finish(self):
+        self.ready = True
+        for callback in self._callbacks:
+            callback(self)
+        self._callbacks = []
+
+class PendingModel(PendingAsset):
+    """
+    Reemplaza a un Model mientras se carga. Se puede agregar a un SceneGraph
+    de inmediato: dibuja proxy (o nada, si es None) hasta que llega el mesh
+    real, y entonces dibuja este sin recompilar el grafo.
+    """
+    def __init__(self, future, key, index=0, proxy=None):
+        super().__init__(future, key)
+        self.index = index
+        self.proxy = proxy
+        self.model = None
+        self.texture = None
+        self.id = None
+        self.reload = None
+        self._pipelines = []
+
+    @property
+    def current(self):
+        return self.model if self.model is not None else self.proxy
+
+    @property
+    def bounds(self):
+        # Cambian cuando llega el mesh real; el SceneGraph se entera con add_done_callback
+        current = self.current
+        return getattr(current, "bounds", None)
+
+    def init_gpu_data(self, pipeline):
+        self._pipelines.append(pipeline)
+        current = self.current
+        if current is not None:
+            current.init_gpu_data(pipeline)
+
+    def release(self, pipeline=None):
+        if pipeline is None and self._pipelines:
+            pipeline = self._pipelines[-1]
+        if pipeline in self._pipelines:
+            self._pipelines.remove(pipeline)
+        current = self.current
+        if current is not None:
+            current.release(pipeline)
+
+    @property
+    def lods(self):
+        return getattr(self.current, "lods", [])
+
+    @property
+    def lod_screen_sizes(self):
+        return getattr(self.current, "lod_screen_sizes", [])
+
+    def lod(self, level):
+        current = self.current
+        return current.lod(level) if level > 0 else self
+
+    def draw(self, mode=GL_TRIANGLES, cull_face=True, pipeline=None):
+        current = self.current
+        if current is not None:
+            current.draw(mode, cull_face, pipeline)
+
+    def draw_instanced(self, instances, mode=GL_TRIANGLES, cull_face=True, pipeline=None):
+        current = self.current
+        if current is not None:
+            current.draw_instanced(instances, mode, cull_face, pipeline)
+
+    def _upload(self, mesh_list):
+        item = mesh_list[self.index]
+        model = item["mesh"]
+        for pipeline in self._pipelines:
+            model.init_gpu_data(pipeline)
+            if self.proxy is not None:
+                self.proxy.release(pipeline)
+
+        self.id = item["id"]
+        self.texture = item["texture"]
+        self.model = model
+        self.proxy = None
+        self._finish()
+
+class PendingTexture(PendingAsset):
+    """Reemplaza a una Texture mientras se decodifica la imagen; usa proxy mientras tanto"""
+    def __init__(self, future, key, path, params, proxy=None):
+        super().__init__(future, key)
+        self.path = path
+        self.params = params
+        self.proxy = proxy
+        self.result = None
+
+    @property
+    def texture(self):
+        current = self.result if self.result is not None else self.proxy
+        return current.texture if current is not None else 0
+
+    def bind(self):
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+
+    def unbind(self):
+        glBindTexture(GL_TEXTURE_2D, 0)
+
+    def release(self):
+        if self.result is not None:
+            self.result.release()
+            self.result = None
+
+    def _upload(self):
+        # La imagen ya está en la caché de CPU, Texture solo la sube a la GPU
+        self.result = Texture(self.path, **self.params)
+        self._finish()
+
+class AsyncLoader():
+    """
+    Carga de assets en paralelo. La lectura de archivos, el decodificado y la
+    normalización corren en un pool de hilos; la subida a la GPU ocurre en
+    process_uploads, que se llama una vez por frame desde el hilo de OpenGL y
+    sube como máximo upload_budget assets, para no trabar el frame.
+
+    load_mesh y load_texture retornan de inmediato un PendingModel o
+    PendingTexture, que se pueden usar en el SceneGraph como un Model o una
+    Texture cualquiera.
+    """
+    def __init__(self, max_workers=4, upload_budget=2):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="asset_loader")
+        self.upload_budget = upload_budget
+        self.pending = deque()
+        self._futures = {}
+        self.stats = {
+            "requested": 0,
+            "uploaded": 0 }
+
+    def _submit(self, key, load):
+        # Varias peticiones del mismo archivo comparten la carga
+        future = self._futures.get(key)
+        if future is None:
+            future = self.executor.submit(load)
+            self._futures[key] = future
+        self.stats["requested"] += 1
+        return future
+
+    def load_mesh(self, path, index=0, proxy=None, cache=False, lods=0):
+        """Carga el submesh index de path, como mesh_from_file(path, cache, lods)[index]["mesh"]"""
+        path = str(path)
+        key = asset_manager.key(path, "mesh", lods)
+
+        def load():
+            if key in asset_manager.cpu_cache:
+                return None
+            return load_mesh_data(path, cache, lods)
+        # Si la caché se vació mientras tanto, se carga en el hilo de OpenGL
+        reload = lambda: load_mesh_data(path, cache, lods)
+
+        pending = PendingModel(self._submit(key, load), key, index, proxy)
+        pending.reload = reload
+        self.pending.append(pending)
+        return pending
+
+    def load_texture(self, path, proxy=None, **params):
+        """params son los argumentos de Texture (sWrapMode, minFilterMode, ...)"""
+        path = str(path)
+        key = asset_manager.key(path)
+        future = self._submit(key, lambda: asset_manager.get(key, lambda: load_image(path)))
+        pending = PendingTexture(future, key, path, params, proxy)
+        self.pending.append(pending)
+        return pending
+
+    def _upload(self, pending):
+        # result() vuelve a lanzar la excepción del hilo que cargó, si la hubo
+        data = pending.future.result()
+        self._futures.pop(pending.key, None)
+
+        if isinstance(pending, PendingModel):
+            mesh_list = asset_manager.get(
+                pending.key,
+                lambda: upload_mesh_data(data if data is not None else pending.reload()))
+            pending._upload(mesh_list)
+        else:
+            pending._upload()
+        self.stats["uploaded"] += 1
+
+    def process_uploads(self, budget=None):
+        """
+        Sube a la GPU hasta budget assets ya cargados, en el orden en que se
+        pidieron. Retorna cuántos se subieron.
+        """
+        budget = self.upload_budget if budget is None else budget
+        waiting = deque()
+        uploaded = 0
+
+        while self.pending and uploaded < budget:
+            pending = self.pending.popleft()
+            if not pending.future.done():
+                waiting.append(pending)
+                continue
+            self._upload(pending)
+            uploaded += 1
+
+        waiting.extend(self.pending)
+        self.pending = waiting
+        return uploaded
+
+    def finish(self):
+        """Espera y sube todo lo pendiente, p. ej. antes del primer frame o sin ventana"""
+        while self.pending:
+            self._upload(self.pending.popleft())
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
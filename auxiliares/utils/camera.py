@@ -1,5 +1,6 @@
 import numpy as np
 import grafica.transformations as tr
+from grafica.frustum import frustumPlanes
 
 WIDTH = 640
 HEIGHT = 640
@@ -28,6 +29,12 @@ class Camera():
             perspective_matrix = tr.ortho(-(self.width/self.height) * depth, (self.width/self.height) * depth, -1 * depth, 1 * depth, 0.01, 100)
         return np.reshape(perspective_matrix, (16, 1), order="F")
     
+    def get_frustum(self):
+        """Planos (6, 4) del volumen visible, ver grafica.frustum.frustumPlanes"""
+        view = np.reshape(self.get_view(), (4, 4), order="F")
+        projection = np.reshape(self.get_projection(), (4, 4), order="F")
+        return frustumPlanes(projection @ view)
+
     def resize(self, width, height):
         self.width = width
         self.height = height
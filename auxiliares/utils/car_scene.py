@@ -0,0 +1,177 @@
+import copy
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from Box2D import b2World
+
+# Descripción de una escena física: solo datos (listas, tuplas y números),
+# así se puede copiar, modificar y enviar a otros procesos. Cada cuerpo tiene
+# "box" (medio ancho y medio largo) o "circle" (radio).
+def wall(name, position, box):
+    return {"name": name, "position": position, "box": box, "density": 1, "friction": 1}
+
+def car(name, position, density=1, angle=0):
+    return {"name": name, "position": position, "angle": angle, "box": (0.5, 0.5),
+            "density": density, "friction": 1, "linear_damping": 0.75, "angular_damping": 0.5}
+
+TAREA3_SCENE = {
+    "gravity": (0, 0),
+    "static": [
+        wall("wall1", (-20, 0), (0.5, 20)),
+        wall("wall2", (20, 0), (0.5, 20)),
+        wall("wall3", (0, -20), (20, 0.5)),
+        wall("wall4", (0, 20), (20, 0.5)),
+        # No interactúa con otros objetos en la simulación física, solo detecta colisiones
+        {"name": "winzone", "position": (0, 8), "circle": 1, "density": 1, "friction": 1, "sensor": True}],
+    "dynamic": [
+        car("car_0", (2, 0)),
+        car("car_1", (-2, 0), density=4),
+        car("car_2", (0, -2)),
+        car("car_3", (0, 2))],
+    # Fuerza y torque que aplican los controles (W/S y A/D) al cuerpo controlado
+    "control": {"body": "car_0", "force": 1.0, "torque": 0.5},
+    "vel_iters": 6,
+    "pos_iters": 2 }
+
+DEMO_FISICAS_SCENE = {
+    "gravity": (0, 0),
+    "static": [
+        wall("wall1", (-10, 0), (0.5, 10)),
+        wall("wall2", (10, 0), (0.5, 10)),
+        wall("wall3", (0, -10), (10, 0.5)),
+        wall("wall4", (0, 10), (10, 0.5)),
+        {"name": "winzone", "position": (0, 8), "circle": 1, "density": 1, "friction": 1, "sensor": True}],
+    "dynamic": [
+        {"name": "zorzal", "position": (0, -5), "box": (0.5, 0.5), "density": 1, "friction": 1},
+        {"name": "box", "position": (-2, -2), "box": (0.5, 0.5), "density": 1, "friction": 1},
+        {"name": "pyramid", "position": (2, -2), "box": (0.5, 0.5), "density": 1, "friction": 1},
+        {"name": "danger", "position": (0, 5), "circle": 0.5, "density": 100, "friction": 1}],
+    "control": {"body": "zorzal", "force": 1.0, "torque": 0.5},
+    "vel_iters": 6,
+    "pos_iters": 2 }
+
+# Columnas de cada estado en las trayectorias
+STATE_COLUMNS = ("x", "y", "angle", "vx", "vy", "angular_velocity")
+
+def create_body(world, description, dynamic):
+    params = {"position": description["position"], "angle": description.get("angle", 0)}
+    if dynamic:
+        params["linearDamping"] = description.get("linear_damping", 0)
+        params["angularDamping"] = description.get("angular_damping", 0)
+        body = world.CreateDynamicBody(**params)
+    else:
+        body = world.CreateStaticBody(**params)
+
+    if "circle" in description:
+        fixture = body.CreateCircleFixture(radius=description["circle"], density=description["density"], friction=description["friction"])
+    else:
+        fixture = body.CreatePolygonFixture(box=description["box"], density=description["density"], friction=description["friction"])
+    fixture.sensor = description.get("sensor", False)
+    return body
+
+def build_world(scene):
+    """Crea el b2World de la escena. Retorna (world, bodies), con bodies un diccionario nombre -> cuerpo"""
+    world = b2World(gravity=scene["gravity"])
+    bodies = {}
+    for description in scene["static"]:
+        bodies[description["name"]] = create_body(world, description, False)
+    for description in scene["dynamic"]:
+        bodies[description["name"]] = create_body(world, description, True)
+    return world, bodies
+
+def apply_controls(body, throttle, steer, control):
+    """
+    Lo mismo que hacen las teclas: throttle 1 es W, -1 es S; steer -1 es A y
+    1 es D. Valores intermedios escalan la fuerza y el torque
+    """
+    if steer != 0:
+        body.ApplyTorque(control["torque"] * steer, True)
+    if throttle != 0:
+        forward = (np.sin(-body.angle), np.cos(-body.angle))
+        force = control["force"] * throttle
+        body.ApplyForce((force * forward[0], force * forward[1]), body.worldCenter, True)
+
+def step_world(world, scene, dt):
+    world.Step(dt, scene["vel_iters"], scene["pos_iters"])
+    world.ClearForces()
+
+def with_params(scene, bodies=None, **params):
+    """
+    Copia de scene con params cambiados. force y torque cambian los controles;
+    el resto (density, linear_damping, angular_damping, friction, ...) se
+    cambia en los cuerpos dinámicos de nombre en bodies, o en todos
+    """
+    scene = copy.deepcopy(scene)
+    for key in ("force", "torque"):
+        if key in params:
+            scene["control"][key] = params.pop(key)
+    for description in scene["dynamic"]:
+        if bodies is None or description["name"] in bodies:
+            description.update(params)
+    return scene
+
+def simulate(scene, controls, dt=1/60):
+    """
+    Simula scene sin ventana. controls es un arreglo (pasos, 2) con
+    (throttle, steer) del cuerpo controlado en cada paso.
+
+    Retorna un arreglo (pasos + 1, cuerpos dinámicos, 6) con el estado
+    inicial y el de después de cada paso; las columnas son STATE_COLUMNS
+    """
+    controls = np.asarray(controls, dtype=np.float64).reshape(-1, 2)
+    world, bodies = build_world(scene)
+    dynamic = [bodies[description["name"]] for description in scene["dynamic"]]
+    controlled = bodies[scene["control"]["body"]]
+
+    trajectory = np.empty((len(controls) + 1, len(dynamic), len(STATE_COLUMNS)))
+
+    def record(row):
+        for i, body in enumerate(dynamic):
+            position = body.position
+            velocity = body.linearVelocity
+            row[i] = (position[0], position[1], body.angle, velocity[0], velocity[1], body.angularVelocity)
+
+    record(trajectory[0])
+    for step, (throttle, steer) in enumerate(controls):
+        apply_controls(controlled, throttle, steer, scene["control"])
+        step_world(world, scene, dt)
+        record(trajectory[step + 1])
+    return trajectory
+
+def _simulate_args(args):
+    return simulate(*args)
+
+def run_batch(scenes, controls, dt=1/60, processes=None):
+    """
+    Simula cada escena de scenes en un proceso distinto (cada una con su
+    propio b2World). controls puede ser un arreglo para todas o uno por
+    escena. Retorna (trayectorias, segundos): un arreglo (escenas, pasos + 1,
+    cuerpos, 6) si todas las escenas tienen los mismos cuerpos, si no una lista
+    """
+    scenes = list(scenes)
+    if np.ndim(controls) == 2:
+        controls = [controls] * len(scenes)
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        trajectories = list(executor.map(_simulate_args, [(scene, control, dt) for scene, control in zip(scenes, controls)]))
+    elapsed = time.perf_counter() - start
+
+    if len({trajectory.shape for trajectory in trajectories}) == 1:
+        trajectories = np.stack(trajectories)
+    return trajectories, elapsed
+
+def parameter_sweep(scene, controls, bodies=None, dt=1/60, processes=None, **values):
+    """
+    Prueba todas las combinaciones de los valores dados, p. ej.
+    parameter_sweep(TAREA3_SCENE, controls, linear_damping=[0.5, 1], torque=[0.5, 1]).
+    Retorna (combinaciones, trayectorias, segundos), con combinaciones una
+    lista de diccionarios en el mismo orden que las trayectorias
+    """
+    names = list(values)
+    grids = np.meshgrid(*[np.asarray(values[name]) for name in names], indexing="ij")
+    combinations = [dict(zip(names, (float(grid.flat[i]) for grid in grids))) for i in range(grids[0].size)] if names else [{}]
+
+    scenes = [with_params(scene, bodies, **combination) for combination in combinations]
+    trajectories, elapsed = run_batch(scenes, controls, dt, processes)
+    return combinations, trajectories, elapsed
@@ -11,6 +11,40 @@ class Collider:
     def detect_collision(self, other):
         return False
 
+    def bounds(self):
+        """Caja alineada a los ejes que contiene al collider, para la fase amplia"""
+        return np.full(3, np.inf), np.full(3, -np.inf)
+
+    def sweep(self, other, velocity, other_velocity=(0, 0, 0), dt=1.0):
+        """
+        Detección continua: si este collider, moviéndose con velocity, choca
+        con other (que se mueve con other_velocity) durante dt, retorna
+        (toi, normal) con el tiempo del primer contacto y la normal que
+        apunta hacia este collider. Si no chocan retorna None
+        """
+        velocity = np.asarray(velocity, dtype=np.float64)[None]
+        other_velocity = np.asarray(other_velocity, dtype=np.float64)[None]
+
+        if self.type == "Sphere" and other.type == "Sphere":
+            toi, normal = sweep_sphere_sphere(self.center[None], velocity, self.radius,
+                                              other.center[None], other_velocity, other.radius, dt)
+        elif self.type == "Sphere" and other.type == "AABB":
+            toi, normal = sweep_sphere_aabb(self.center[None], velocity, self.radius,
+                                            other.min[None], other.max[None], other_velocity, dt)
+        elif self.type == "AABB" and other.type == "Sphere":
+            toi, normal = sweep_sphere_aabb(other.center[None], other_velocity, other.radius,
+                                            self.min[None], self.max[None], velocity, dt)
+            normal = -normal
+        elif self.type == "AABB" and other.type == "AABB":
+            toi, normal = sweep_aabb_aabb(self.min[None], self.max[None], velocity,
+                                          other.min[None], other.max[None], other_velocity, dt)
+        else:
+            return None
+
+        if not np.isfinite(toi[0]):
+            return None
+        return toi[0], normal[0]
+
 
 class AABB(Collider):
     def __init__(self, name, min, max):
@@ -26,6 +60,9 @@ class AABB(Collider):
             return
         self.min = np.array(position) + self.minSize
         self.max = np.array(position) + self.maxSize
+
+    def bounds(self):
+        return self.min, self.max
     
     def detect_collision(self, other):
         if other.type == "AABB":
@@ -51,6 +88,9 @@ class Sphere(Collider):
         if (position is None) or (len(position) != 3):
             return
         self.center = np.array(position)
+
+    def bounds(self):
+        return self.center - self.radius, self.center + self.radius
     
     def detect_collision(self, other):
         if other.type == "Sphere":
@@ -64,32 +104,449 @@ class Sphere(Collider):
             return False
 
 
+def sweep_and_prune(mins, maxs):
+    """
+    Fase amplia. mins y maxs son arreglos (N, 3) con las cajas de cada
+    collider; retorna dos arreglos de índices (a, b), con a < b, de todos
+    los pares cuyas cajas se intersectan.
+
+    Se ordenan las cajas por su mínimo en el eje con más dispersión; cada
+    caja solo puede tocar a las que empiezan antes de que ella termine, lo
+    que se encuentra con searchsorted sin comparar todos los pares.
+    """
+    count = len(mins)
+    if count < 2:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+
+    axis = int(np.argmax(np.var(mins + maxs, axis=0)))
+    order = np.argsort(mins[:, axis], kind="stable")
+    sorted_min = mins[order, axis]
+    sorted_max = maxs[order, axis]
+
+    # Las cajas i + 1 .. ends[i] - 1 empiezan antes de que termine la caja i
+    ends = np.searchsorted(sorted_min, sorted_max, side="right")
+    counts = np.maximum(ends - np.arange(1, count + 1), 0)
+    first = np.repeat(np.arange(count), counts)
+    offsets = np.arange(len(first)) - np.repeat(np.cumsum(counts) - counts, counts)
+    second = first + 1 + offsets
+
+    a = order[first]
+    b = order[second]
+    overlap = np.all((mins[a] <= maxs[b]) & (maxs[a] >= mins[b]), axis=1)
+    a, b = a[overlap], b[overlap]
+    swap = a > b
+    a[swap], b[swap] = b[swap], a[swap]
+    return a, b
+
+
+def sphere_sphere(center_a, radius_a, center_b, radius_b):
+    """Versión vectorizada de Sphere.detect_collision entre esferas"""
+    distance = center_a - center_b
+    return np.einsum("ij,ij->i", distance, distance) <= (radius_a + radius_b) ** 2
+
+
+def sphere_aabb(center, radius, min, max):
+    """Versión vectorizada de Sphere.detect_collision con una AABB"""
+    distance = np.linalg.norm(center - np.maximum(min, np.minimum(center, max)), axis=1)
+    return distance <= radius
+
+
+def aabb_aabb(min_a, max_a, min_b, max_b):
+    """Versión vectorizada de AABB.detect_collision entre cajas"""
+    return np.all((min_a <= max_b) & (max_a >= min_b), axis=1)
+
+
+def _first_contact(distance, velocity, radius):
+    """
+    Menor t >= 0 tal que |distance + velocity * t| <= radius, por fila.
+    0 si ya se cumple en t = 0 e inf si nunca se cumple
+    """
+    a = np.einsum("ij,ij->i", velocity, velocity)
+    b = 2.0 * np.einsum("ij,ij->i", distance, velocity)
+    c = np.einsum("ij,ij->i", distance, distance) - radius ** 2
+    discriminant = b ** 2 - 4.0 * a * c
+
+    hit = (discriminant >= 0) & (a > 0) & (b < 0)
+    t = np.full(len(a), np.inf)
+    t[hit] = (-b[hit] - np.sqrt(discriminant[hit])) / (2.0 * a[hit])
+    t[c <= 0] = 0.0
+    return t
+
+
+def _ignore_separating(toi, normal, velocity):
+    # Los pares que ya se tocan pero se están alejando no chocan: así un
+    # objeto que acaba de rebotar no vuelve a rebotar en el mismo lugar
+    separating = (toi == 0) & (np.einsum("ij,ij->i", velocity, normal) >= 0) & np.any(normal != 0, axis=1)
+    toi[separating] = np.inf
+    normal[separating] = 0
+    return toi, normal
+
+
+def sweep_sphere_sphere(center_a, velocity_a, radius_a, center_b, velocity_b, radius_b, dt=1.0):
+    """
+    Tiempo de impacto entre esferas que se mueven con velocidad constante
+    durante dt. Todos los argumentos son arreglos con una fila por par (sirve
+    en 2D y 3D). Retorna (toi, normal): toi es inf para los pares que no se
+    tocan y 0 para los que ya se intersectan; normal apunta de b hacia a en
+    el momento del impacto
+    """
+    distance = np.asarray(center_a, dtype=np.float64) - center_b
+    velocity = np.asarray(velocity_a, dtype=np.float64) - velocity_b
+    radius = np.asarray(radius_a, dtype=np.float64) + radius_b
+
+    toi = _first_contact(distance, velocity, radius)
+    toi[toi > dt] = np.inf
+
+    finite = np.isfinite(toi)
+    normal = np.zeros_like(distance)
+    normal[finite] = distance[finite] + velocity[finite] * toi[finite, None]
+    length = np.linalg.norm(normal, axis=1)
+    length[length == 0] = 1
+    return _ignore_separating(toi, normal / length[:, None], velocity)
+
+
+def _sweep_slabs(min_a, max_a, velocity, min_b, max_b, dt):
+    # Método de los slabs: retorna (toi, t_enter, eje de entrada) sin normal
+    with np.errstate(divide="ignore", invalid="ignore"):
+        enter = np.where(velocity > 0, (min_b - max_a) / velocity, (max_b - min_a) / velocity)
+        exit = np.where(velocity > 0, (max_b - min_a) / velocity, (min_b - max_a) / velocity)
+
+    # Sin movimiento en un eje: se intersectan siempre o nunca en ese eje
+    still = velocity == 0
+    overlap = (min_a <= max_b) & (max_a >= min_b)
+    enter[still] = np.where(overlap[still], -np.inf, np.inf)
+    exit[still] = np.where(overlap[still], np.inf, -np.inf)
+
+    axis = np.argmax(enter, axis=1)
+    t_enter = enter[np.arange(len(enter)), axis]
+    t_exit = np.min(exit, axis=1)
+
+    hit = (t_enter <= t_exit) & (t_exit >= 0) & (t_enter <= dt)
+    toi = np.where(hit, np.maximum(t_enter, 0.0), np.inf)
+    return toi, t_enter, axis
+
+
+def sweep_aabb_aabb(min_a, max_a, velocity_a, min_b, max_b, velocity_b, dt=1.0):
+    """
+    Tiempo de impacto entre cajas alineadas a los ejes que se mueven con
+    velocidad constante durante dt (método de los slabs sobre la velocidad
+    relativa). Retorna (toi, normal) como sweep_sphere_sphere; normal es la
+    normal de la cara de b que toca a
+    """
+    min_a = np.asarray(min_a, dtype=np.float64)
+    max_a = np.asarray(max_a, dtype=np.float64)
+    min_b = np.broadcast_to(np.asarray(min_b, dtype=np.float64), min_a.shape)
+    max_b = np.broadcast_to(np.asarray(max_b, dtype=np.float64), min_a.shape)
+    velocity = np.asarray(velocity_a, dtype=np.float64) - velocity_b
+
+    toi, t_enter, axis = _sweep_slabs(min_a, max_a, velocity, min_b, max_b, dt)
+    rows = np.arange(len(toi))
+
+    normal = np.zeros_like(velocity)
+    normal[rows, axis] = -np.sign(velocity[rows, axis])
+
+    # Las que ya se intersectan: el eje de menor penetración, hacia el lado de a
+    inside = np.isfinite(toi) & (t_enter < 0)
+    if np.any(inside):
+        penetration = np.minimum(max_a[inside] - min_b[inside], max_b[inside] - min_a[inside])
+        least = np.argmin(penetration, axis=1)
+        inside_rows = np.flatnonzero(inside)
+        side = (min_a[inside_rows, least] + max_a[inside_rows, least]) - (min_b[inside_rows, least] + max_b[inside_rows, least])
+        normal[inside] = 0
+        normal[inside_rows, least] = np.where(side >= 0, 1.0, -1.0)
+
+    normal[~np.isfinite(toi)] = 0
+    return _ignore_separating(toi, normal, velocity)
+
+
+def sweep_sphere_aabb(center, velocity, radius, min, max, velocity_box=0.0, dt=1.0):
+    """
+    Tiempo de impacto entre esferas y cajas (3D) que se mueven con velocidad
+    constante durante dt. Retorna (toi, normal) como sweep_sphere_sphere;
+    normal apunta de la caja hacia la esfera.
+
+    El centro de la esfera choca con la caja engordada en radius, que es la
+    unión de 3 cajas (las caras), 12 cilindros (las aristas) y 8 esferas
+    (las esquinas). El primer contacto es el menor entre todas esas piezas
+    """
+    center = np.asarray(center, dtype=np.float64)
+    velocity = np.asarray(velocity, dtype=np.float64) - velocity_box
+    radius = np.broadcast_to(np.asarray(radius, dtype=np.float64), len(center))
+    min = np.broadcast_to(np.asarray(min, dtype=np.float64), center.shape)
+    max = np.broadcast_to(np.asarray(max, dtype=np.float64), center.shape)
+    toi = np.full(len(center), np.inf)
+
+    for axis in range(3):
+        # Caras perpendiculares a axis: la caja engordada solo en ese eje
+        grow = np.zeros((len(center), 3))
+        grow[:, axis] = radius
+        face, _, _ = _sweep_slabs(center, center, velocity, min - grow, max + grow, np.inf)
+        toi = np.minimum(toi, face)
+
+        # Aristas paralelas a axis: cilindros en el plano de los otros dos ejes
+        plane = [k for k in range(3) if k != axis]
+        for corner_u in (min, max):
+            for corner_v in (min, max):
+                edge = np.stack([corner_u[:, plane[0]], corner_v[:, plane[1]]], axis=1)
+                t = _first_contact(center[:, plane] - edge, velocity[:, plane], radius)
+                along = center[:, axis] + velocity[:, axis] * np.where(np.isfinite(t), t, 0.0)
+                inside = np.isfinite(t) & (along >= min[:, axis]) & (along <= max[:, axis])
+                toi = np.where(inside, np.minimum(toi, t), toi)
+
+    # Esquinas
+    for corner in range(8):
+        point = np.where([(corner >> k) & 1 for k in range(3)], max, min)
+        toi = np.minimum(toi, _first_contact(center - point, velocity, radius))
+
+    toi[toi > dt] = np.inf
+
+    finite = np.isfinite(toi)
+    normal = np.zeros_like(center)
+    position = center[finite] + velocity[finite] * toi[finite, None]
+    offset = position - np.maximum(min[finite], np.minimum(position, max[finite]))
+    length = np.linalg.norm(offset, axis=1)
+    length[length == 0] = 1
+    normal[finite] = offset / length[:, None]
+    return _ignore_separating(toi, normal, velocity)
+
+
+def narrow_phase(a, b, boxes, spheres, centers, radii, mins, maxs):
+    """
+    Prueba exacta de los pares candidatos (a, b). boxes y spheres indican el
+    tipo de cada collider; retorna un arreglo booleano con un valor por par
+    """
+    hit = boxes[a] & boxes[b] & aabb_aabb(mins[a], maxs[a], mins[b], maxs[b])
+
+    both = spheres[a] & spheres[b]
+    hit[both] = sphere_sphere(centers[a[both]], radii[a[both]], centers[b[both]], radii[b[both]])
+
+    for sphere, box in ((a, b), (b, a)):
+        mixed = spheres[sphere] & boxes[box]
+        hit[mixed] = sphere_aabb(centers[sphere[mixed]], radii[sphere[mixed]], mins[box[mixed]], maxs[box[mixed]])
+
+    return hit
+
+
 class CollisionManager:
+    """
+    Guarda los colliders por nombre. Las consultas descartan primero los
+    pares cuyas cajas no se tocan (fase amplia) y solo prueban la forma
+    exacta de los que quedan.
+    """
     def __init__(self):
         self.colliders = []
+        self._by_name = {}
 
     def add_collider(self, collider):
         self.colliders.append(collider)
+        # Con nombres repetidos se consulta el primero, como antes
+        self._by_name.setdefault(collider.name, collider)
 
     def __getitem__(self, name):
-        for c in self.colliders:
-            if c.name == name:
-                return c
-        return None
+        return self._by_name.get(name)
     
     def set_position(self, name, position):
         collider = self[name]
         if collider is not None:
             collider.set_position(position)
 
+    def _bounds(self):
+        # Los colliders se mueven por su cuenta (collider.set_position), así
+        # que las cajas se leen en cada consulta
+        bounds = [c.bounds() for c in self.colliders]
+        mins = np.array([b[0] for b in bounds], dtype=np.float64).reshape(-1, 3)
+        maxs = np.array([b[1] for b in bounds], dtype=np.float64).reshape(-1, 3)
+        return mins, maxs
+
     def check_collision(self, name):
         collider = self[name]
-        result = []
         if collider is None:
             return []
-        for c in self.colliders:
+
+        mins, maxs = self._bounds()
+        min, max = collider.bounds()
+        candidates = np.flatnonzero(np.all((mins <= max) & (maxs >= min), axis=1))
+
+        result = []
+        for i in candidates:
+            c = self.colliders[i]
             # ignorar colisiones de un objeto consigo mismo
             if c.name != collider.name and c.detect_collision(collider):
                 result.append(c.name)
 
-        return result
\ No newline at end of file
+        return result
+
+    def check_all(self):
+        """Retorna la lista de pares de nombres (a, b) de todos los colliders que se intersectan"""
+        if len(self.colliders) < 2:
+            return []
+
+        mins, maxs = self._bounds()
+        a, b = sweep_and_prune(mins, maxs)
+
+        types = np.array([c.type for c in self.colliders])
+        centers = np.array([c.center if c.type == "Sphere" else np.zeros(3) for c in self.colliders], dtype=np.float64)
+        radii = np.array([c.radius if c.type == "Sphere" else 0.0 for c in self.colliders], dtype=np.float64)
+        hit = narrow_phase(a, b, types == "AABB", types == "Sphere", centers, radii, mins, maxs)
+
+        names = [c.name for c in self.colliders]
+        return [(names[i], names[j]) for i, j in zip(a[hit], b[hit]) if names[i] != names[j]]
+
+
+
+class ColliderWorld:
+    """
+    Alternativa a CollisionManager para escenas con muchos colliders. No usa
+    objetos AABB/Sphere: guarda los datos de todos en arreglos contiguos
+    (min, max, center, radius), que se actualizan en bloque con
+    set_positions, y las consultas prueban todos los pares candidatos a la
+    vez. Los resultados son los mismos que con AABB.detect_collision y
+    Sphere.detect_collision.
+    """
+    AABB = 0
+    SPHERE = 1
+
+    def __init__(self, capacity=64):
+        self.count = 0
+        self.capacity = capacity
+        self.names = []
+        self.index = {}
+
+        self.types = np.zeros(capacity, dtype=np.int8)
+        # Caja relativa a la posición; para una esfera es (-radio, radio)
+        self.min_size = np.zeros((capacity, 3))
+        self.max_size = np.zeros((capacity, 3))
+        self.min = np.zeros((capacity, 3))
+        self.max = np.zeros((capacity, 3))
+        self.center = np.zeros((capacity, 3))
+        self.radius = np.zeros(capacity)
+
+    def _grow(self):
+        self.capacity *= 2
+        for attribute in ("types", "min_size", "max_size", "min", "max", "center", "radius"):
+            array = getattr(self, attribute)
+            grown = np.zeros((self.capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:self.count] = array[:self.count]
+            setattr(self, attribute, grown)
+
+    def _add(self, name, type):
+        if self.count == self.capacity:
+            self._grow()
+        i = self.count
+        self.count += 1
+        self.names.append(name)
+        # Con nombres repetidos se consulta el primero, como en CollisionManager
+        self.index.setdefault(name, i)
+        self.types[i] = type
+        return i
+
+    def add_aabb(self, name, min, max):
+        i = self._add(name, self.AABB)
+        self.min_size[i] = min
+        self.max_size[i] = max
+        self.min[i] = min
+        self.max[i] = max
+        return i
+
+    def add_sphere(self, name, radius):
+        i = self._add(name, self.SPHERE)
+        self.radius[i] = radius
+        self.min_size[i] = -radius
+        self.max_size[i] = radius
+        self.min[i] = -radius
+        self.max[i] = radius
+        return i
+
+    def add_collider(self, collider):
+        """Copia un AABB o Sphere, con su posición actual"""
+        if collider.type == "AABB":
+            i = self.add_aabb(collider.name, collider.minSize, collider.maxSize)
+            self.set_positions([i], [collider.min - collider.minSize])
+        elif collider.type == "Sphere":
+            i = self.add_sphere(collider.name, collider.radius)
+            self.set_positions([i], [collider.center])
+        else:
+            raise ValueError(f"Tipo de collider no soportado: {collider.type}")
+        return i
+
+    def __getitem__(self, name):
+        return self.index.get(name)
+
+    def __len__(self):
+        return self.count
+
+    def set_positions(self, indices, positions):
+        """
+        Mueve varios colliders a la vez. indices es un arreglo de índices (o
+        un slice) y positions un arreglo (K, 3) con las nuevas posiciones
+        """
+        rows = np.arange(self.count)[indices]
+        positions = np.asarray(positions, dtype=np.float64)
+        self.center[rows] = positions
+        self.min[rows] = positions + self.min_size[rows]
+        self.max[rows] = positions + self.max_size[rows]
+
+    def set_position(self, name, position):
+        i = self[name]
+        if i is not None:
+            self.set_positions([i], [position])
+
+    def test_pairs(self, a, b):
+        """Prueba exacta de los pares de índices (a, b); retorna un arreglo booleano"""
+        types = self.types[:self.count]
+        return narrow_phase(a, b, types == self.AABB, types == self.SPHERE,
+                            self.center, self.radius, self.min, self.max)
+
+    def check_collision(self, name):
+        i = self[name]
+        if i is None:
+            return []
+        n = self.count
+        candidates = np.flatnonzero(np.all((self.min[:n] <= self.max[i]) & (self.max[:n] >= self.min[i]), axis=1))
+        candidates = candidates[candidates != i]
+        hit = self.test_pairs(candidates, np.full(len(candidates), i))
+        return [self.names[j] for j in candidates[hit] if self.names[j] != name]
+
+    def check_all(self):
+        """Retorna dos arreglos de índices (a, b) con todos los pares de colliders que se intersectan"""
+        a, b = sweep_and_prune(self.min[:self.count], self.max[:self.count])
+        hit = self.test_pairs(a, b)
+        return a[hit], b[hit]
+
+    def sweep_all(self, velocities, dt):
+        """
+        Detección continua para todos los colliders, que se mueven con
+        velocities (arreglo (N, 3)) durante dt. Retorna (a, b, toi, normal)
+        para los pares que chocan; normal apunta de b hacia a
+        """
+        n = self.count
+        velocities = np.asarray(velocities, dtype=np.float64).reshape(n, 3)
+        mins, maxs = self.min[:n], self.max[:n]
+        # Fase amplia con las cajas que cubren todo el recorrido
+        moved = velocities * dt
+        a, b = sweep_and_prune(np.minimum(mins, mins + moved), np.maximum(maxs, maxs + moved))
+
+        toi = np.full(len(a), np.inf)
+        normal = np.zeros((len(a), 3))
+        spheres = self.types[:n] == self.SPHERE
+        boxes = self.types[:n] == self.AABB
+
+        both = spheres[a] & spheres[b]
+        toi[both], normal[both] = sweep_sphere_sphere(
+            self.center[a[both]], velocities[a[both]], self.radius[a[both]],
+            self.center[b[both]], velocities[b[both]], self.radius[b[both]], dt)
+
+        both = boxes[a] & boxes[b]
+        toi[both], normal[both] = sweep_aabb_aabb(
+            mins[a[both]], maxs[a[both]], velocities[a[both]],
+            mins[b[both]], maxs[b[both]], velocities[b[both]], dt)
+
+        for sphere, box, sign in ((a, b, 1.0), (b, a, -1.0)):
+            mixed = spheres[sphere] & boxes[box]
+            toi[mixed], mixed_normal = sweep_sphere_aabb(
+                self.center[sphere[mixed]], velocities[sphere[mixed]], self.radius[sphere[mixed]],
+                mins[box[mixed]], maxs[box[mixed]], velocities[box[mixed]], dt)
+            normal[mixed] = sign * mixed_normal
+
+        hit = np.isfinite(toi)
+        return a[hit], b[hit], toi[hit], normal[hit]
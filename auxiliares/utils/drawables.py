@@ -1,8 +1,33 @@
+import ctypes
 import numpy as np
-from OpenGL.GL import glEnable, glDisable, glBindTexture, GL_TRIANGLES, GL_CULL_FACE, GL_TEXTURE_2D, GL_CLAMP_TO_EDGE, GL_LINEAR
+from OpenGL.GL import glEnable, glDisable, glBindTexture, glDeleteTextures, GL_TRIANGLES, GL_CULL_FACE, GL_TEXTURE_2D, GL_CLAMP_TO_EDGE, GL_LINEAR
+from OpenGL.GL import glGenBuffers, glDeleteBuffers, glBindBuffer, glBufferData, glBufferSubData, glEnableVertexAttribArray, glDisableVertexAttribArray, \
+    glVertexAttribPointer, glVertexAttribDivisor, glDrawArraysInstanced, glDrawElementsInstanced, GL_ARRAY_BUFFER, GL_DYNAMIC_DRAW, GL_FLOAT, GL_FALSE
 from PIL import Image
 from grafica.textures import texture_2D_setup
+from auxiliares.utils.assets import asset_manager
 import grafica.transformations as tr
+from grafica.frustum import boundingBox
+from grafica.mesh_simplification import lodChain, normalizeRows
+from grafica.static_batch import transformVertices
+
+def load_image(path):
+    image = Image.open(path)
+    # Decodifica ahora, para no mantener el archivo abierto
+    image.load()
+    return image
+
+def write_attribute(target, data, size):
+    """
+    Copia data a un atributo de un vertex list de pyglet (p. ej.
+    vertex_list.position) en una sola copia de numpy, sin pasar por listas
+    de Python. data puede ser una lista, un arreglo (N, size) o columnas de
+    un arreglo intercalado
+    """
+    np.asarray(target).reshape(-1, size)[:] = np.reshape(data, (-1, size))
+
+def delete_texture(texture):
+    glDeleteTextures(1, [texture])
 
 class Texture():
     def __init__(self,
@@ -14,6 +39,7 @@ class Texture():
                  maxFilterMode=GL_LINEAR,
                  flip_top_bottom=True):
         self.texture = None
+        self.asset_key = None
         self.sWrapMode = sWrapMode
         self.tWrapMode = tWrapMode
         self.minFilterMode = minFilterMode
@@ -33,8 +59,22 @@ class Texture():
         self.texture = texture_2D_setup(image, self.sWrapMode, self.tWrapMode, self.minFilterMode, self.maxFilterMode, self.flip_top_bottom)
 
     def create_from_file(self, path):
-        image = Image.open(path)
-        self.texture = texture_2D_setup(image, self.sWrapMode, self.tWrapMode, self.minFilterMode, self.maxFilterMode, self.flip_top_bottom)
+        # La misma imagen con los mismos parámetros comparte la textura en GPU
+        self.asset_key = asset_manager.key(path, self.sWrapMode, self.tWrapMode, self.minFilterMode, self.maxFilterMode, self.flip_top_bottom)
+
+        def create():
+            image = asset_manager.get(asset_manager.key(path), lambda: load_image(path))
+            return texture_2D_setup(image, self.sWrapMode, self.tWrapMode, self.minFilterMode, self.maxFilterMode, self.flip_top_bottom)
+
+        self.texture = asset_manager.acquire(self.asset_key, create, delete_texture)
+
+    def release(self):
+        if self.asset_key is not None:
+            asset_manager.release(self.asset_key)
+        elif self.texture is not None:
+            delete_texture(self.texture)
+        self.texture = None
+        self.asset_key = None
 
     def bind(self):
         glBindTexture(GL_TEXTURE_2D, self.texture)
@@ -76,43 +116,256 @@ class Model():
 
         self.index_data = index_data
         if index_data is not None:
-            self.index_data = np.array(index_data, dtype=np.uint32)
+            self.index_data = np.asarray(index_data, dtype=np.uint32)
 
+        # Un vertex list por pipeline, cada uno con su cuenta de referencias
+        # [vertex_list, ref_count]; gpu_data y pipeline son los últimos usados
+        self.vertex_lists = {}
         self.gpu_data = None
+        self.pipeline = None
+        self._bounds = None
+        # Versiones simplificadas: lods[i - 1] es el nivel i, que el SceneGraph
+        # usa cuando el modelo ocupa menos de lod_screen_sizes[i - 1] de la pantalla
+        self.lods = []
+        self.lod_screen_sizes = []
+
+    @classmethod
+    def from_interleaved(cls, vertices, index_data=None, layout=("position", "uv", "normal")):
+        """
+        Model desde un arreglo (N, stride) con los atributos intercalados en el
+        orden de layout. Cada atributo es una vista de vertices, sin copias
+        """
+        sizes = {"position": 3, "uv": 2, "normal": 3}
+        vertices = np.asarray(vertices, dtype=np.float32)
+        vertices = vertices.reshape(-1, sum(sizes[name] for name in layout))
+        data = {}
+        start = 0
+        for name in layout:
+            data[name] = vertices[:, start:start + sizes[name]]
+            start += sizes[name]
+        return cls(data["position"], data.get("uv"), data.get("normal"), index_data)
+
+    @property
+    def bounds(self):
+        """(min, max) de las posiciones en coordenadas locales; se calcula una vez"""
+        if self._bounds is None:
+            self._bounds = boundingBox(self.position_data)
+        return self._bounds
+
+    def lod(self, level):
+        return self if level == 0 else self.lods[level - 1]
+
+    def set_lods(self, models, screen_sizes=None, screen_size=0.5):
+        """
+        Usa models como niveles de detalle. Por defecto, cada nivel se usa
+        cuando el tamaño en pantalla (radio / alto de media pantalla) baja de
+        screen_size por la fracción de triángulos que conserva, así la
+        cantidad de vértices dibujados baja en proporción a la distancia
+        """
+        if screen_sizes is None:
+            triangles = np.size(self.index_data) if self.index_data is not None else np.size(self.position_data) // 3
+            screen_sizes = [screen_size * np.size(model.index_data) / triangles for model in models]
+        self.lods = list(models)
+        self.lod_screen_sizes = list(screen_sizes)
+
+    def generate_lods(self, levels=3, ratio=0.5, screen_size=0.5):
+        """
+        Crea levels versiones simplificadas (ver grafica.mesh_simplification),
+        cada una con ratio veces los triángulos de la anterior. Los vértices
+        repetidos en las costuras de uvs o normales se unen por posición antes
+        de simplificar, para que el mesh no se abra en ellas. No usa OpenGL,
+        así que se puede llamar al cargar el modelo en otro hilo
+        """
+        positions = np.reshape(self.position_data, (-1, 3))
+        indices = self.index_data if self.index_data is not None else np.arange(len(positions))
+        attributes = [np.reshape(data, (len(positions), -1)) for data in (self.uv_data, self.normal_data) if data is not None]
+
+        models = []
+        for lod_positions, lod_indices, lod_attributes in lodChain(positions, indices, levels, ratio, attributes):
+            lod_attributes = list(lod_attributes)
+            uvs = lod_attributes.pop(0).astype(np.float32) if self.uv_data is not None else None
+            normals = normalizeRows(lod_attributes.pop(0)).astype(np.float32) if self.normal_data is not None else None
+            models.append(Model(lod_positions.astype(np.float32), uvs, normals, lod_indices))
+        self.set_lods(models, screen_size=screen_size)
 
     def init_gpu_data(self, pipeline):
+        for lod in self.lods:
+            lod.init_gpu_data(pipeline)
+        # Los nodos que comparten el modelo y el pipeline comparten sus
+        # buffers; con otro pipeline se crea otro vertex list
+        self.pipeline = pipeline
+        if pipeline in self.vertex_lists:
+            self.vertex_lists[pipeline][1] += 1
+            self.gpu_data = self.vertex_lists[pipeline][0]
+            return
 
-        size = len(self.position_data)
+        # np.size acepta tanto listas planas como arreglos (N, 3)
+        size = np.size(self.position_data)
         count = 3
 
         if "texCoord" in pipeline.attributes:
-            size += len(self.uv_data)
+            size += np.size(self.uv_data)
             count += 2
 
         if "normal" in pipeline.attributes:
-            size += len(self.normal_data)
+            size += np.size(self.normal_data)
             count += 3
 
         if self.index_data is not None:
             self.gpu_data = pipeline.vertex_list_indexed(size // count, GL_TRIANGLES, self.index_data)
         else:
             self.gpu_data = pipeline.vertex_list(size // count, GL_TRIANGLES)
+        self.vertex_lists[pipeline] = [self.gpu_data, 1]
         
-        self.gpu_data.position[:] = self.position_data
+        # Los arreglos se copian de una vez a la memoria de pyglet, sin listas
+        write_attribute(self.gpu_data.position, self.position_data, 3)
         if "texCoord" in pipeline.attributes:
-            self.gpu_data.texCoord[:] = self.uv_data
+            write_attribute(self.gpu_data.texCoord, self.uv_data, 2)
         
         if "normal" in pipeline.attributes:
-            self.gpu_data.normal[:] = self.normal_data
+            write_attribute(self.gpu_data.normal, self.normal_data, 3)
+
+    def release(self, pipeline=None):
+        """Suelta una referencia al vertex list de pipeline (por defecto, el último usado)"""
+        for lod in self.lods:
+            lod.release(pipeline)
+        if pipeline is None:
+            pipeline = self.pipeline
+        entry = self.vertex_lists.get(pipeline)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] > 0:
+            return
+        entry[0].delete()
+        del self.vertex_lists[pipeline]
+        if self.pipeline is pipeline:
+            # Queda como último usado alguno de los pipelines restantes
+            self.pipeline = next(iter(self.vertex_lists), None)
+            self.gpu_data = self.vertex_lists[self.pipeline][0] if self.pipeline is not None else None
 
-    def draw(self, mode = GL_TRIANGLES, cull_face=True):
+    def vertex_list(self, pipeline=None):
+        return self.gpu_data if pipeline is None else self.vertex_lists[pipeline][0]
+
+    def draw(self, mode = GL_TRIANGLES, cull_face=True, pipeline=None):
         if cull_face:
             glEnable(GL_CULL_FACE)
         else:
             glDisable(GL_CULL_FACE)
-        self.gpu_data.draw(mode)
+        self.vertex_list(pipeline).draw(mode)
         glEnable(GL_CULL_FACE)
 
+    def draw_instanced(self, instances, mode = GL_TRIANGLES, cull_face=True, pipeline=None):
+        """
+        Dibuja instances.count copias del modelo en una sola llamada. Las
+        matrices de modelo se leen desde instances (un InstanceBuffer);
+        pipeline es el del nodo, que creó el vertex list, no el instanciado
+        """
+        if cull_face:
+            glEnable(GL_CULL_FACE)
+        else:
+            glDisable(GL_CULL_FACE)
+
+        gpu_data = self.vertex_list(pipeline)
+        domain = gpu_data.domain
+        domain.vao.bind()
+        for buffer, _ in domain.buffer_attributes:
+            buffer.commit()
+        instances.attach()
+
+        if self.index_data is not None:
+            domain.index_buffer.commit()
+            offset = gpu_data.index_start * domain.index_element_size
+            glDrawElementsInstanced(mode, gpu_data.index_count, domain.index_gl_type, ctypes.c_void_p(offset), instances.count)
+        else:
+            glDrawArraysInstanced(mode, gpu_data.start, gpu_data.count, instances.count)
+
+        instances.detach()
+        domain.vao.unbind()
+        glEnable(GL_CULL_FACE)
+
+def merge_models(models, transforms):
+    """
+    Un solo Model con todos los models, con su transform (4x4) ya aplicada a
+    posiciones y normales. Si algunos modelos tienen uvs o normales y otros
+    no, a esos se les completa con ceros
+    """
+    models = list(models)
+    positions = [np.reshape(model.position_data, (-1, 3)) for model in models]
+    has_uvs = any(model.uv_data is not None for model in models)
+    has_normals = any(model.normal_data is not None for model in models)
+
+    merged_positions, merged_uvs, merged_normals, merged_indices = [], [], [], []
+    offset = 0
+    for model, model_positions, transform in zip(models, positions, transforms):
+        count = len(model_positions)
+        normals = np.reshape(model.normal_data, (count, 3)) if model.normal_data is not None else np.zeros((count, 3))
+        # Posición y normal juntas para transformar ambas en una llamada
+        vertices = transformVertices(np.hstack([model_positions, normals]), 6, transform, normalOffset=3)
+        merged_positions.append(vertices[:, :3])
+        if has_normals:
+            merged_normals.append(vertices[:, 3:] if model.normal_data is not None else np.zeros((count, 3), dtype=np.float32))
+        if has_uvs:
+            merged_uvs.append(np.reshape(model.uv_data, (count, 2)) if model.uv_data is not None else np.zeros((count, 2)))
+
+        indices = model.index_data if model.index_data is not None else np.arange(count)
+        merged_indices.append(np.asarray(indices, dtype=np.uint32) + np.uint32(offset))
+        offset += count
+
+    return Model(
+        np.concatenate(merged_positions).astype(np.float32),
+        np.concatenate(merged_uvs).astype(np.float32) if has_uvs else None,
+        np.concatenate(merged_normals).astype(np.float32) if has_normals else None,
+        np.concatenate(merged_indices))
+
+class InstanceBuffer():
+    """
+    Buffer con una matriz de modelo por instancia, leída por los shaders
+    *_instanced.vert en las ubicaciones location..location + 3
+    """
+    def __init__(self, capacity=16, location=4):
+        self.location = location
+        self.capacity = 0
+        self.count = 0
+        self.buffer = glGenBuffers(1)
+        self.reserve(capacity)
+
+    def reserve(self, capacity):
+        if capacity <= self.capacity:
+            return
+        self.capacity = capacity
+        glBindBuffer(GL_ARRAY_BUFFER, self.buffer)
+        glBufferData(GL_ARRAY_BUFFER, capacity * 64, None, GL_DYNAMIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def update(self, matrices):
+        """matrices es un arreglo (N, 4, 4) de matrices de modelo"""
+        self.count = len(matrices)
+        self.reserve(self.count)
+        # OpenGL espera cada matriz por columnas
+        data = np.ascontiguousarray(np.transpose(matrices, (0, 2, 1)), dtype=np.float32)
+        glBindBuffer(GL_ARRAY_BUFFER, self.buffer)
+        glBufferSubData(GL_ARRAY_BUFFER, 0, data.nbytes, data)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def attach(self):
+        glBindBuffer(GL_ARRAY_BUFFER, self.buffer)
+        for column in range(4):
+            location = self.location + column
+            glEnableVertexAttribArray(location)
+            glVertexAttribPointer(location, 4, GL_FLOAT, GL_FALSE, 64, ctypes.c_void_p(column * 16))
+            glVertexAttribDivisor(location, 1)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def detach(self):
+        # El VAO es compartido con los modelos dibujados sin instancing
+        for column in range(4):
+            glVertexAttribDivisor(self.location + column, 0)
+            glDisableVertexAttribArray(self.location + column)
+
+    def delete(self):
+        glDeleteBuffers(1, [self.buffer])
+
 class Material():
     def __init__(self, ambient=[1, 1, 1], diffuse=[1, 1, 1], specular=[1, 1, 1], shininess=32.0):
         self.ambient = np.array(ambient, dtype=np.float32)
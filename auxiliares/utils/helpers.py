@@ -2,13 +2,17 @@ from pyglet.graphics.shader import ShaderProgram, Shader
 import trimesh as tm
 from OpenGL.GL import GL_LINES, GL_TRIANGLES
 import os
+import re
 from pathlib import Path
 from auxiliares.utils.drawables import Model, Texture
 from trimesh.scene.scene import Scene
 from auxiliares.utils.scene_graph import SceneGraph 
 import auxiliares.utils.shapes as shapes
+import numpy as np
 
 import grafica.transformations as tr
+from grafica.binary_mesh import loadBinaryMesh, saveBinaryMesh
+from auxiliares.utils.assets import asset_manager
 
 def get_path(path):
     return os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), path)
@@ -45,27 +49,80 @@ def init_pipeline(vertex_source, fragment_source):
 
     return pipeline
 
-def mesh_from_file(path):
+def mesh_from_binary(path):
+    """
+    Carga un archivo del formato binario de grafica.binary_mesh. Los datos
+    quedan mapeados en memoria y se leen recién al subirlos a la GPU. Los
+    submeshes <nombre>_lod<i> son niveles de detalle del submesh anterior
+    """
+    mesh_list = []
+    lods = []
+    for submesh in loadBinaryMesh(path).submeshes:
+        model = Model(submesh.positions, submesh.uvs, submesh.normals, submesh.indices)
+        if mesh_list and re.search(r"_lod\d+$", submesh.name):
+            lods.append(model)
+            mesh_list[-1]["mesh"].set_lods(lods)
+            continue
+        lods = []
+        mesh_list.append({"id": submesh.name, "mesh": model, "texture": None})
+    return mesh_list
+
+def mesh_from_file(path, cache=False, lods=0):
+    """
+    Carga un mesh con trimesh, centrado y escalado a tamaño 2. Con cache=True
+    el resultado se guarda en formato binario junto al archivo (path + ".mesh")
+    y se reutiliza mientras el original no cambie. Los meshes con textura no
+    se guardan, ya que el formato binario no incluye imágenes.
+
+    Con lods > 0 se generan esa cantidad de niveles de detalle por submesh
+    (ver Model.generate_lods), que también se guardan en la caché.
+
+    Cargar dos veces el mismo archivo devuelve los mismos Model, que comparten
+    sus buffers en GPU (ver auxiliares.utils.assets)
+    """
+    path = str(path)
+    mesh_list = asset_manager.get(asset_manager.key(path, "mesh", lods), lambda: upload_mesh_data(load_mesh_data(path, cache, lods)))
+    return [dict(item) for item in mesh_list]
+
+def load_mesh_data(path, cache=False, lods=0):
+    """
+    Parte de mesh_from_file que no usa OpenGL, por lo que se puede llamar
+    desde otro hilo. Las texturas quedan como imágenes en item["image"]
+    """
+    path = str(path)
+    if path.endswith(".mesh"):
+        mesh_list = mesh_from_binary(path)
+        if lods:
+            for item in mesh_list:
+                if not item["mesh"].lods:
+                    item["mesh"].generate_lods(lods)
+        return mesh_list
+
+    cache_path = path + (f".lod{lods}.mesh" if lods else ".mesh")
+    if cache and os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(path):
+        return mesh_from_binary(cache_path)
+
     mesh_data = tm.load(path)
     mesh_data.apply_transform(tr.uniformScale(2.0 / mesh_data.scale) @ tr.translate(*-mesh_data.centroid))
 
     mesh_list = []
 
     def process_geometry(id, geometry):
+        # trimesh entrega listas; se pasan a arreglos aquí, en el hilo de
+        # carga, para que subirlas a la GPU sea una sola copia
         vertex_data = tm.rendering.mesh_to_vertexlist(geometry)
-        indices = vertex_data[3]
-        positions = vertex_data[4][1]
+        indices = np.asarray(vertex_data[3], dtype=np.uint32)
+        positions = np.asarray(vertex_data[4][1], dtype=np.float32)
         uvs = None
-        texture = None
-        normals = vertex_data[5][1]
+        image = None
+        normals = np.asarray(vertex_data[5][1], dtype=np.float32)
 
         if geometry.visual.kind == "texture":
-            texture = Texture()
-            uvs = vertex_data[6][1]
-            texture.create_from_image(geometry.visual.material.image)
+            uvs = np.asarray(vertex_data[6][1], dtype=np.float32)
+            image = geometry.visual.material.image
 
         model = Model(positions, uvs, normals, indices)
-        return {"id": id, "mesh": model, "texture": texture}
+        return {"id": id, "mesh": model, "image": image}
 
     if type(mesh_data) is Scene:
         for id, geometry in mesh_data.geometry.items():
@@ -73,4 +130,33 @@ def mesh_from_file(path):
     else:
         mesh_list.append(process_geometry("model", mesh_data))
 
-    return mesh_list
\ No newline at end of file
+    if lods:
+        for item in mesh_list:
+            item["mesh"].generate_lods(lods)
+
+    if cache and all(item["image"] is None for item in mesh_list):
+        submeshes = []
+        for item in mesh_list:
+            name = str(item["id"])[:26]
+            for level in range(len(item["mesh"].lods) + 1):
+                model = item["mesh"].lod(level)
+                submeshes.append({
+                    "name": name if level == 0 else f"{name}_lod{level}",
+                    "positions": model.position_data,
+                    "normals": model.normal_data,
+                    "indices": model.index_data})
+        try:
+            saveBinaryMesh(cache_path, submeshes)
+        except OSError:
+            pass
+
+    return mesh_list
+
+def upload_mesh_data(mesh_list):
+    """Crea las texturas de una lista de load_mesh_data. Se llama en el hilo de OpenGL"""
+    result = []
+    for item in mesh_list:
+        image = item.get("image")
+        texture = Texture(image=image) if image is not None else item.get("texture")
+        result.append({"id": item["id"], "mesh": item["mesh"], "texture": texture})
+    return result
@@ -0,0 +1,61 @@
+import numpy as np
+import grafica.transformations as tr
+from auxiliares.utils.scene_graph import TrackedArray
+
+class BodySync():
+    """
+    Copia la posición y el ángulo de cuerpos de Box2D a nodos de un
+    SceneGraph. Los pares (cuerpo, nodo) se registran una vez; luego sync()
+    lee todos los cuerpos a arreglos, arma todas las matrices en una sola
+    operación y marca como modificados solo esos nodos.
+
+    El plano (x, y) de Box2D corresponde al plano (x, z) de la escena. Las
+    matrices se escriben en el atributo transform de cada nodo, que queda
+    enlazado a una fila de self.transforms; asignar otro transform al nodo
+    lo desenlaza.
+    """
+    def __init__(self, graph, height=0.0):
+        self.graph = graph
+        self.height = height
+        self.bodies = []
+        self.names = []
+        self.transforms = tr.identityBatch(0).view(TrackedArray)
+
+    def __len__(self):
+        return len(self.bodies)
+
+    def add(self, body, node_name):
+        self.add_many([body], [node_name])
+
+    def add_many(self, bodies, node_names):
+        self.bodies.extend(bodies)
+        self.names.extend(node_names)
+
+        # Un solo arreglo para todas las matrices; cada nodo ve su fila
+        transforms = tr.identityBatch(len(self.names)).view(TrackedArray)
+        transforms[:len(self.transforms)] = self.transforms
+        self.transforms = transforms
+        for i, name in enumerate(self.names):
+            self.graph[name].bind("transform", transforms[i])
+        self.sync()
+
+    def capture(self):
+        """Arreglo (N, 3) con x, y y ángulo de cada cuerpo"""
+        return np.array([(body.position[0], body.position[1], body.angle) for body in self.bodies], dtype=np.float32).reshape(-1, 3)
+
+    def apply(self, state):
+        """Escribe las matrices para un arreglo como el de capture, p. ej. uno interpolado"""
+        if len(self.bodies) == 0:
+            return
+        state = np.asarray(state)
+        # Equivale a tr.translate(x, height, y) @ tr.rotationY(-angle) para cada cuerpo
+        transforms = tr.rotationYBatch(-state[:, 2])
+        transforms[:, 0, 3] = state[:, 0]
+        transforms[:, 1, 3] = self.height
+        transforms[:, 2, 3] = state[:, 1]
+        self.transforms[:] = transforms
+        self.graph.mark_dirty(self.names)
+
+    def sync(self):
+        """Se llama después de world.Step"""
+        self.apply(self.capture())
@@ -0,0 +1,49 @@
+import numpy as np
+
+class RenderQueue():
+    """
+    Cola de dibujo. Recibe los nodos con mesh después de propagar las
+    transformaciones y los ordena por (pipeline, textura, material, profundidad)
+    para minimizar los cambios de estado de OpenGL. La profundidad se ordena
+    de adelante hacia atrás para aprovechar el depth test.
+
+    stats guarda, para la última llamada a sort, cuántos cambios de estado
+    habría en el orden original y cuántos quedan después de ordenar.
+    """
+    KEYS = ("pipeline", "texture", "material")
+
+    def __init__(self):
+        self._ids = {}
+        self.stats = {}
+        for key in self.KEYS:
+            self.stats[f"{key}_changes"] = 0
+            self.stats[f"{key}_changes_saved"] = 0
+
+    def key(self, obj):
+        """Identificador entero y estable para un pipeline, textura o material"""
+        if obj is None:
+            return -1
+        return self._ids.setdefault(id(obj), len(self._ids))
+
+    @staticmethod
+    def count_changes(keys):
+        if len(keys) == 0:
+            return 0
+        return 1 + int(np.count_nonzero(keys[1:] != keys[:-1]))
+
+    def sort(self, slots, pipeline_keys, texture_keys, material_keys, depths):
+        """
+        Devuelve slots reordenado. Todos los argumentos son arreglos alineados
+        con slots; depths es la distancia a la cámara de cada nodo.
+        """
+        columns = {"pipeline": pipeline_keys, "texture": texture_keys, "material": material_keys}
+        # lexsort usa la última llave como la principal
+        order = np.lexsort((depths, material_keys, texture_keys, pipeline_keys))
+
+        for key in self.KEYS:
+            before = self.count_changes(columns[key])
+            after = self.count_changes(columns[key][order])
+            self.stats[f"{key}_changes"] = after
+            self.stats[f"{key}_changes_saved"] = before - after
+
+        return slots[order]
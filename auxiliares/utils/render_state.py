@@ -0,0 +1,72 @@
+import numpy as np
+from OpenGL.GL import glBindTexture, GL_TEXTURE_2D
+
+class RenderState():
+    """
+    Registro del estado de OpenGL que fija el SceneGraph. Evita cambiar de
+    programa o de textura cuando ya están activos, y guarda una copia
+    (shadow) de cada uniform por pipeline para no reenviar valores iguales.
+
+    Si se escribe un uniform directamente (pipeline["u_x"] = ...) sobre un
+    pipeline usado por un SceneGraph, hay que llamar a invalidate(pipeline).
+    """
+    def __init__(self):
+        self.program = None
+        self.texture = None
+        self.uniforms = {}
+        self.stats = {
+            "program_binds": 0,
+            "program_binds_skipped": 0,
+            "texture_binds": 0,
+            "texture_binds_skipped": 0,
+            "uniform_uploads": 0,
+            "uniform_uploads_skipped": 0 }
+
+    def begin(self):
+        # Otro código pudo cambiar el programa o la textura desde el último draw
+        self.program = None
+        self.texture = None
+        for key in self.stats:
+            self.stats[key] = 0
+
+    def end(self):
+        if self.texture is not None:
+            glBindTexture(GL_TEXTURE_2D, 0)
+            self.texture = None
+
+    def invalidate(self, pipeline=None):
+        if pipeline is None:
+            self.uniforms.clear()
+        else:
+            self.uniforms.pop(pipeline, None)
+
+    def use(self, pipeline):
+        if self.program is pipeline:
+            self.stats["program_binds_skipped"] += 1
+            return
+        pipeline.use()
+        self.program = pipeline
+        self.stats["program_binds"] += 1
+
+    def bind_texture(self, texture):
+        handle = texture.texture if texture is not None else 0
+        if self.texture == handle:
+            self.stats["texture_binds_skipped"] += 1
+            return
+        glBindTexture(GL_TEXTURE_2D, handle)
+        self.texture = handle
+        self.stats["texture_binds"] += 1
+
+    def set_uniform(self, pipeline, name, value):
+        shadow = self.uniforms.setdefault(pipeline, {})
+        cached = shadow.get(name)
+        if cached is not None and np.array_equal(cached, value):
+            self.stats["uniform_uploads_skipped"] += 1
+            return
+        self.use(pipeline)
+        pipeline[name] = value
+        shadow[name] = np.array(value, copy=True)
+        self.stats["uniform_uploads"] += 1
+
+# Estado compartido por todos los SceneGraph, ya que pueden compartir pipelines
+render_state = RenderState()
@@ -2,16 +2,334 @@ from networkx import DiGraph, edge_dfs
 from OpenGL.GL import GL_TRIANGLES
 import grafica.transformations as tr
 import numpy as np
-from auxiliares.utils.drawables import DirectionalLight, PointLight, SpotLight, Texture
+from auxiliares.utils.drawables import DirectionalLight, PointLight, SpotLight, Texture, InstanceBuffer, merge_models
+from auxiliares.utils.render_state import render_state
+from auxiliares.utils.render_queue import RenderQueue
+from grafica.frustum import transformBoxes, boxesInFrustum
+
+class TrackedArray(np.ndarray):
+    """
+    Arreglo de numpy que marca como modificado al nodo que lo contiene
+    cada vez que se escribe sobre él, p. ej. graph["auto"]["rotation"][1] += dt
+    """
+    def __array_finalize__(self, obj):
+        # Las vistas (p. ej. position[:2]) comparten el nodo del arreglo original
+        tracked = isinstance(self.base, TrackedArray)
+        self._owner = getattr(obj, "_owner", None) if tracked else None
+        self._key = getattr(obj, "_key", None) if tracked else None
+
+    def _touch(self):
+        if self._owner is not None:
+            self._owner.touch(self._key)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._touch()
+
+    def __iadd__(self, other):
+        result = super().__iadd__(other)
+        self._touch()
+        return result
+
+    def __isub__(self, other):
+        result = super().__isub__(other)
+        self._touch()
+        return result
+
+    def __imul__(self, other):
+        result = super().__imul__(other)
+        self._touch()
+        return result
+
+    def __itruediv__(self, other):
+        result = super().__itruediv__(other)
+        self._touch()
+        return result
+
+class NodeData(dict):
+    """
+    Atributos de un nodo del grafo. Guarda en caché la matriz local del nodo
+    y solo la recalcula cuando cambia transform, position, rotation o scale
+    """
+    TRANSFORM_KEYS = ("transform", "position", "rotation", "scale")
+    # Cambiar alguno de estos atributos obliga a recompilar la lista de dibujo;
+    # color, mode y cull_face definen con qué nodos se dibuja con instancing
+    STRUCTURE_KEYS = ("mesh", "pipeline", "light", "material", "texture", "color", "mode", "cull_face")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.name = None
+        self.scene = None
+        self.local = None
+        self._dirty = True
+        self.update(*args, **kwargs)
+
+    @property
+    def dirty(self):
+        return self._dirty
+
+    @dirty.setter
+    def dirty(self, value):
+        self._dirty = value
+        if value and self.scene is not None:
+            self.scene._dirty_nodes.add(self.name)
+
+    def touch(self, key):
+        """Avisa que cambió el atributo key, también si se editó en su lugar"""
+        if key in self.STRUCTURE_KEYS:
+            if self.scene is not None:
+                self.scene._draw_list = None
+        else:
+            self.dirty = True
+
+    def __setitem__(self, key, value):
+        if key in self.TRANSFORM_KEYS or key == "color":
+            # Se copian para detectar cambios como node["color"][0] = 1
+            value = np.array(value, dtype=np.float32).view(TrackedArray)
+            value._owner = self
+            value._key = key
+        if key in self.TRANSFORM_KEYS or key in self.STRUCTURE_KEYS:
+            self.touch(key)
+        super().__setitem__(key, value)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def bind(self, key, value):
+        """
+        Usa value como atributo sin copiarlo, p. ej. una vista a un arreglo
+        compartido por muchos nodos que se escribe de una sola vez. Quien
+        escribe en ese arreglo debe avisar con SceneGraph.mark_dirty
+        """
+        if isinstance(value, TrackedArray):
+            value._owner = self
+            value._key = key
+        super().__setitem__(key, value)
+        self.touch(key)
+
+_default_texture = None
+
+def default_texture():
+    """Textura blanca de 1x1 compartida por todos los nodos sin textura"""
+    global _default_texture
+    if _default_texture is None:
+        _default_texture = Texture()
+    return _default_texture
+
+class _SceneDiGraph(DiGraph):
+    node_attr_dict_factory = NodeData
+
+class DrawList():
+    """
+    Grafo compilado a arreglos planos en orden DFS. Cada nodo ocupa un slot;
+    parents[i] es el slot del padre del nodo i (-1 para la raíz)
+    """
+    def __init__(self, graph, root_key, queue, instanced_pipelines=None, min_instances=2):
+        names = [root_key]
+        index = {root_key: 0}
+        parents = [-1]
+        for src, dst in edge_dfs(graph, source=root_key):
+            if dst in index:
+                continue
+            index[dst] = len(names)
+            names.append(dst)
+            parents.append(index[src])
+
+        self.names = names
+        self.index = index
+        self.parents = np.array(parents, dtype=np.int32)
+        self.nodes = [graph.nodes[name] for name in names]
+        self.pipelines = [node["pipeline"] for node in self.nodes]
+        self.meshes = [node["mesh"] for node in self.nodes]
+        self.lights = [node["light"] for node in self.nodes]
+        # Solo los nodos con pipeline generan llamadas a OpenGL
+        self.light_slots = [i for i, light in enumerate(self.lights) if light is not None and self.pipelines[i] is not None]
+        mesh_slots = [i for i, mesh in enumerate(self.meshes)
+                      if mesh is not None and self.lights[i] is None and self.pipelines[i] is not None]
+
+        # Nodos que comparten mesh, pipeline y material se dibujan con instancing
+        groups = {}
+        for i in mesh_slots:
+            node = self.nodes[i]
+            pipeline = node["pipeline"]
+            if instanced_pipelines is None or pipeline not in instanced_pipelines:
+                continue
+            texture = node["texture"] if "u_texture" in pipeline.uniforms else None
+            key = (id(pipeline), id(node["mesh"]), id(node["material"]), id(texture),
+                   tuple(node["color"]), node["mode"], node["cull_face"])
+            groups.setdefault(key, []).append(i)
+
+        self.instance_groups = []
+        instanced = set()
+        for slots in groups.values():
+            if len(slots) < min_instances:
+                continue
+            self.instance_groups.append(InstanceGroup(np.array(slots, dtype=np.int32), self.nodes[slots[0]],
+                                                      instanced_pipelines[self.nodes[slots[0]]["pipeline"]]))
+            instanced.update(slots)
+
+        self.mesh_slots = np.array([i for i in mesh_slots if i not in instanced], dtype=np.int32)
+
+        # Llaves de estado para ordenar la cola de dibujo
+        mesh_nodes = [self.nodes[i] for i in self.mesh_slots]
+        self.pipeline_keys = np.array([queue.key(node["pipeline"]) for node in mesh_nodes], dtype=np.int64)
+        self.texture_keys = np.array([queue.key(node["texture"]) if "u_texture" in node["pipeline"].uniforms else -1
+                                      for node in mesh_nodes], dtype=np.int64)
+        self.material_keys = np.array([queue.key(node["material"]) for node in mesh_nodes], dtype=np.int64)
+
+        depths = np.zeros(len(names), dtype=np.int32)
+        for i in range(1, len(names)):
+            depths[i] = depths[parents[i]] + 1
+        self.levels = [np.flatnonzero(depths == d) for d in range(1, depths.max(initial=0) + 1)]
+
+        self.local = tr.identityBatch(len(names))
+        self.world = tr.identityBatch(len(names))
+
+        # Cajas locales para frustum culling. Los meshes que aún se están
+        # cargando avisan cuando llega el mesh real, que tiene otra caja
+        self.bounded_slots = np.array(mesh_slots, dtype=np.int32)
+        self.bounds_dirty = True
+        # Nivel de detalle actual de cada nodo; 0 es el mesh original
+        self.lod_level = np.zeros(len(names), dtype=np.int32)
+        for i in mesh_slots:
+            mesh = self.meshes[i]
+            if hasattr(mesh, "add_done_callback") and not mesh.ready:
+                mesh.add_done_callback(self._invalidate_bounds)
+
+    def _invalidate_bounds(self, mesh):
+        self.bounds_dirty = True
+
+    def compute_bounds(self):
+        """Caja local de cada nodo: vacía si no tiene mesh, infinita si el mesh no tiene bounds"""
+        count = len(self.names)
+        self.local_min = np.full((count, 3), np.inf, dtype=np.float32)
+        self.local_max = np.full((count, 3), -np.inf, dtype=np.float32)
+        for i in self.bounded_slots:
+            bounds = getattr(self.meshes[i], "bounds", None)
+            if bounds is None:
+                self.local_min[i], self.local_max[i] = -np.inf, np.inf
+            else:
+                self.local_min[i], self.local_max[i] = bounds
+        self.finite_slots = np.flatnonzero(np.all(np.isfinite(self.local_min) & np.isfinite(self.local_max), axis=1))
+        self.bounds_dirty = False
+
+        # Niveles de detalle: umbrales de tamaño en pantalla de cada nodo con
+        # lods, rellenos con -inf para los modelos con menos niveles
+        finite = np.zeros(count, dtype=bool)
+        finite[self.finite_slots] = True
+        self.lod_slots = np.array([i for i in self.bounded_slots if finite[i] and len(getattr(self.meshes[i], "lods", [])) > 0], dtype=np.int32)
+        levels = max([len(self.meshes[i].lod_screen_sizes) for i in self.lod_slots], default=0)
+        self.lod_screen_sizes = np.full((len(self.lod_slots), levels), -np.inf, dtype=np.float32)
+        for row, i in enumerate(self.lod_slots):
+            sizes = self.meshes[i].lod_screen_sizes
+            self.lod_screen_sizes[row, :len(sizes)] = sizes
+
+        # Se mantiene el nivel de cada nodo (y así la histéresis) salvo que
+        # su mesh ya no tenga tantos niveles, por ejemplo al terminar de cargar
+        available = np.zeros(count, dtype=np.int32)
+        available[self.lod_slots] = [len(self.meshes[i].lod_screen_sizes) for i in self.lod_slots]
+        np.minimum(self.lod_level, available, out=self.lod_level)
+
+    def cull(self, planes):
+        """
+        Retorna un arreglo booleano con los nodos visibles. Se calcula la caja
+        de mundo de cada subárbol y se recorre desde la raíz: si un subárbol
+        queda fuera del frustum, ninguno de sus nodos se vuelve a revisar
+        """
+        if self.bounds_dirty:
+            self.compute_bounds()
+
+        own_min = self.local_min.copy()
+        own_max = self.local_max.copy()
+        finite = self.finite_slots
+        own_min[finite], own_max[finite] = transformBoxes(self.world[finite], self.local_min[finite], self.local_max[finite])
+
+        # Cajas de los subárboles, desde las hojas hacia la raíz
+        subtree_min = own_min.copy()
+        subtree_max = own_max.copy()
+        for level in reversed(self.levels):
+            np.minimum.at(subtree_min, self.parents[level], subtree_min[level])
+            np.maximum.at(subtree_max, self.parents[level], subtree_max[level])
+
+        visible = np.zeros(len(self.names), dtype=bool)
+        visible[0] = _boxes_visible(planes, subtree_min[:1], subtree_max[:1])[0]
+        for level in self.levels:
+            level = level[visible[self.parents[level]]]
+            visible[level] = _boxes_visible(planes, subtree_min[level], subtree_max[level])
+
+        # Un nodo con hijos visibles puede tener su propio mesh fuera
+        slots = self.bounded_slots[visible[self.bounded_slots]]
+        visible[slots] = _boxes_visible(planes, own_min[slots], own_max[slots])
+        return visible
+
+    def select_lods(self, view, projection, hysteresis=0.1):
+        """
+        Elige el nivel de detalle de cada nodo según su tamaño en pantalla
+        (radio de su esfera / alto de media pantalla). Para cambiar de nivel
+        el tamaño debe pasar el umbral por un margen hysteresis, así los
+        modelos cerca de un umbral no cambian de nivel en cada cuadro
+        """
+        if self.bounds_dirty:
+            self.compute_bounds()
+        slots = self.lod_slots
+        if len(slots) == 0:
+            return
+
+        world = self.world[slots]
+        local_center = 0.5 * (self.local_min[slots] + self.local_max[slots])
+        local_radius = 0.5 * np.linalg.norm(self.local_max[slots] - self.local_min[slots], axis=1)
+        centers = np.einsum("nij,nj->ni", world[:, :3, :3], local_center) + world[:, :3, 3]
+        radius = local_radius * np.linalg.norm(world[:, :3, :3], axis=1).max(axis=1)
+
+        if projection[3, 3] == 0:
+            # Perspectiva: el tamaño baja con la distancia a la cámara
+            depth = -(centers @ view[2, :3] + view[2, 3])
+            size = radius * projection[1, 1] / np.maximum(depth, 1e-6)
+        else:
+            size = radius * projection[1, 1]
+
+        current = self.lod_level[slots]
+        coarser = np.count_nonzero(size[:, None] < self.lod_screen_sizes * (1 - hysteresis), axis=1)
+        finer = np.count_nonzero(size[:, None] < self.lod_screen_sizes * (1 + hysteresis), axis=1)
+        self.lod_level[slots] = np.where(coarser > current, coarser, np.where(finer < current, finer, current))
+
+def _boxes_visible(planes, box_min, box_max):
+    # Las cajas vacías no se ven y las infinitas siempre se ven
+    visible = np.all(box_min <= box_max, axis=1)
+    finite = visible & np.all(np.isfinite(box_min) & np.isfinite(box_max), axis=1)
+    visible[finite] = boxesInFrustum(planes, box_min[finite], box_max[finite])
+    return visible
+
+class InstanceGroup():
+    """Nodos dibujados con una sola llamada instanciada; node es el representante"""
+    def __init__(self, slots, node, pipeline):
+        self.slots = slots
+        self.node = node
+        self.pipeline = pipeline
 
 class SceneGraph():
-    def __init__(self, controller=None):
-        self.graph = DiGraph(root="root")
+    def __init__(self, controller=None, state=None):
+        self.graph = _SceneDiGraph(root="root")
+        self.state = state if state is not None else render_state
+        self.queue = RenderQueue()
+        self.sort_draws = True
+        # Con cámara, no se dibujan los subárboles fuera de su volumen visible
+        self.frustum_culling = True
+        # Con cámara, los modelos con lods se dibujan con el nivel que
+        # corresponde a su tamaño en pantalla
+        self.level_of_detail = True
+        self.lod_hysteresis = 0.1
+        self.instanced_pipelines = {}
+        self.min_instances = 2
+        self._instance_buffers = {}
         self.add_node("root")
         self.controller = controller
         self.num_point_lights = 0
         self.num_spot_lights = 0
         self.transformations = {}
+        self._draw_list = None
+        self._dirty_nodes = set()
 
     def add_node(self,
                  name,
@@ -38,7 +356,7 @@ class SceneGraph():
         if mesh is not None:
             mesh.init_gpu_data(pipeline)
             if texture is None:
-                _texture = Texture()
+                _texture = default_texture()
 
         if light is not None and isinstance(light, PointLight):
             if self.num_point_lights == 16:
@@ -59,17 +377,77 @@ class SceneGraph():
             material=material,
             texture=_texture,
             transform=transform,
-            position=np.array(position, dtype=np.float32),
-            rotation=np.array(rotation, dtype=np.float32),
-            scale=np.array(scale, dtype=np.float32),
+            position=position,
+            rotation=rotation,
+            scale=scale,
             mode=mode,
             cull_face=cull_face)
         
         self.graph.add_edge(attach_to, name)
 
+        node = self.graph.nodes[name]
+        node.name = name
+        node.scene = self
+        self._draw_list = None
+
+    def register_instanced_pipeline(self, pipeline, instanced_pipeline):
+        """
+        Los nodos con pipeline que compartan mesh y material se dibujarán con
+        instanced_pipeline, que debe usar los shaders *_instanced.vert
+        """
+        self.instanced_pipelines[pipeline] = instanced_pipeline
+        self._draw_list = None
+
     def remove_node(self, name):
         if name in self.graph.nodes:
+            node = self.graph.nodes[name]
+            if node["mesh"] is not None:
+                node["mesh"].release(node["pipeline"])
+            node.scene = None
             self.graph.remove_node(name)
+            self.transformations.pop(name, None)
+            self._draw_list = None
+
+    def bake_static(self, name):
+        """
+        Junta los meshes de los descendientes de name en un Model por cada
+        combinación de pipeline, material, textura, color y modo, con las
+        transformaciones ya aplicadas a los vértices: N llamadas de dibujo
+        pasan a ser una por combinación. Los descendientes se eliminan y los
+        modelos nuevos cuelgan de name con los nombres que se retornan.
+        El subárbol queda fijo, pero name todavía se puede mover
+        """
+        groups = {}
+        descendants = []
+        stack = [(child, self.get_transform(child)) for child in self.graph.successors(name)]
+        while stack:
+            current, transform = stack.pop()
+            descendants.append(current)
+            node = self.graph.nodes[current]
+            if node["light"] is not None:
+                raise ValueError(f"No se puede agrupar {name}: {current} es una luz")
+
+            mesh = node["mesh"]
+            if mesh is not None:
+                if getattr(mesh, "ready", True) is False:
+                    raise ValueError(f"El mesh de {current} aún se está cargando, usar loader.finish() antes de agrupar")
+                # PendingModel ya cargado: se usa el Model que contiene
+                mesh = getattr(mesh, "model", mesh)
+                key = (node["pipeline"], node["material"], node["texture"], tuple(node["color"]), node["mode"], node["cull_face"])
+                groups.setdefault(key, []).append((mesh, transform))
+
+            stack.extend((child, transform @ self.get_transform(child)) for child in self.graph.successors(current))
+
+        merged = [merge_models([mesh for mesh, _ in items], [transform for _, transform in items]) for items in groups.values()]
+        for current in descendants:
+            self.remove_node(current)
+
+        names = []
+        for i, ((pipeline, material, texture, color, mode, cull_face), model) in enumerate(zip(groups, merged)):
+            names.append(f"{name}_static_{i}")
+            self.add_node(names[-1], attach_to=name, mesh=model, pipeline=pipeline, color=list(color),
+                          material=material, texture=texture, mode=mode, cull_face=cull_face)
+        return names
 
     def __getitem__(self, name):
         if name not in self.graph.nodes:
@@ -86,130 +464,255 @@ class SceneGraph():
 
         self.graph.nodes[name] = value
     
+    def mark_dirty(self, names):
+        """Marca varios nodos como modificados; sus subárboles se recalculan en update_transforms"""
+        for name in names:
+            self.graph.nodes[name]._dirty = True
+        self._dirty_nodes.update(names)
+
     def get_transform(self, node):
         node = self.graph.nodes[node]
-        transform = node["transform"]
-        translation_matrix = tr.translate(node["position"][0], node["position"][1], node["position"][2])
-        rotation_matrix =  tr.rotationY(node["rotation"][1]) @ tr.rotationX(node["rotation"][0]) @ tr.rotationZ(node["rotation"][2])
-        scale_matrix = tr.scale(node["scale"][0], node["scale"][1], node["scale"][2])
-        return transform @ translation_matrix @ rotation_matrix @ scale_matrix
+        if node.dirty or node.local is None:
+            transform = node["transform"]
+            translation_matrix = tr.translate(node["position"][0], node["position"][1], node["position"][2])
+            rotation_matrix =  tr.rotationY(node["rotation"][1]) @ tr.rotationX(node["rotation"][0]) @ tr.rotationZ(node["rotation"][2])
+            scale_matrix = tr.scale(node["scale"][0], node["scale"][1], node["scale"][2])
+            # El flag se limpia en update_transforms, que además propaga la matriz de mundo
+            node.local = np.asarray(transform @ translation_matrix @ rotation_matrix @ scale_matrix)
+        return node.local
+
+    def compile(self):
+        """Devuelve la lista de dibujo, recompilándola si cambió la estructura del grafo"""
+        if self._draw_list is None:
+            # Los buffers se indexan por grupo, que cambian al recompilar
+            for instances in self._instance_buffers.values():
+                instances.delete()
+            self._instance_buffers = {}
+            draw_list = DrawList(self.graph, self.graph.graph["root"], self.queue, self.instanced_pipelines, self.min_instances)
+            self._draw_list = draw_list
+            self.transformations = {name: draw_list.world[i] for i, name in enumerate(draw_list.names)}
+            self._dirty_nodes = set(draw_list.names)
+        return self._draw_list
+
+    def update_transforms(self):
+        """
+        Propaga las matrices de mundo. Solo se recalculan los nodos cuya
+        matriz local cambió o que tienen un ancestro que cambió
+        """
+        draw_list = self.compile()
+        if not self._dirty_nodes:
+            return draw_list
+
+        slots = np.array([draw_list.index[name] for name in self._dirty_nodes if name in draw_list.index], dtype=np.int32)
+        self._dirty_nodes.clear()
+
+        # Matrices locales de todos los nodos modificados en un solo paso
+        nodes = [draw_list.nodes[i] for i in slots]
+        transforms = np.array([node["transform"] for node in nodes], dtype=np.float32)
+        positions = np.array([node["position"] for node in nodes], dtype=np.float32)
+        rotations = np.array([node["rotation"] for node in nodes], dtype=np.float32)
+        scales = np.array([node["scale"] for node in nodes], dtype=np.float32)
+        draw_list.local[slots] = tr.matmulBatch([
+            transforms,
+            tr.translateBatch(positions[:, 0], positions[:, 1], positions[:, 2]),
+            tr.rotationYBatch(rotations[:, 1]),
+            tr.rotationXBatch(rotations[:, 0]),
+            tr.rotationZBatch(rotations[:, 2]),
+            tr.scaleBatch(scales[:, 0], scales[:, 1], scales[:, 2])])
+        for slot, node in zip(slots, nodes):
+            node.local = draw_list.local[slot]
+            node._dirty = False
+
+        # Propagación por niveles de profundidad, un matmul por nivel
+        changed = np.zeros(len(draw_list.names), dtype=bool)
+        changed[slots] = True
+        if changed[0]:
+            draw_list.world[0] = draw_list.local[0]
+        for level in draw_list.levels:
+            changed[level] |= changed[draw_list.parents[level]]
+            level = level[changed[level]]
+            if level.size > 0:
+                draw_list.world[level] = draw_list.world[draw_list.parents[level]] @ draw_list.local[level]
+
+        return draw_list
 
     def get_forward(self, node):
-        node = self.graph.nodes[node]
+        if not isinstance(node, NodeData):
+            node = self.graph.nodes[node]
         rotation_matrix = tr.rotationY(node["rotation"][1]) @ tr.rotationX(node["rotation"][0]) @ tr.rotationZ(node["rotation"][2])
         return rotation_matrix @ np.array([0, 0, 1, 0], dtype=np.float32)
 
     def draw(self):
-        root_key = self.graph.graph["root"]
-        edges = list(edge_dfs(self.graph, source=root_key))
-        self.transformations = {root_key: self.get_transform(root_key)}
+        draw_list = self.update_transforms()
+        state = self.state
+        state.begin()
         pointLightIndex = 0
         spotLightIndex = 0
 
-        for src, dst in edges:
-            current_node = self.graph.nodes[dst]
+        """ 
+        Setup de cámara, una vez por cuadro
+        """
+        camera = None
+        view = None
+        projection = None
+        if self.controller is not None and "camera" in self.controller.program_state:
+            camera = self.controller.program_state["camera"]
+            if camera is None:
+                raise ValueError("Camera es None")
+            view = camera.get_view()
+            projection = camera.get_projection()
 
-            if not dst in self.transformations:
-                self.transformations[dst] = self.transformations[src] @ self.get_transform(dst)
+        """ 
+        Setup de luces, antes que cualquier mesh
+        """
+        for dst in draw_list.light_slots:
+            current_node = draw_list.nodes[dst]
+            current_pipeline = draw_list.pipelines[dst]
+            parent_transform = draw_list.world[draw_list.parents[dst]]
+            light = draw_list.lights[dst]
+            current_pipelines = current_pipeline
+            if not isinstance(current_pipeline, list):
+                current_pipelines = [current_pipeline]
+            current_pipelines = current_pipelines + [self.instanced_pipelines[p] for p in current_pipelines if p in self.instanced_pipelines]
 
-            current_pipeline = current_node["pipeline"]
-            if current_pipeline is None:
-                continue
+            for pipeline in current_pipelines:
+                if "u_viewPos" in pipeline.uniforms:
+                    state.set_uniform(pipeline, "u_viewPos", self.controller.program_state["camera"].position[:3])
+                if isinstance(light, DirectionalLight):
+                    if "u_dirLight.direction" in pipeline.uniforms:
+                        state.set_uniform(pipeline, "u_dirLight.direction", (parent_transform @ self.get_forward(current_node))[:3])
+                        state.set_uniform(pipeline, "u_dirLight.ambient", light.ambient)
+                        state.set_uniform(pipeline, "u_dirLight.diffuse", light.diffuse)
+                        state.set_uniform(pipeline, "u_dirLight.specular", light.specular)
+                elif isinstance(light, PointLight):
+                    if "u_numPointLights" in pipeline.uniforms:
+                        state.set_uniform(pipeline, "u_numPointLights", self.num_point_lights)
+                        position = (parent_transform @ np.array([current_node["position"][0], current_node["position"][1], current_node["position"][2], 1], dtype=np.float32))[:3]
+                        prefix = f"u_pointLights[{str(pointLightIndex)}]"
+                        state.set_uniform(pipeline, f"{prefix}.position", position)
+                        state.set_uniform(pipeline, f"{prefix}.ambient", light.ambient)
+                        state.set_uniform(pipeline, f"{prefix}.diffuse", light.diffuse)
+                        state.set_uniform(pipeline, f"{prefix}.specular", light.specular)
+                        state.set_uniform(pipeline, f"{prefix}.constant", light.constant)
+                        state.set_uniform(pipeline, f"{prefix}.linear", light.linear)
+                        state.set_uniform(pipeline, f"{prefix}.quadratic", light.quadratic)
+
+                elif isinstance(light, SpotLight):
+                    if "u_numSpotLights" in pipeline.uniforms:
+                        state.set_uniform(pipeline, "u_numSpotLights", self.num_spot_lights)
+                        position = (parent_transform @ np.array([current_node["position"][0], current_node["position"][1], current_node["position"][2], 1], dtype=np.float32))[:3]
+                        prefix = f"u_spotLights[{str(spotLightIndex)}]"
+                        state.set_uniform(pipeline, f"{prefix}.position", position)
+                        state.set_uniform(pipeline, f"{prefix}.direction", (parent_transform @ self.get_forward(current_node))[:3])
+                        state.set_uniform(pipeline, f"{prefix}.ambient", light.ambient)
+                        state.set_uniform(pipeline, f"{prefix}.diffuse", light.diffuse)
+                        state.set_uniform(pipeline, f"{prefix}.specular", light.specular)
+                        state.set_uniform(pipeline, f"{prefix}.constant", light.constant)
+                        state.set_uniform(pipeline, f"{prefix}.linear", light.linear)
+                        state.set_uniform(pipeline, f"{prefix}.quadratic", light.quadratic)
+                        state.set_uniform(pipeline, f"{prefix}.cutOff", light.cutOff)
+                        state.set_uniform(pipeline, f"{prefix}.outerCutOff", light.outerCutOff)
+
+            if isinstance(light, PointLight):
+                pointLightIndex += 1
+            elif isinstance(light, SpotLight):
+                spotLightIndex += 1
+
+        """
+        Frustum culling, antes de cualquier llamada de dibujo
+        """
+        visible = None
+        if self.frustum_culling and camera is not None:
+            visible = draw_list.cull(camera.get_frustum())
+
+        if self.level_of_detail and camera is not None:
+            draw_list.select_lods(np.reshape(view, (4, 4), order="F"), np.reshape(projection, (4, 4), order="F"), self.lod_hysteresis)
+
+        """
+        Cola de dibujo ordenada por estado
+        """
+        slots = draw_list.mesh_slots
+        pipeline_keys, texture_keys, material_keys = draw_list.pipeline_keys, draw_list.texture_keys, draw_list.material_keys
+        if visible is not None:
+            keep = visible[slots]
+            slots = slots[keep]
+            pipeline_keys, texture_keys, material_keys = pipeline_keys[keep], texture_keys[keep], material_keys[keep]
+
+        if self.sort_draws and len(slots) > 1:
+            depths = np.zeros(len(slots), dtype=np.float32)
+            if camera is not None:
+                view_matrix = np.reshape(view, (4, 4), order="F")
+                positions = draw_list.world[slots, :3, 3]
+                depths = -(positions @ view_matrix[2, :3] + view_matrix[2, 3])
+            slots = self.queue.sort(slots, pipeline_keys, texture_keys, material_keys, depths)
+
+        for dst in slots:
+            current_node = draw_list.nodes[dst]
+            current_pipeline = draw_list.pipelines[dst]
+
+            self.setup_node_state(current_pipeline, current_node, camera, view, projection)
 
-            """ 
-            Setup de luces 
             """
-            if current_node["light"] is not None:
-                current_pipelines = current_pipeline
-                if not isinstance(current_pipeline, list):
-                    current_pipelines = [current_pipeline]
-
-                for pipeline in current_pipelines:
-                    pipeline.use()
-                    if "u_viewPos" in pipeline.uniforms:
-                        pipeline["u_viewPos"] = self.controller.program_state["camera"].position[:3]
-                    if isinstance(current_node["light"], DirectionalLight):
-                        if "u_dirLight.direction" in pipeline.uniforms:
-                            pipeline["u_dirLight.direction"] = (self.transformations[src] @ self.get_forward(dst))[:3]
-                            pipeline["u_dirLight.ambient"] = current_node["light"].ambient
-                            pipeline["u_dirLight.diffuse"] = current_node["light"].diffuse
-                            pipeline["u_dirLight.specular"] = current_node["light"].specular
-                    elif isinstance(current_node["light"], PointLight):
-                        if "u_numPointLights" in pipeline.uniforms:
-                            pipeline["u_numPointLights"] = self.num_point_lights
-                            position = (self.transformations[src] @ np.array([current_node["position"][0], current_node["position"][1], current_node["position"][2], 1], dtype=np.float32))[:3]
-                            pipeline[f"u_pointLights[{str(pointLightIndex)}].position"] = position
-                            pipeline[f"u_pointLights[{str(pointLightIndex)}].ambient"] = current_node["light"].ambient
-                            pipeline[f"u_pointLights[{str(pointLightIndex)}].diffuse"] = current_node["light"].diffuse
-                            pipeline[f"u_pointLights[{str(pointLightIndex)}].specular"] = current_node["light"].specular
-                            pipeline[f"u_pointLights[{str(pointLightIndex)}].constant"] = current_node["light"].constant
-                            pipeline[f"u_pointLights[{str(pointLightIndex)}].linear"] = current_node["light"].linear
-                            pipeline[f"u_pointLights[{str(pointLightIndex)}].quadratic"] = current_node["light"].quadratic
-
-                    elif isinstance(current_node["light"], SpotLight):
-                        if "u_numSpotLights" in pipeline.uniforms:
-                            pipeline["u_numSpotLights"] = self.num_spot_lights
-                            position = (self.transformations[src] @ np.array([current_node["position"][0], current_node["position"][1], current_node["position"][2], 1], dtype=np.float32))[:3]
-                            pipeline[f"u_spotLights[{str(spotLightIndex)}].position"] = position
-                            pipeline[f"u_spotLights[{str(spotLightIndex)}].direction"] = (self.transformations[src] @ self.get_forward(dst))[:3]
-                            pipeline[f"u_spotLights[{str(spotLightIndex)}].ambient"] = current_node["light"].ambient
-                            pipeline[f"u_spotLights[{str(spotLightIndex)}].diffuse"] = current_node["light"].diffuse
-                            pipeline[f"u_spotLights[{str(spotLightIndex)}].specular"] = current_node["light"].specular
-                            pipeline[f"u_spotLights[{str(spotLightIndex)}].constant"] = current_node["light"].constant
-                            pipeline[f"u_spotLights[{str(spotLightIndex)}].linear"] = current_node["light"].linear
-                            pipeline[f"u_spotLights[{str(spotLightIndex)}].quadratic"] = current_node["light"].quadratic
-                            pipeline[f"u_spotLights[{str(spotLightIndex)}].cutOff"] = current_node["light"].cutOff
-                            pipeline[f"u_spotLights[{str(spotLightIndex)}].outerCutOff"] = current_node["light"].outerCutOff
-
-                if isinstance(current_node["light"], PointLight):
-                    pointLightIndex += 1
-                elif isinstance(current_node["light"], SpotLight):
-                    spotLightIndex += 1
+            Setup de Mesh
+            """                
+            current_pipeline["u_model"] = np.reshape(draw_list.world[dst], (16, 1), order="F")
+            mesh = draw_list.meshes[dst]
+            level = draw_list.lod_level[dst]
+            if level > 0:
+                mesh = mesh.lod(level)
+            mesh.draw(current_node["mode"], current_node["cull_face"], current_pipeline)
 
+        """
+        Grupos instanciados
+        """
+        for i, group in enumerate(draw_list.instance_groups):
+            group_slots = group.slots if visible is None else group.slots[visible[group.slots]]
+            if len(group_slots) == 0:
                 continue
+            self.setup_node_state(group.pipeline, group.node, camera, view, projection)
 
-            current_pipeline.use()
-            """ 
-            Setup de cámara 
-            """
-            if "camera" in self.controller.program_state:
-                camera = self.controller.program_state["camera"]
-                if camera is None:
-                    raise ValueError("Camera es None")
-                if "u_view" in current_pipeline.uniforms:
-                    current_pipeline["u_view"] = camera.get_view()
-
-                if "u_projection" in current_pipeline.uniforms:
-                    current_pipeline["u_projection"] = camera.get_projection()
-
-            if current_node["mesh"] is not None:
-                """
-                Setup de Material
-                """
-                if "u_color" in current_pipeline.uniforms:
-                    current_pipeline["u_color"] = np.array(current_node["color"], dtype=np.float32)
-
-                if "u_material.diffuse" in current_pipeline.uniforms:
-                    material = current_node["material"]
-                    if material is None:
-                        raise ValueError("Material es None")
-                    current_pipeline["u_material.diffuse"] = material.diffuse
-                    current_pipeline["u_material.ambient"] = material.ambient
-                    current_pipeline["u_material.specular"] = material.specular
-                    current_pipeline["u_material.shininess"] = material.shininess
-
-                textured = "u_texture" in current_pipeline.uniforms and current_node["texture"] is not None
-                if textured:
-                    current_node["texture"].bind()
-
-                """
-                Setup de Mesh
-                """                
-                current_pipeline["u_model"] = np.reshape(self.transformations[dst], (16, 1), order="F")
-                current_node["mesh"].draw(current_node["mode"], current_node["cull_face"])
-
-                if textured:
-                    current_node["texture"].unbind()
+            # Una llamada por cada nivel de detalle presente en el grupo
+            levels = draw_list.lod_level[group_slots]
+            for level in np.unique(levels):
+                if (i, level) not in self._instance_buffers:
+                    self._instance_buffers[(i, level)] = InstanceBuffer(len(group.slots))
+                instances = self._instance_buffers[(i, level)]
+                instances.update(draw_list.world[group_slots[levels == level]])
+                group.node["mesh"].lod(level).draw_instanced(instances, group.node["mode"], group.node["cull_face"], group.node["pipeline"])
+
+        state.end()
+
+    def setup_node_state(self, pipeline, node, camera, view, projection):
+        state = self.state
+        state.use(pipeline)
+
+        """ 
+        Setup de cámara 
+        """
+        if camera is not None:
+            if "u_view" in pipeline.uniforms:
+                state.set_uniform(pipeline, "u_view", view)
+
+            if "u_projection" in pipeline.uniforms:
+                state.set_uniform(pipeline, "u_projection", projection)
+
+        """
+        Setup de Material
+        """
+        if "u_color" in pipeline.uniforms:
+            state.set_uniform(pipeline, "u_color", np.array(node["color"], dtype=np.float32))
+
+        if "u_material.diffuse" in pipeline.uniforms:
+            material = node["material"]
+            if material is None:
+                raise ValueError("Material es None")
+            state.set_uniform(pipeline, "u_material.diffuse", material.diffuse)
+            state.set_uniform(pipeline, "u_material.ambient", material.ambient)
+            state.set_uniform(pipeline, "u_material.specular", material.specular)
+            state.set_uniform(pipeline, "u_material.shininess", material.shininess)
+
+        if "u_texture" in pipeline.uniforms and node["texture"] is not None:
+            state.bind_texture(node["texture"])
             
     def find_position(self, node_name):
         for src, dst in self.transformations.items():
@@ -2,8 +2,6 @@ import pyglet
 from OpenGL import GL
 import numpy as np
 import sys
-from Box2D import b2PolygonShape, b2World
-import grafica.transformations as tr
 
 # No es necesario este bloque de código si se ejecuta desde la carpeta raíz del repositorio
 # v
@@ -18,6 +16,8 @@ from auxiliares.utils.camera import FreeCamera
 from auxiliares.utils.scene_graph import SceneGraph
 from auxiliares.utils.drawables import Model, Texture, DirectionalLight, PointLight, SpotLight, Material
 from auxiliares.utils.helpers import init_axis, init_pipeline, mesh_from_file, get_path
+from auxiliares.utils.physics_sync import BodySync
+from auxiliares.utils.car_scene import DEMO_FISICAS_SCENE, build_world, apply_controls, step_world
 
 WIDTH = 640
 HEIGHT = 640
@@ -161,77 +161,35 @@ if __name__ == "__main__":
                      ))
     
     ########## Simulación Física ##########
-    world = b2World(gravity=(0, 0))
-
-    # Objetos estáticos
-    wall1_body = world.CreateStaticBody(position=(-10, 0))
-    wall1_body.CreatePolygonFixture(box=(0.5, 10), density=1, friction=1)
-
-    wall2_body = world.CreateStaticBody(position=(10, 0))
-    wall2_body.CreatePolygonFixture(box=(0.5, 10), density=1, friction=1)
-
-    wall3_body = world.CreateStaticBody(position=(0, -10))
-    wall3_body.CreatePolygonFixture(box=(10, 0.5), density=1, friction=1)
-
-    wall4_body = world.CreateStaticBody(position=(0, 10))
-    wall4_body.CreatePolygonFixture(box=(10, 0.5), density=1, friction=1)
-
-    winzone_body = world.CreateStaticBody(position=(0, 8))
-    winzoneFixture = winzone_body.CreateCircleFixture(radius=1, density=1, friction=1)
-    winzoneFixture.sensor = True # No interactúa con otros objetos en la simulación física, solo detecta colisiones
-
-    # Objetos dinámicos
-    zorzal_body = world.CreateDynamicBody(position=(0, -5))
-    zorzal_body.CreatePolygonFixture(box=(0.5, 0.5), density=1, friction=1)
-
-    box_body = world.CreateDynamicBody(position=(-2, -2))
-    box_body.CreatePolygonFixture(box=(0.5, 0.5), density=1, friction=1)
-
-    pyramid_body = world.CreateDynamicBody(position=(2, -2))
-    pyramid_body.CreatePolygonFixture(box=(0.5, 0.5), density=1, friction=1)
-
-    danger_body = world.CreateDynamicBody(position=(0, 5))
-    danger_body.CreateCircleFixture(radius=0.5, density=100, friction=1)
+    # La escena está descrita en auxiliares/utils/car_scene.py, para poder
+    # simularla también sin ventana
+    world, bodies = build_world(DEMO_FISICAS_SCENE)
 
     # Se guardan los cuerpos en el controller para poder acceder a ellos desde el loop de simulación
     controller.program_state["world"] = world
-    controller.program_state["bodies"]["zorzal"] = zorzal_body
-    controller.program_state["bodies"]["box"] = box_body
-    controller.program_state["bodies"]["pyramid"] = pyramid_body
-    controller.program_state["bodies"]["danger"] = danger_body
-    controller.program_state["bodies"]["winzone"] = winzone_body
+    controller.program_state["bodies"].update(bodies)
+
+    # Pares (cuerpo, nodo) que se sincronizan después de cada paso
+    body_sync = BodySync(graph)
+    body_sync.add_many([bodies["zorzal"], bodies["box"], bodies["pyramid"], bodies["danger"]],
+                       ["zorzal", "cube", "pyramid", "danger_sphere"])
 
     #######################################
 
     # Aquí se actualizan los parámetros de la simulación física
     def update_world(dt):
-        world = controller.program_state["world"]
-        world.Step(
-            dt, controller.program_state["vel_iters"], controller.program_state["pos_iters"]
-        )
-        world.ClearForces()
+        step_world(controller.program_state["world"], DEMO_FISICAS_SCENE, dt)
 
     def update(dt):
         controller.program_state["total_time"] += dt
         camera = controller.program_state["camera"]
 
-        # Actualización física del zorzal
         zorzal_body = controller.program_state["bodies"]["zorzal"]
-        graph["zorzal"]["transform"] = tr.translate(zorzal_body.position[0], 0, zorzal_body.position[1]) @ tr.rotationY(-zorzal_body.angle)
-
-        # Actualización física de la caja
-        box_body = controller.program_state["bodies"]["box"]
-        graph["cube"]["transform"] = tr.translate(box_body.position[0], 0, box_body.position[1]) @ tr.rotationY(-box_body.angle)
-
-        # Actualización física de la pirámide
-        pyramid_body = controller.program_state["bodies"]["pyramid"]
-        graph["pyramid"]["transform"] = tr.translate(pyramid_body.position[0], 0, pyramid_body.position[1]) @ tr.rotationY(-pyramid_body.angle)
 
         # Actualización física de la caja peligrosa
         danger_body = controller.program_state["bodies"]["danger"]
         danger_body.position = (5 * np.cos(controller.program_state["total_time"] * 2), 5)
         danger_body.linearVelocity = (10, 10)
-        graph["danger_sphere"]["transform"] = tr.translate(danger_body.position[0], 0, danger_body.position[1]) @ tr.rotationY(-danger_body.angle)
 
         # Check condición de victoria, zorzal en winzone
         winzone_body = controller.program_state["bodies"]["winzone"]
@@ -241,15 +199,9 @@ if __name__ == "__main__":
         
 
         # Modificar la fuerza y el torque del zorzal con las teclas
-        zorzal_forward = np.array([np.sin(-zorzal_body.angle), 0, np.cos(-zorzal_body.angle)])
-        if controller.is_key_pressed(pyglet.window.key.A):
-            zorzal_body.ApplyTorque(-0.5, True)
-        if controller.is_key_pressed(pyglet.window.key.D):
-            zorzal_body.ApplyTorque(0.5, True)
-        if controller.is_key_pressed(pyglet.window.key.W):
-            zorzal_body.ApplyForce((zorzal_forward[0], zorzal_forward[2]), zorzal_body.worldCenter, True)
-        if controller.is_key_pressed(pyglet.window.key.S):
-            zorzal_body.ApplyForce((-zorzal_forward[0], -zorzal_forward[2]), zorzal_body.worldCenter, True)
+        throttle = controller.is_key_pressed(pyglet.window.key.W) - controller.is_key_pressed(pyglet.window.key.S)
+        steer = controller.is_key_pressed(pyglet.window.key.D) - controller.is_key_pressed(pyglet.window.key.A)
+        apply_controls(zorzal_body, throttle, steer, DEMO_FISICAS_SCENE["control"])
 
         camera.position[0] = zorzal_body.position[0] + 2 * np.sin(zorzal_body.angle)
         camera.position[1] = 2
@@ -257,6 +209,8 @@ if __name__ == "__main__":
         camera.yaw = zorzal_body.angle + np.pi / 2
         camera.update()
         update_world(dt)
+        # Todos los nodos de los cuerpos se actualizan juntos
+        body_sync.sync()
 
     @controller.event
     def on_key_press(symbol, modifiers):
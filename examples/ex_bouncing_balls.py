@@ -15,6 +15,7 @@ import grafica.easy_shaders as es
 import grafica.lighting_shaders as ls
 import grafica.performance_monitor as pm
 from grafica.assets_path import getAssetPath
+from auxiliares.utils.colliders import AABB, Sphere
 
 __author__ = "Ivan Sipiran"
 __license__ = "MIT"
@@ -32,24 +33,37 @@ class Controller:
 controller = Controller()
 
 class Ball:
-    def __init__(self, name, v0, p0):
+    def __init__(self, name, v0, p0, radius=0.1):
         self.v0 = v0
         self.p0 = p0
         self.velocity = v0
         self.position = p0
         self.name = name
         self.rest = 0.7
-    
-    def updatePosition(self, gravity, deltaTime):
+        self.collider = Sphere(name, radius)
+        self.collider.set_position(p0)
+
+    def updatePosition(self, gravity, deltaTime, obstacles=()):
         self.velocity += deltaTime * gravity
-        self.position += self.velocity * deltaTime
-    
-    def checkBounce(self):
-        if self.position[1] < 0.01:
-            self.velocity = -self.velocity * self.rest
-        
-        if self.position[1] < 0:
-            self.position[1] = 0
+
+        # Continuous collision detection: the ball moves until its first impact
+        # in this step, bounces, and moves for the remaining time. It cannot go
+        # through the floor even with long steps.
+        remaining = deltaTime
+        for _ in range(4):
+            impacts = [self.collider.sweep(obstacle, self.velocity, dt=remaining) for obstacle in obstacles]
+            impacts = [impact for impact in impacts if impact is not None]
+            if len(impacts) == 0:
+                break
+            toi, normal = min(impacts, key=lambda impact: impact[0])
+            self.position += self.velocity * toi
+            self.velocity -= (1 + self.rest) * np.dot(self.velocity, normal) * normal
+            self.collider.set_position(self.position)
+            remaining -= toi
+
+        self.position += self.velocity * remaining
+        self.collider.set_position(self.position)
+
 
 gravity = np.array([0,-15,0], dtype=np.float32)
 
@@ -203,6 +217,10 @@ if __name__ == "__main__":
     mvpPipeline.setupVAO(gpuAxis)
     gpuAxis.fillBuffers(cpuAxis.vertices, cpuAxis.indices, GL_STATIC_DRAW)
 
+    # The top of the floor is the plane y = 0
+    floor = AABB('floor', np.array([-100, -1, -100]), np.array([100, 0, 100]))
+    floor.set_position([0, 0, 0])
+
     balls = []
     ball1 = Ball('ball1', np.array([0,0,0], dtype=np.float32), np.array([5, 10, 2], dtype=np.float32))
     balls.append(ball1)
@@ -246,10 +264,9 @@ if __name__ == "__main__":
 
         for ball in balls:
             nodeSphere = sg.findNode(dibujo, ball.name)
-            ball.updatePosition(gravity, deltaTime)
+            ball.updatePosition(gravity, deltaTime, [floor])
             pos = ball.position
             nodeSphere.transform=tr.translate(pos[0], pos[1], pos[2])
-            ball.checkBounce()
         
         
         #NOTA: Aquí dibujas tu objeto de escena
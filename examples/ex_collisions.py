@@ -13,6 +13,8 @@ import grafica.basic_shapes as bs
 import grafica.easy_shaders as es
 import grafica.transformations as tr
 import grafica.performance_monitor as pm
+from grafica.circle_physics import CirclePhysics
+from grafica.fixed_timestep import FixedTimestep
 
 __author__ = "Daniel Calderon"
 __license__ = "MIT"
@@ -33,7 +35,8 @@ def createGPUShape(pipeline, shape):
     return gpuShape
 
 class Circle:
-    def __init__(self, pipeline, position, velocity, r, g, b):
+    """Drawing data of one circle; its position is read from a shared array"""
+    def __init__(self, pipeline, positions, index, r, g, b):
         shape = bs.createColorCircle(CIRCLE_DISCRETIZATION, r, g, b)
         # addapting the size of the circle's vertices to have a circle
         # with the desired radius
@@ -41,96 +44,15 @@ class Circle:
         bs.scaleVertices(shape, 6, (scaleFactor, scaleFactor, 1.0))
         self.pipeline = pipeline
         self.gpuShape = createGPUShape(self.pipeline, shape)
-        self.position = position
-        self.radius = RADIUS
-        self.velocity = velocity
-
-    def action(self, gravityAceleration, deltaTime):
-        # Euler integration
-        self.velocity += deltaTime * gravityAceleration
-        self.position += self.velocity * deltaTime
+        self.positions = positions
+        self.index = index
 
     def draw(self):
+        position = self.positions[self.index]
         glUniformMatrix4fv(glGetUniformLocation(self.pipeline.shaderProgram, "transform"), 1, GL_TRUE,
-            tr.translate(self.position[0], self.position[1], 0.0)
+            tr.translate(position[0], position[1], 0.0)
         )
         self.pipeline.drawCall(self.gpuShape)
-    
-
-def rotate2D(vector, theta):
-    """
-    Direct application of a 2D rotation
-    """
-    sin_theta = np.sin(theta)
-    cos_theta = np.cos(theta)
-
-    return np.array([
-        cos_theta * vector[0] - sin_theta * vector[1],
-        sin_theta * vector[0] + cos_theta * vector[1]
-    ], dtype = np.float32)
-
-
-def collide(circle1, circle2):
-    """
-    If there are a collision between the circles, it modifies the velocity of
-    both circles in a way that preserves energy and momentum.
-    """
-    
-    assert isinstance(circle1, Circle)
-    assert isinstance(circle2, Circle)
-
-    normal = circle2.position - circle1.position
-    normal /= np.linalg.norm(normal)
-
-    circle1MovingToNormal = np.dot(circle2.velocity, normal) > 0.0
-    circle2MovingToNormal = np.dot(circle1.velocity, normal) < 0.0
-
-    if not (circle1MovingToNormal and circle2MovingToNormal):
-
-        # obtaining the tangent direction
-        tangent = rotate2D(normal, np.pi/2.0)
-
-        # Projecting the velocity vector over the normal and tangent directions
-        # for both circles, 1 and 2.
-        v1n = np.dot(circle1.velocity, normal) * normal
-        v1t = np.dot(circle1.velocity, tangent) * tangent
-
-        v2n = np.dot(circle2.velocity, normal) * normal
-        v2t = np.dot(circle2.velocity, tangent) * tangent
-
-        # swaping the normal components...
-        # this means that we applying energy and momentum conservation
-        circle1.velocity = v2n + v1t
-        circle2.velocity = v1n + v2t
-
-
-def areColliding(circle1, circle2):
-    assert isinstance(circle1, Circle)
-    assert isinstance(circle2, Circle)
-
-    difference = circle2.position - circle1.position
-    distance = np.linalg.norm(difference)
-    collisionDistance = circle2.radius + circle1.radius
-    return distance < collisionDistance
-
-
-def collideWithBorder(circle):
-
-    # Right
-    if circle.position[0] + circle.radius > 1.0:
-        circle.velocity[0] = -abs(circle.velocity[0])
-
-    # Left
-    if circle.position[0] < -1.0 + circle.radius:
-        circle.velocity[0] = abs(circle.velocity[0])
-
-    # Top
-    if circle.position[1] > 1.0 - circle.radius:
-        circle.velocity[1] = -abs(circle.velocity[1])
-
-    # Bottom
-    if circle.position[1] < -1.0 + circle.radius:
-        circle.velocity[1] = abs(circle.velocity[1])
 
 
 # A class to store the application control
@@ -197,19 +119,42 @@ if __name__ == "__main__":
     # Setting up the clear screen color
     glClearColor(0.15, 0.15, 0.15, 1.0)
 
+    # Positions and velocities of all circles are stored together,
+    # so the physics is computed for all of them at once
+    positions = np.array([
+        [random.uniform(-1.0 + RADIUS, 1.0 - RADIUS), random.uniform(-1.0 + RADIUS, 1.0 - RADIUS)]
+        for i in range(NUMBER_OF_CIRCLES)
+    ])
+    velocities = np.array([
+        [random.uniform(-1.0, 1.0), random.uniform(-1.0, 1.0)]
+        for i in range(NUMBER_OF_CIRCLES)
+    ])
+    physics = CirclePhysics(positions, velocities, RADIUS)
+
+    gravityAcceleration = np.array([0.0, -1.0], dtype=np.float32)
+    noGravityAcceleration = np.array([0.0, 0.0], dtype=np.float32)
+
+    def physicsStep(deltaTime):
+        # moving each circle, processing collisions against the border
+        # and, if enabled, collisions among circles
+        acceleration = gravityAcceleration if controller.useGravity else noGravityAcceleration
+        physics.step(deltaTime, acceleration, controller.circleCollisions)
+
+    # Physics always advances in steps of 1/120 s, whatever the frame rate.
+    # Circles are drawn at positions interpolated between the last two steps
+    simulation = FixedTimestep(physicsStep, timeStep=1.0 / 120.0, maxSubsteps=8)
+    renderPositions = physics.positions.copy()
+
+    def copyPositions(state):
+        renderPositions[:] = state
+
+    simulation.addInterpolator(lambda: physics.positions, copyPositions)
+
     # Creating shapes on GPU memory
     circles = []
     for i in range(NUMBER_OF_CIRCLES):
-        position = np.array([
-            random.uniform(-1.0 + RADIUS, 1.0 - RADIUS),
-            random.uniform(-1.0 + RADIUS, 1.0 - RADIUS)
-        ])
-        velocity = np.array([
-            random.uniform(-1.0, 1.0),
-            random.uniform(-1.0, 1.0)
-        ])
         r, g, b = random.uniform(0,1), random.uniform(0,1), random.uniform(0,1)
-        circle = Circle(pipeline, position, velocity, r, g, b)
+        circle = Circle(pipeline, renderPositions, i, r, g, b)
         circles += [circle]
 
     perfMonitor = pm.PerformanceMonitor(glfw.get_time(), 0.5)
@@ -217,9 +162,6 @@ if __name__ == "__main__":
     # glfw will swap buffers as soon as possible
     glfw.swap_interval(0)
 
-    gravityAcceleration = np.array([0.0, -1.0], dtype=np.float32)
-    noGravityAcceleration = np.array([0.0, 0.0], dtype=np.float32)
-
     # Application loop
     while not glfw.window_should_close(window):
 
@@ -234,25 +176,8 @@ if __name__ == "__main__":
         theta = glfw.get_time()
         deltaTime = perfMonitor.getDeltaTime()
 
-        if controller.useGravity:
-            acceleration = gravityAcceleration
-        else:
-            acceleration = noGravityAcceleration
-        
         # Physics!
-        for circle in circles:
-            # moving each circle
-            circle.action(acceleration, deltaTime)
-
-            # checking and processing collisions against the border
-            collideWithBorder(circle)
-
-        # checking and processing collisions among circles
-        if controller.circleCollisions:
-            for i in range(len(circles)):
-                for j in range(i+1, len(circles)):
-                    if areColliding(circles[i], circles[j]):
-                        collide(circles[i], circles[j])
+        simulation.advance(deltaTime)
 
         # Clearing the screen
         glClear(GL_COLOR_BUFFER_BIT)
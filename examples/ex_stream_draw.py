@@ -8,8 +8,7 @@ import numpy as np
 import math
 import sys, os.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from grafica.gpu_shape import GPUShape, SIZE_IN_BYTES
-import grafica.basic_shapes as bs
+from grafica.gpu_shape import StreamingShape
 import grafica.easy_shaders as es
 
 __author__ = "Daniel Calderon"
@@ -49,55 +48,46 @@ def cursor_pos_callback(window, x, y):
     controller.mousePos = (x,y)
 
 
-def createVertices(N, maxPerturbationSize, time, normalizedMousePos):
+def createVertices(N, maxPerturbationSize, time, normalizedMousePos, out=None):
+    """
+    Fills out, a (N + 1, 6) float32 array, with positions and colors.
+    The same array is reused every frame, no python lists are created.
+    """
+    if out is None:
+        out = np.empty((N + 1, 6), dtype=np.float32)
 
     numberOfPerturbations = 20 * normalizedMousePos[0]
     perturbationSize = maxPerturbationSize * normalizedMousePos[1]
 
     # First vertex at the center
-    vertices = [0.0, 0.0, 0.0, 1.0, 1.0, 1.0]
+    out[0] = [0.0, 0.0, 0.0, 1.0, 1.0, 1.0]
 
-    dtheta = 2 * math.pi / N
+    theta = np.arange(N) * (2 * math.pi / N)
+    smallPerturbation = perturbationSize * math.sin(4 * time) * np.cos(numberOfPerturbations * theta)
+    radious = 0.7 + smallPerturbation
 
-    for i in range(N):
-        theta = i * dtheta
+    # vertex coordinates
+    out[1:, 0] = radious * np.cos(theta)
+    out[1:, 1] = radious * np.sin(theta)
+    out[1:, 2] = 0
 
-        radialDirection = np.array([math.cos(theta), math.sin(theta)])
-        smallPerturbation = perturbationSize * math.sin(4 * time) * math.cos(numberOfPerturbations * theta)
-        radious = 0.7 + smallPerturbation
+    # color generates varying between 0 and 1
+    out[1:, 3] = np.sin(theta + 3 * time)
+    out[1:, 4] = np.cos(theta + 3 * time)
+    out[1:, 5] = 0
 
-        xCoord = radious * radialDirection[0]
-        yCoord = radious * radialDirection[1]
-
-        vertices += [
-            # vertex coordinates
-            xCoord, yCoord, 0,
-
-            # color generates varying between 0 and 1
-            math.sin(theta + 3 * time),       math.cos(theta + 3 * time), 0]
-
-    return vertices
+    return out
 
 
 def createIndices(N):
 
-    indices = []
-    for i in range(N):
-        # A triangle is created using the center, this and the next vertex
-        indices += [0, i, i+1]
+    # A triangle is created using the center, this and the next vertex
+    i = np.arange(N, dtype=np.uint32)
+    indices = np.stack([np.zeros(N, dtype=np.uint32), i, i + 1], axis=1)
 
     # The final triangle connects back to the second vertex
-    indices += [0, N, 1]
+    return np.concatenate([indices.ravel(), np.array([0, N, 1], dtype=np.uint32)])
 
-    return indices
-
-
-def createShape(N, maxPerturbationSize, time, normalizedMousePos):
-    vertices = createVertices(N, maxPerturbationSize, time, normalizedMousePos)
-    indices = createIndices(N)
-    
-    return bs.Shape(vertices, indices)
-    
 
 if __name__ == "__main__":
 
@@ -125,11 +115,14 @@ if __name__ == "__main__":
     glUseProgram(pipeline.shaderProgram)
 
     # Creating shapes on GPU memory
-    shape = createShape(200, 15, 0.0, (0,0))
-    gpuShape = es.GPUShape().initBuffers()
-    pipeline.setupVAO(gpuShape)
-    # We use stream as we will be changing the vertex data on each frame
-    gpuShape.fillBuffers(shape.vertices, shape.indices, GL_STREAM_DRAW)
+    # A ring of buffers, as we will be changing the vertex data on each frame.
+    # The indices never change, so they are written only once
+    N = 200
+    vertices = createVertices(N, 15, 0.0, (0,0))
+    indices = createIndices(N)
+    gpuShape = StreamingShape(pipeline, vertices.size, indices.size)
+    gpuShape.fillIndices(indices)
+    gpuShape.update(vertices)
     
     # Setting up the clear screen color
     glClearColor(0.15, 0.15, 0.15, 1.0)
@@ -154,12 +147,10 @@ if __name__ == "__main__":
             controller.mousePos[1] / height
         )
 
-        # A better approach is to generate the vertices directly into the numpy array.
+        # The vertices are generated directly into the numpy array,
         # python lists are always expensive...
-        vertices = createVertices(200, 0.2, time, normalizedMousePos)
-        vertexData = np.array(vertices, dtype=np.float32)
-        glBindBuffer(GL_ARRAY_BUFFER, gpuShape.vbo)
-        glBufferData(GL_ARRAY_BUFFER, len(vertexData) * SIZE_IN_BYTES, vertexData, GL_STREAM_DRAW)
+        createVertices(N, 0.2, time, normalizedMousePos, vertices)
+        gpuShape.update(vertices)
 
         # Drawing the Quad as specified in the VAO with the active shader program
         pipeline.drawCall(gpuShape)
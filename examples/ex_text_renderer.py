@@ -16,6 +16,7 @@ import grafica.easy_shaders as es
 import grafica.performance_monitor as pm
 import grafica.text_renderer as tx
 from grafica.assets_path import getAssetPath
+from grafica.gpu_shape import StreamingShape
 
 __author__ = "Daniel Calderon"
 __license__ = "MIT"
@@ -115,12 +116,14 @@ if __name__ == "__main__":
     timeStr = now.strftime("%H:%M:%S.%f")[:-3]
     dateShape = tx.textToShape(dateStr, dateCharSize, dateCharSize)
     timeShape = tx.textToShape(timeStr, timeCharSize, timeCharSize)
-    gpuDate = es.GPUShape().initBuffers()
-    gpuTime = es.GPUShape().initBuffers()
-    textPipeline.setupVAO(gpuDate)
-    textPipeline.setupVAO(gpuTime)
-    gpuDate.fillBuffers(dateShape.vertices, dateShape.indices, GL_STATIC_DRAW)
-    gpuTime.fillBuffers(timeShape.vertices, timeShape.indices, GL_STATIC_DRAW)
+    # Date and time change every frame, but they always have the same number
+    # of characters: only the vertices are written again, in a ring of buffers
+    gpuDate = StreamingShape(textPipeline, len(dateShape.vertices), len(dateShape.indices))
+    gpuTime = StreamingShape(textPipeline, len(timeShape.vertices), len(timeShape.indices))
+    gpuDate.fillIndices(dateShape.indices)
+    gpuTime.fillIndices(timeShape.indices)
+    gpuDate.update(dateShape.vertices)
+    gpuTime.update(timeShape.vertices)
     gpuDate.texture = gpuText3DTexture
     gpuTime.texture = gpuText3DTexture
 
@@ -166,8 +169,8 @@ if __name__ == "__main__":
         timeShape = tx.textToShape(timeStr, timeCharSize, timeCharSize)
 
         # Updating GPU memory...
-        gpuDate.fillBuffers(dateShape.vertices, dateShape.indices, GL_STREAM_DRAW)
-        gpuTime.fillBuffers(timeShape.vertices, timeShape.indices, GL_STREAM_DRAW)
+        gpuDate.update(dateShape.vertices)
+        gpuTime.update(timeShape.vertices)
 
         if now.second != second:
             second = now.second
@@ -1,14 +1,12 @@
 import os
 import sys
-from itertools import chain
 from pathlib import Path
 
 import numpy as np
 import pyglet
 
 from pyglet.graphics.shader import Shader, ShaderProgram
-from cloth_utils import Cloth
-from pyglet.math import Vec2
+from cloth_utils import VerletClothGrid
 
 sys.path.append(
     os.path.dirname(os.path.dirname(os.path.dirname((os.path.abspath(__file__)))))
@@ -16,6 +14,7 @@ sys.path.append(
 
 
 import grafica.transformations as tr
+from grafica.fixed_timestep import FixedTimestep
 
 if __name__ == "__main__":
     width, height = 1920, 1080
@@ -52,40 +51,38 @@ if __name__ == "__main__":
     pipeline["projection"] = projection.reshape(16, 1, order="F")
     pipeline["view"] = view.reshape(16, 1, order="F")
 
-    win.cloth = Cloth(
-        width, height, Vec2(half_width - horizontal_resolution * spacing // 2, height * 0.95), horizontal_resolution, vertical_resolution, spacing
+    win.cloth = VerletClothGrid(
+        width, height, (half_width - horizontal_resolution * spacing // 2, height * 0.95), horizontal_resolution, vertical_resolution, spacing
     )
 
     win.node_data = pipeline.vertex_list(
-        len(win.cloth.vertices), pyglet.gl.GL_POINTS, position="f"
+        len(win.cloth.positions), pyglet.gl.GL_POINTS, position="f"
     )
 
     win.joint_data = pipeline.vertex_list_indexed(
-        len(win.cloth.vertices),
+        len(win.cloth.positions),
         pyglet.gl.GL_LINES,
-        tuple(chain(*(j for j in win.cloth.joints))),
+        win.cloth.joints.ravel(),
         position="f",
     )
 
-    def update_cloth_system(dt, win):
-        win.cloth.update(dt)
+    def write_cloth(positions):
+        # Escribe directo sobre la copia local del buffer, que pyglet sube al dibujar
+        win.cloth.write_positions(win.node_data.position, positions)
+        win.cloth.write_positions(win.joint_data.position, positions)
+
+    # La tela siempre avanza en pasos de 1/60 s, aunque cambien los fps;
+    # se dibuja interpolando entre los dos últimos pasos
+    win.simulation = FixedTimestep(win.cloth.update, timeStep=1/60, maxSubsteps=4)
+    win.simulation.addInterpolator(lambda: win.cloth.positions, write_cloth)
 
     @win.event
     def on_draw():
         win.clear()
-        
-        win.node_data.position[:] = tuple(
-            chain(*((p.position[0], p.position[1], 0.0) for p in win.cloth.vertices))
-        )
-
-        win.joint_data.position[:] = tuple(
-            chain(*((p.position[0], p.position[1], 0.0) for p in win.cloth.vertices))
-        )
-
         pipeline.use()
         win.node_data.draw(pyglet.gl.GL_POINTS)
         win.joint_data.draw(pyglet.gl.GL_LINES)
 
 
-    pyglet.clock.schedule(update_cloth_system, win)
+    pyglet.clock.schedule(win.simulation)
     pyglet.app.run()
@@ -1,3 +1,4 @@
+import numpy as np
 from pyglet.math import Vec2
 # based on https://github.com/Josephbakulikira/Cloth-Simulation-With-python---Verlet-Integration/
 # no funciona completamente! por qué crees que sucede?
@@ -111,3 +112,133 @@ def Cloth(width, height, position, horiz, vertiz, t, vertical=True, horizontal=T
 
 
     return ClothSystem(vertices, joints, static, width, height)
+
+
+def color_joints(joints, vertex_count):
+    """
+    Reparte los resortes en grupos en los que ningún vértice aparece dos
+    veces (coloreo greedy). Retorna una lista de arreglos de índices de joints
+    """
+    used = [0] * vertex_count
+    colors = []
+    for a, b in joints.tolist():
+        # El menor color que no usa ningún otro resorte de a ni de b
+        mask = used[a] | used[b]
+        color = (~mask & (mask + 1)).bit_length() - 1
+        used[a] |= 1 << color
+        used[b] |= 1 << color
+        colors.append(color)
+    colors = np.array(colors, dtype=np.int32)
+    return [np.flatnonzero(colors == color) for color in range(colors.max(initial=-1) + 1)]
+
+
+class VerletCloth:
+    """
+    Versión vectorizada de ClothSystem. Los datos se guardan como arreglos
+    de numpy (structure of arrays) en vez de objetos Point:
+
+    - positions, previous: (N, 2) posiciones actuales y del paso anterior
+    - pinned: (N,) True para los vértices fijos
+    - joints: (M, 2) índices de los vértices unidos por cada resorte
+    - rest: (M,) largo en reposo de cada resorte
+    """
+    def __init__(self, positions, joints, pinned, bound_width=640, bound_height=480,
+                 substeps=8, iterations=1, damping=0.01, gravity=(0.0, -9.8 * 100)):
+        self.positions = np.array(positions, dtype=np.float32).reshape(-1, 2)
+        self.previous = self.positions.copy()
+        self.joints = np.array(joints, dtype=np.int32).reshape(-1, 2)
+        self.pinned = np.zeros(len(self.positions), dtype=bool)
+        self.pinned[pinned] = True
+
+        self.bound_width = bound_width
+        self.bound_height = bound_height
+        # Varios pasos cortos con una iteración cada uno sostienen mejor los
+        # resortes que un paso largo con varias iteraciones, al mismo costo
+        self.substeps = substeps
+        self.iterations = iterations
+        self.damping = damping
+        self.gravity = np.array(gravity, dtype=np.float32)
+
+        src, dst = self.joints[:, 0], self.joints[:, 1]
+        self.rest = np.linalg.norm(self.positions[dst] - self.positions[src], axis=1)
+
+        # Un vértice fijo no se mueve, así que el resorte corrige solo al otro
+        # extremo. src se mueve hacia dst y dst hacia src
+        self.weights = (~self.pinned).astype(np.float32)
+        weight_sum = self.weights[src] + self.weights[dst]
+        weight_sum[weight_sum == 0] = 1
+        src_share = (self.weights[src] / weight_sum)[:, None]
+        dst_share = (self.weights[dst] / weight_sum)[:, None]
+
+        # Grupos de resortes sin vértices en común: dentro de un grupo las
+        # correcciones no se pisan y se aplican todas de una vez (Gauss-Seidel
+        # por colores), y cada grupo ya ve las posiciones corregidas por el anterior
+        self.batches = []
+        for batch in color_joints(self.joints, len(self.positions)):
+            ends = np.concatenate((src[batch], dst[batch]))
+            shares = np.concatenate((src_share[batch], -dst_share[batch]))
+            self.batches.append((ends, self.rest[batch], shares))
+
+    def update(self, dt, relaxation=1.0):
+        # Con pasos muy largos (p. ej. al mover la ventana) la integración explota
+        dt = min(dt, 1.0 / 30.0)
+
+        dt /= self.substeps
+        # damping es por paso completo, se reparte entre los subpasos
+        keep = (1.0 - self.damping) ** (1.0 / self.substeps)
+        for _ in range(self.substeps):
+            velocity = (self.positions - self.previous) * keep
+            self.previous[:] = self.positions
+            self.positions += (velocity + self.gravity * dt * dt) * self.weights[:, None]
+
+            for _ in range(self.iterations):
+                self.relax(relaxation)
+
+        np.clip(self.positions[:, 0], 0, self.bound_width, out=self.positions[:, 0])
+        np.clip(self.positions[:, 1], 0, self.bound_height, out=self.positions[:, 1])
+
+    def relax(self, relaxation=1.0):
+        """Una iteración de Gauss-Seidel sobre todas las restricciones de distancia, un grupo a la vez"""
+        positions = self.positions
+        for ends, rest, shares in self.batches:
+            # take es bastante más rápido que positions[indices] para filas completas
+            ends_positions = np.take(positions, ends, axis=0)
+            count = len(rest)
+            delta = ends_positions[count:] - ends_positions[:count]
+            length = np.maximum(np.sqrt(np.einsum("ij,ij->i", delta, delta)), 1e-6)
+            correction = delta * (relaxation * (1.0 - rest / length))[:, None]
+            # Ningún vértice se repite en ends, así que se puede asignar con índices
+            positions[ends] = ends_positions + np.concatenate((correction, correction)) * shares
+
+    def write_positions(self, target, positions=None):
+        """
+        Copia las posiciones (por defecto, las actuales) a target, un arreglo
+        plano con (x, y, z) por vértice como vertex_list.position, sin pasar
+        por tuplas de Python
+        """
+        view = np.asarray(target).reshape(-1, 3)
+        view[:, :2] = self.positions if positions is None else positions
+        view[:, 2] = 0.0
+
+
+def VerletClothGrid(width, height, position, horiz, vertiz, t, vertical=True, horizontal=True, Diagonal1=True, Diagonal2=True, **kwargs):
+    """Igual que Cloth, pero crea un VerletCloth que cuelga hacia abajo desde position"""
+    x, y = position[0], position[1]
+    i, j = np.meshgrid(np.arange(horiz), np.arange(vertiz))
+    positions = np.stack([x + i.ravel() * t, y - j.ravel() * t], axis=1)
+
+    index = np.arange(horiz * vertiz).reshape(vertiz, horiz)
+    joints = [np.zeros((0, 2), dtype=np.int32)]
+
+    if horizontal:
+        joints.append(np.stack([index[:, :-1].ravel(), index[:, 1:].ravel()], axis=1))
+    if vertical:
+        joints.append(np.stack([index[:-1, :].ravel(), index[1:, :].ravel()], axis=1))
+    if Diagonal1:
+        joints.append(np.stack([index[:-1, :-1].ravel(), index[1:, 1:].ravel()], axis=1))
+    if Diagonal2:
+        joints.append(np.stack([index[:-1, 1:].ravel(), index[1:, :-1].ravel()], axis=1))
+
+    pinned = [0, horiz // 2, horiz - 1]
+
+    return VerletCloth(positions, np.concatenate(joints, axis=0), pinned, width, height, **kwargs)
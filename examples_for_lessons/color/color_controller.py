@@ -10,6 +10,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(
 import grafica.basic_shapes as bs
 import grafica.easy_shaders as es
 import grafica.transformations as tr
+import grafica.static_batch as sb
 
 
 class Controller(pyglet.window.Window):
@@ -32,44 +33,50 @@ class Controller(pyglet.window.Window):
         glUseProgram(self.pipeline.shaderProgram)
         
         self.quads = np.zeros(shape=(rows, columns, 3), dtype=float)
-        self.gpuQuads = np.zeros(shape=(rows, columns), dtype=es.GPUShape)
+        # All the quads live in a single buffer, drawn with one drawCall
+        self.gpuQuads = es.GPUShape().initBuffers()
+        self.pipeline.setupVAO(self.gpuQuads)
+        self.transforms = self.quad_transforms()
         self.set_random_colors()
         self.update_colors()
    
 
-    def set_random_colors(self):
-        for i in range(len(self.gpuQuads)):
-            for j in range(len(self.gpuQuads[0])):
-                self.quads[i, j, :] = np.random.rand(3)
-
-    def update_colors(self):
-        for i in range(len(self.gpuQuads)):
-            for j in range(len(self.gpuQuads[0])):
-                shapeQuad = bs.createColorQuad(*self.quads[i, j, :])
-                self.gpuQuads[i, j] = es.GPUShape().initBuffers()
-                self.pipeline.setupVAO(self.gpuQuads[i, j])
-                self.gpuQuads[i, j].fillBuffers(shapeQuad.vertices, shapeQuad.indices, GL_STATIC_DRAW)        
-
-    def draw_quads(self):
+    def quad_transforms(self):
         SCALE_FACTOR_X = 2.0 / self.rows
         SCALE_FACTOR_Y = 2.0 / self.cols
         delta = 0.01 # So lines can be appreciated
-        for i in range(len(self.gpuQuads)):
-            for j in range(len(self.gpuQuads[0])):
+        transforms = []
+        for i in range(self.rows):
+            for j in range(self.cols):
                 translation = tr.translate(1.0 / self.rows + (SCALE_FACTOR_X + delta) * (i - self.rows/2),
                                            1.0 / self.cols + (SCALE_FACTOR_Y + delta) * (self.cols / 2 - j - 1),
                                            0.0
                                            )
-                glUniformMatrix4fv(
-                    glGetUniformLocation(self.pipeline.shaderProgram, "transform"), 
-                    1,
-                    GL_TRUE,
-                    tr.matmul([
-                        translation,
-                        tr.scale(SCALE_FACTOR_X, SCALE_FACTOR_Y, 1.0),
-                    ])
-                )
-                self.pipeline.drawCall(self.gpuQuads[i, j])
+                transforms.append(tr.matmul([
+                    translation,
+                    tr.scale(SCALE_FACTOR_X, SCALE_FACTOR_Y, 1.0),
+                ]))
+        return transforms
+
+    def set_random_colors(self):
+        for i in range(self.rows):
+            for j in range(self.cols):
+                self.quads[i, j, :] = np.random.rand(3)
+
+    def update_colors(self):
+        # The transforms are applied to the vertices here, once
+        shapeQuads = [bs.createColorQuad(*self.quads[i, j, :]) for i in range(self.rows) for j in range(self.cols)]
+        shape = sb.mergeShapes(shapeQuads, 6, self.transforms)
+        self.gpuQuads.fillBuffers(shape.vertices, shape.indices, GL_STATIC_DRAW)
+
+    def draw_quads(self):
+        glUniformMatrix4fv(
+            glGetUniformLocation(self.pipeline.shaderProgram, "transform"), 
+            1,
+            GL_TRUE,
+            tr.identity()
+        )
+        self.pipeline.drawCall(self.gpuQuads)
 
     def set_color_for_quad(self, i, j, r, g, b):
         self.quads[i, j, :] = r, g, b
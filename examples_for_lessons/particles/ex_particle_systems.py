@@ -1,7 +1,5 @@
 import os
 import sys
-from collections import deque
-from itertools import chain
 from pathlib import Path
 
 import numpy as np
@@ -24,21 +22,8 @@ sys.path.append(
 
 
 import grafica.transformations as tr
-
-
-class Particle(object):
-    def __init__(self, position, ttl):
-        self.position = np.array(position, dtype=np.float32)
-        self.ttl = ttl
-        self.velocity = np.array([0, -50, 0], dtype=np.float32)
-
-    def step(self, dt):
-        self.ttl = self.ttl - dt
-        # método de Euler
-        self.position = self.position + dt * self.velocity
-
-    def alive(self):
-        return bool(self.ttl > 0)
+from grafica.fixed_timestep import FixedTimestep
+from particle_utils import ParticleSystem, ParticleBuffer
 
 
 if __name__ == "__main__":
@@ -74,14 +59,15 @@ if __name__ == "__main__":
     pipeline["view"] = view.reshape(16, 1, order="F")
     pipeline["max_ttl"] = 3
 
-    # nuestra colección de partículas.
-    # ¿por qué es una deque (cola)?
-    win.particles = deque()
-    # los datos que tendremos en la GPU. los gestionaremos con pyglet
-    win.particle_data = None
-    
+    # nuestra colección de partículas: arreglos de numpy de tamaño fijo.
+    # ¿qué pasa cuando se llena?
+    win.particles = ParticleSystem(capacity=100000)
+    # los datos que tendremos en la GPU. se crean una sola vez con la
+    # capacidad máxima y cada frame solo se suben y dibujan las vivas
+    win.particle_data = ParticleBuffer(pipeline, win.particles)
+
     def add_particle(x, y):
-        win.particles.append(Particle((x, y, 0.0), 3))
+        win.particles.emit(1, (x, y, 0.0), velocity=(0.0, -50.0, 0.0), ttl=3)
 
     @win.event
     def on_draw():
@@ -91,36 +77,18 @@ if __name__ == "__main__":
         glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
 
         pipeline.use()
-        if win.particle_data is not None:
-            win.particle_data.draw(pyglet.gl.GL_POINTS)
+        win.particle_data.draw()
 
     @win.event
     def on_mouse_motion(x, y, dx, dy):
         add_particle(x, y)
 
+    # las partículas avanzan en pasos fijos de 1/60 s, sin importar los fps
+    win.simulation = FixedTimestep(win.particles.update, timeStep=1/60, maxSubsteps=4)
+
     def update_particle_system(dt, win):
-        to_remove = 0
-        for i, p in enumerate(win.particles):
-            p.step(dt)
-
-            if not p.alive():
-                to_remove += 1
-
-        for i in range(to_remove):
-            win.particles.popleft()
-
-        if win.particle_data is not None:
-            win.particle_data.delete()
-            win.particle_data = None
-
-        if len(win.particles) > 0:
-            win.particle_data = pipeline.vertex_list(
-                len(win.particles), pyglet.gl.GL_POINTS, position="f", ttl="f"
-            )
-            win.particle_data.position[:] = tuple(
-                chain(*(p.position for p in win.particles))
-            )
-            win.particle_data.ttl[:] = tuple(p.ttl for p in win.particles)
+        if win.simulation.advance(dt) > 0:
+            win.particle_data.write()
 
     pyglet.clock.schedule(update_particle_system, win)
     pyglet.app.run()
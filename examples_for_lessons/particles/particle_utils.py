@@ -0,0 +1,142 @@
+import ctypes
+import numpy as np
+from OpenGL.GL import glGenVertexArrays, glDeleteVertexArrays, glBindVertexArray, glGenBuffers, glDeleteBuffers, \
+    glBindBuffer, glBufferData, glBufferSubData, glGetAttribLocation, glEnableVertexAttribArray, glVertexAttribPointer, \
+    glDrawArrays, GL_ARRAY_BUFFER, GL_STREAM_DRAW, GL_FLOAT, GL_FALSE, GL_POINTS
+
+
+class ParticleSystem:
+    """
+    Sistema de partículas de capacidad fija. Cada atributo es un arreglo de
+    numpy con una fila por partícula (structure of arrays).
+
+    Las partículas vivas ocupan siempre las primeras alive_count filas, de
+    la más antigua a la más nueva: las nuevas se agregan al final y las que
+    mueren se eliminan compactando los arreglos. Así update, la subida a la
+    GPU y el dibujo cuestan según las partículas vivas y no según capacity.
+    Si no hay espacio, las nuevas reemplazan a las más antiguas.
+    """
+    def __init__(self, capacity=100000, gravity=(0.0, 0.0, 0.0), drag=0.0):
+        self.capacity = capacity
+        self.gravity = np.array(gravity, dtype=np.float32)
+        self.drag = drag
+        # Funciones force(position, velocity) -> aceleración (N, 3)
+        self.forces = []
+
+        self.position = np.zeros((capacity, 3), dtype=np.float32)
+        self.velocity = np.zeros((capacity, 3), dtype=np.float32)
+        self.color = np.ones((capacity, 4), dtype=np.float32)
+        self.size = np.zeros(capacity, dtype=np.float32)
+        self.ttl = np.zeros(capacity, dtype=np.float32)
+
+        self.alive_count = 0
+
+    def _attributes(self):
+        return (self.position, self.velocity, self.color, self.size, self.ttl)
+
+    def emit(self, count, position, velocity=(0.0, 0.0, 0.0), ttl=3.0, color=(1.0, 1.0, 1.0, 1.0), size=15.0, spread=0.0):
+        """
+        Crea count partículas. Cada argumento puede ser un valor para todas
+        o un arreglo con uno por partícula; spread agrega una velocidad al
+        azar de esa magnitud en x e y
+        """
+        if count <= 0:
+            return
+        count = min(count, self.capacity)
+
+        # Sin espacio: se descartan las más antiguas, que están al inicio
+        overflow = self.alive_count + count - self.capacity
+        if overflow > 0:
+            keep = self.alive_count - overflow
+            for attribute in self._attributes():
+                attribute[:keep] = attribute[overflow:self.alive_count]
+            self.alive_count = keep
+
+        slots = slice(self.alive_count, self.alive_count + count)
+        self.alive_count += count
+
+        self.position[slots] = position
+        self.velocity[slots] = velocity
+        if spread > 0:
+            self.velocity[slots, :2] += np.random.uniform(-spread, spread, (count, 2))
+        self.ttl[slots] = ttl
+        self.color[slots] = color
+        self.size[slots] = size
+
+    def update(self, dt):
+        alive = self.alive_count
+        if alive == 0:
+            return
+        position, velocity, ttl = self.position[:alive], self.velocity[:alive], self.ttl[:alive]
+
+        # Método de Euler para todas las partículas vivas a la vez
+        acceleration = self.gravity - self.drag * velocity
+        for force in self.forces:
+            acceleration += force(position, velocity)
+
+        velocity += acceleration * dt
+        position += velocity * dt
+        ttl -= dt
+
+        # Compacta las vivas al inicio, sin cambiar su orden
+        living = ttl > 0
+        self.alive_count = int(np.count_nonzero(living))
+        if self.alive_count < alive:
+            for attribute in self._attributes():
+                attribute[:self.alive_count] = attribute[:alive][living]
+
+
+class ParticleBuffer:
+    """
+    Datos de un ParticleSystem en la GPU, para un pipeline con los atributos
+    position, color, size y ttl. El buffer se crea una vez con un bloque por
+    atributo; write sube y draw dibuja solo las primeras alive_count filas
+    """
+    ATTRIBUTES = ("position", "color", "size", "ttl")
+
+    def __init__(self, pipeline, particles):
+        self.particles = particles
+        self.count = 0
+        self.vao = glGenVertexArrays(1)
+        self.vbo = glGenBuffers(1)
+
+        arrays = [getattr(particles, name) for name in self.ATTRIBUTES]
+        glBindVertexArray(self.vao)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, sum(array.nbytes for array in arrays), None, GL_STREAM_DRAW)
+
+        # Inicio de cada bloque en el buffer
+        self.offsets = []
+        offset = 0
+        for name, array in zip(self.ATTRIBUTES, arrays):
+            location = glGetAttribLocation(pipeline.id, name)
+            components = 1 if array.ndim == 1 else array.shape[1]
+            glEnableVertexAttribArray(location)
+            glVertexAttribPointer(location, components, GL_FLOAT, GL_FALSE, 0, ctypes.c_void_p(offset))
+            self.offsets.append(offset)
+            offset += array.nbytes
+
+        glBindVertexArray(0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def write(self):
+        """Sube las partículas vivas; las filas son vistas contiguas, no se copian"""
+        self.count = self.particles.alive_count
+        if self.count == 0:
+            return
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        for name, offset in zip(self.ATTRIBUTES, self.offsets):
+            data = getattr(self.particles, name)[:self.count]
+            glBufferSubData(GL_ARRAY_BUFFER, offset, data.nbytes, data)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def draw(self):
+        if self.count == 0:
+            return
+        glBindVertexArray(self.vao)
+        glDrawArrays(GL_POINTS, 0, self.count)
+        glBindVertexArray(0)
+
+    def delete(self):
+        glDeleteBuffers(1, [self.vbo])
+        glDeleteVertexArrays(1, [self.vao])
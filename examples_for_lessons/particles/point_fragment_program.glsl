@@ -1,9 +1,9 @@
 #version 330
 
-in float alpha;
+in vec4 fragColor;
 out vec4 outColor;
 
 void main()
 {
-    outColor = vec4(1.0, 1.0, 1.0, alpha);
+    outColor = fragColor;
 }
\ No newline at end of file
@@ -4,12 +4,16 @@ uniform mat4 projection;
 uniform float max_ttl;
 
 in vec3 position;
+in vec4 color;
+in float size;
 in float ttl;
-out float alpha;
+out vec4 fragColor;
 
 void main()
 {
-    gl_PointSize = 15.0 * (ttl / max_ttl);
+    // las partículas muertas tienen ttl 0, así que no se ven
+    float life = clamp(ttl / max_ttl, 0.0, 1.0);
+    gl_PointSize = size * life;
     gl_Position = projection * view * vec4(position, 1.0);
-    alpha = ttl / max_ttl;
-}
\ No newline at end of file
+    fragColor = vec4(color.rgb, color.a * life);
+}
@@ -28,9 +28,17 @@ class Shape:
 def merge(destinationShape, strideSize, sourceShape):
 
     # current vertices are an offset for indices refering to vertices of the new shape
-    offset = len(destinationShape.vertices)
-    destinationShape.vertices += sourceShape.vertices
-    destinationShape.indices += [(offset/strideSize) + index for index in sourceShape.indices]
+    offset = len(destinationShape.vertices) // strideSize
+    destinationShape.vertices += list(sourceShape.vertices)
+    destinationShape.indices += [offset + int(index) for index in sourceShape.indices]
+
+
+def toArrays(shape, stride):
+    """Shape with vertices as a (N, stride) float32 array and indices as an uint32 array,
+    the types fillBuffers uploads without a copy"""
+    vertices = np.asarray(shape.vertices, dtype=np.float32).reshape(-1, stride)
+    indices = np.asarray(shape.indices, dtype=np.uint32)
+    return Shape(vertices, indices)
 
 
 def applyOffset(shape, stride, offset):
@@ -186,6 +194,55 @@ def createTextureQuadWithDims(nx, ny, height, width):
 
     return Shape(vertices, indices)
 
+# Array variants of the quads, built directly in numpy arrays (see toArrays)
+
+_QUAD_POSITIONS = np.array([
+    [-0.5, -0.5, 0.0],
+    [ 0.5, -0.5, 0.0],
+    [ 0.5,  0.5, 0.0],
+    [-0.5,  0.5, 0.0]], dtype=np.float32)
+
+_QUAD_INDICES = np.array([0, 1, 2, 2, 3, 0], dtype=np.uint32)
+
+
+def _interleave(count, *columns):
+    # (count, stride) float32 array with the columns side by side, a single
+    # row (e.g. a color) is repeated for every vertex
+    columns = [np.broadcast_to(np.asarray(column, dtype=np.float32), (count, np.shape(column)[-1])) for column in columns]
+    return np.hstack(columns)
+
+
+def _quadTexCoords(nx, ny):
+    return np.array([[0, ny], [nx, ny], [nx, 0], [0, 0]], dtype=np.float32)
+
+
+def createRainbowQuadArrays():
+    """Same as createRainbowQuad"""
+    colors = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0], [1.0, 1.0, 1.0]]
+    return Shape(_interleave(4, _QUAD_POSITIONS, colors), _QUAD_INDICES.copy())
+
+
+def createColorQuadArrays(r, g, b):
+    """Same as createColorQuad"""
+    return Shape(_interleave(4, _QUAD_POSITIONS, [r, g, b]), _QUAD_INDICES.copy())
+
+
+def createTextureQuadWithNormalArrays(nx, ny):
+    """Same as createTextureQuadWithNormal"""
+    return Shape(_interleave(4, _QUAD_POSITIONS, _quadTexCoords(nx, ny), [0.0, 0.0, 1.0]), _QUAD_INDICES.copy())
+
+
+def createTextureQuadArrays(nx, ny):
+    """Same as createTextureQuad"""
+    return Shape(_interleave(4, _QUAD_POSITIONS, _quadTexCoords(nx, ny)), _QUAD_INDICES.copy())
+
+
+def createTextureQuadWithDimsArrays(nx, ny, height, width):
+    """Same as createTextureQuadWithDims"""
+    positions = _QUAD_POSITIONS * np.array([width, height, 1.0], dtype=np.float32)
+    return Shape(_interleave(4, positions, _quadTexCoords(nx, ny)), _QUAD_INDICES.copy())
+
+
 def createColorCircle(N, r, g, b):
 
     # First vertex at the center
@@ -243,6 +300,45 @@ def createRainbowCircle(N):
     return Shape(vertices, indices)
 
 
+def _fanIndices(N):
+    # Triangles from the center (vertex 0) to each pair of consecutive border vertices,
+    # the final triangle connects back to the second vertex
+    i = np.arange(N, dtype=np.uint32)
+    indices = np.stack([np.zeros(N, dtype=np.uint32), i, i + 1], axis=1).ravel()
+    return np.concatenate([indices, np.array([0, N, 1], dtype=np.uint32)])
+
+
+def createColorCircleArrays(N, r, g, b):
+    """Same as createColorCircle, built directly in numpy arrays (see toArrays)"""
+    colorOffsetAtCenter = 0.3
+    theta = np.arange(N) * (2 * math.pi / N)
+
+    vertices = np.empty((N + 1, 6), dtype=np.float32)
+    vertices[0] = [0, 0, 0, r + colorOffsetAtCenter, g + colorOffsetAtCenter, b + colorOffsetAtCenter]
+    vertices[1:, 0] = 0.5 * np.cos(theta)
+    vertices[1:, 1] = 0.5 * np.sin(theta)
+    vertices[1:, 2] = 0
+    vertices[1:, 3:] = [r, g, b]
+
+    return Shape(vertices, _fanIndices(N))
+
+
+def createRainbowCircleArrays(N):
+    """Same as createRainbowCircle, built directly in numpy arrays (see toArrays)"""
+    theta = np.arange(N) * (2 * math.pi / N)
+
+    vertices = np.empty((N + 1, 6), dtype=np.float32)
+    vertices[0] = [0, 0, 0, 1.0, 1.0, 1.0]
+    vertices[1:, 0] = 0.5 * np.cos(theta)
+    vertices[1:, 1] = 0.5 * np.sin(theta)
+    vertices[1:, 2] = 0
+    vertices[1:, 3] = np.sin(theta)
+    vertices[1:, 4] = np.cos(theta)
+    vertices[1:, 5] = 0
+
+    return Shape(vertices, _fanIndices(N))
+
+
 def createRainbowCube():
 
     # Defining the location and colors of each vertex  of the shape
@@ -270,82 +366,85 @@ def createRainbowCube():
 
     return Shape(vertices, indices)
 
-def readOFF(filename, color):
-    vertices = []
-    normals= []
-    faces = []
-
+def _parseOFF(filename):
     with open(filename, 'r') as file:
-        line = file.readline().strip()
-        assert line=="OFF"
+        tokens = file.read().split()
 
-        line = file.readline().strip()
-        aux = line.split(' ')
+    assert tokens[0] == "OFF"
 
-        numVertices = int(aux[0])
-        numFaces = int(aux[1])
-
-        for i in range(numVertices):
-            aux = file.readline().strip().split(' ')
-            vertices += [float(coord) for coord in aux[0:]]
-        
-        vertices = np.asarray(vertices)
-        vertices = np.reshape(vertices, (numVertices, 3))
-        #print(f'Vertices shape: {vertices.shape}')
+    numVertices = int(tokens[1])
+    numFaces = int(tokens[2])
+    start = 4
 
-        normals = np.zeros((numVertices,3), dtype=np.float32)
-        #print(f'Normals shape: {normals.shape}')
+    vertices = np.array(tokens[start:start + 3 * numVertices], dtype=np.float64)
+    vertices = np.reshape(vertices, (numVertices, 3))
 
+    faceTokens = np.array(tokens[start + 3 * numVertices:], dtype=np.int64)
+    if len(faceTokens) == 4 * numFaces and np.all(faceTokens[::4] == 3):
+        # Common case, only triangles: a single reshape
+        faces = np.reshape(faceTokens, (numFaces, 4))[:, 1:]
+    else:
+        # Polygons are split as triangle fans
+        faces = []
+        position = 0
         for i in range(numFaces):
-            aux = file.readline().strip().split(' ')
-            aux = [int(index) for index in aux[0:]]
-            faces += [aux[1:]]
-            
-            vecA = [vertices[aux[2]][0] - vertices[aux[1]][0], vertices[aux[2]][1] - vertices[aux[1]][1], vertices[aux[2]][2] - vertices[aux[1]][2]]
-            vecB = [vertices[aux[3]][0] - vertices[aux[2]][0], vertices[aux[3]][1] - vertices[aux[2]][1], vertices[aux[3]][2] - vertices[aux[2]][2]]
-
-            res = np.cross(vecA, vecB)
-            normals[aux[1]][0] += res[0]  
-            normals[aux[1]][1] += res[1]  
-            normals[aux[1]][2] += res[2]  
-
-            normals[aux[2]][0] += res[0]  
-            normals[aux[2]][1] += res[1]  
-            normals[aux[2]][2] += res[2]  
-
-            normals[aux[3]][0] += res[0]  
-            normals[aux[3]][1] += res[1]  
-            normals[aux[3]][2] += res[2]  
-        #print(faces)
-        norms = np.linalg.norm(normals,axis=1)
-        normals = normals/norms[:,None]
-
-        color = np.asarray(color)
-        color = np.tile(color, (numVertices, 1))
-
-        vertexData = np.concatenate((vertices, color), axis=1)
-        vertexData = np.concatenate((vertexData, normals), axis=1)
-
-        #print(vertexData.shape)
-
-        indices = []
-        vertexDataF = []
-        index = 0
-
-        for face in faces:
-            vertex = vertexData[face[0],:]
-            vertexDataF += vertex.tolist()
-            vertex = vertexData[face[1],:]
-            vertexDataF += vertex.tolist()
-            vertex = vertexData[face[2],:]
-            vertexDataF += vertex.tolist()
-            
-            indices += [index, index + 1, index + 2]
-            index += 3        
-
-
-
-        return Shape(vertexDataF, indices)
+            n = faceTokens[position]
+            polygon = faceTokens[position + 1:position + 1 + n]
+            for j in range(1, n - 1):
+                faces.append((polygon[0], polygon[j], polygon[j + 1]))
+            position += 1 + n
+        faces = np.array(faces, dtype=np.int64).reshape(-1, 3)
+
+    # Area weighted normals, accumulated on every vertex of each face
+    vecA = vertices[faces[:, 1]] - vertices[faces[:, 0]]
+    vecB = vertices[faces[:, 2]] - vertices[faces[:, 1]]
+    res = np.cross(vecA, vecB)
+
+    normals = np.zeros((numVertices, 3), dtype=np.float32)
+    np.add.at(normals, faces[:, 0], res)
+    np.add.at(normals, faces[:, 1], res)
+    np.add.at(normals, faces[:, 2], res)
+
+    norms = np.linalg.norm(normals, axis=1)
+    norms[norms == 0] = 1
+    normals = normals / norms[:, None]
+
+    return vertices.astype(np.float32), normals.astype(np.float32), faces.astype(np.uint32)
+
+
+def readOFF(filename, color, cache=True):
+    """Reads an OFF file into a Shape with position, color and normal per vertex.
+    The parsed geometry is stored next to the file as filename.npz, and reused
+    while the .off file is not modified."""
+
+    cacheFilename = filename + ".npz"
+    stat = os.stat(filename)
+    stamp = np.array([stat.st_mtime_ns, stat.st_size], dtype=np.int64)
+
+    geometry = None
+    if cache and os.path.exists(cacheFilename):
+        try:
+            with np.load(cacheFilename) as data:
+                if np.array_equal(data["stamp"], stamp):
+                    geometry = data["vertices"], data["normals"], data["indices"]
+        except (OSError, ValueError, KeyError):
+            geometry = None
+
+    if geometry is None:
+        geometry = _parseOFF(filename)
+        if cache:
+            try:
+                with open(cacheFilename, 'wb') as file:
+                    np.savez(file, stamp=stamp, vertices=geometry[0], normals=geometry[1], indices=geometry[2])
+            except OSError:
+                pass
+
+    vertices, normals, indices = geometry
+
+    color = np.tile(np.asarray(color, dtype=np.float32), (len(vertices), 1))
+    vertexData = np.concatenate((vertices, color, normals), axis=1)
+
+    return Shape(vertexData.reshape(-1), indices.reshape(-1))
 
 def createColorCubeTarea2(r,g,b):
 
@@ -631,4 +730,85 @@ def createTextureNormalsCube(image_filename):
          19,18,17,17,16,19, # Y+
          20,21,22,22,23,20] # Y-
 
-    return Shape(vertices, indices, image_filename)
\ No newline at end of file
+    return Shape(vertices, indices, image_filename)
+
+
+
+# Array variants of the cubes, built directly in numpy arrays (see toArrays)
+
+# Cubes with a vertex per corner
+_CUBE_CORNERS = np.array([
+    [-0.5, -0.5,  0.5],
+    [ 0.5, -0.5,  0.5],
+    [ 0.5,  0.5,  0.5],
+    [-0.5,  0.5,  0.5],
+    [-0.5, -0.5, -0.5],
+    [ 0.5, -0.5, -0.5],
+    [ 0.5,  0.5, -0.5],
+    [-0.5,  0.5, -0.5]], dtype=np.float32)
+
+_CUBE_CORNER_INDICES = np.array([
+    0, 1, 2, 2, 3, 0,
+    4, 5, 6, 6, 7, 4,
+    4, 5, 1, 1, 0, 4,
+    6, 7, 3, 3, 2, 6,
+    5, 6, 2, 2, 1, 5,
+    7, 4, 0, 0, 3, 7], dtype=np.uint32)
+
+_RAINBOW_CUBE_COLORS = [
+    [1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0], [1.0, 1.0, 1.0],
+    [1.0, 1.0, 0.0], [0.0, 1.0, 1.0], [1.0, 0.0, 1.0], [1.0, 1.0, 1.0]]
+
+# Cubes with 4 vertices per face (Z+, Z-, X+, X-, Y+, Y-), for texture
+# coordinates and normals that change from face to face
+_CUBE_FACE_POSITIONS = np.array([
+    [-0.5, -0.5,  0.5], [ 0.5, -0.5,  0.5], [ 0.5,  0.5,  0.5], [-0.5,  0.5,  0.5],
+    [-0.5, -0.5, -0.5], [ 0.5, -0.5, -0.5], [ 0.5,  0.5, -0.5], [-0.5,  0.5, -0.5],
+    [ 0.5, -0.5, -0.5], [ 0.5,  0.5, -0.5], [ 0.5,  0.5,  0.5], [ 0.5, -0.5,  0.5],
+    [-0.5, -0.5, -0.5], [-0.5,  0.5, -0.5], [-0.5,  0.5,  0.5], [-0.5, -0.5,  0.5],
+    [-0.5,  0.5, -0.5], [ 0.5,  0.5, -0.5], [ 0.5,  0.5,  0.5], [-0.5,  0.5,  0.5],
+    [-0.5, -0.5, -0.5], [ 0.5, -0.5, -0.5], [ 0.5, -0.5,  0.5], [-0.5, -0.5,  0.5]], dtype=np.float32)
+
+_CUBE_FACE_TEXCOORDS = np.tile(np.array([[0, 1], [1, 1], [1, 0], [0, 0]], dtype=np.float32), (6, 1))
+
+_CUBE_FACE_NORMALS = np.repeat(np.array([
+    [0, 0, 1], [0, 0, -1], [1, 0, 0], [-1, 0, 0], [0, 1, 0], [0, -1, 0]], dtype=np.float32), 4, axis=0)
+
+_CUBE_FACE_INDICES = np.array([
+     0,  1,  2,  2,  3,  0, # Z+
+     7,  6,  5,  5,  4,  7, # Z-
+     8,  9, 10, 10, 11,  8, # X+
+    15, 14, 13, 13, 12, 15, # X-
+    19, 18, 17, 17, 16, 19, # Y+
+    20, 21, 22, 22, 23, 20], dtype=np.uint32) # Y-
+
+
+def createRainbowCubeArrays():
+    """Same as createRainbowCube"""
+    return Shape(_interleave(8, _CUBE_CORNERS, _RAINBOW_CUBE_COLORS), _CUBE_CORNER_INDICES.copy())
+
+
+def createColorCubeArrays(r, g, b):
+    """Same as createColorCube"""
+    return Shape(_interleave(8, _CUBE_CORNERS, [r, g, b]), _CUBE_CORNER_INDICES.copy())
+
+
+def createRainbowNormalsCubeArrays():
+    """Same as createRainbowNormalsCube, the normals point away from the center"""
+    normals = _CUBE_CORNERS / np.linalg.norm(_CUBE_CORNERS, axis=1)[:, None]
+    return Shape(_interleave(8, _CUBE_CORNERS, _RAINBOW_CUBE_COLORS, normals), _CUBE_CORNER_INDICES.copy())
+
+
+def createColorNormalsCubeArrays(r, g, b):
+    """Same as createColorNormalsCube"""
+    return Shape(_interleave(24, _CUBE_FACE_POSITIONS, [r, g, b], _CUBE_FACE_NORMALS), _CUBE_FACE_INDICES.copy())
+
+
+def createTextureCubeArrays():
+    """Same vertices and indices as createTextureCube; the texture is set by the caller"""
+    return Shape(_interleave(24, _CUBE_FACE_POSITIONS, _CUBE_FACE_TEXCOORDS), _CUBE_FACE_INDICES.copy())
+
+
+def createTextureNormalsCubeArrays():
+    """Same vertices and indices as createTextureNormalsCube; the texture is set by the caller"""
+    return Shape(_interleave(24, _CUBE_FACE_POSITIONS, _CUBE_FACE_TEXCOORDS, _CUBE_FACE_NORMALS), _CUBE_FACE_INDICES.copy())
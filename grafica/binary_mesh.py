@@ -0,0 +1,207 @@
+# coding=utf-8
+"""Compact binary mesh container, loaded with np.memmap
+
+Layout (little endian):
+    header      HEADER_DTYPE
+    submeshes   SUBMESH_DTYPE * submeshCount
+    vertices    float32 * vertexCount * stride, interleaved position [uv] [normal]
+    indices     uint32 * indexCount, relative to the first vertex of each submesh
+
+Usage as a converter:
+    python -m grafica.binary_mesh input.stl output.mesh
+"""
+
+import argparse
+import numpy as np
+
+__license__ = "MIT"
+
+MAGIC = b"CC3501MS"
+VERSION = 1
+
+HAS_UV = 1
+HAS_NORMALS = 2
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("flags", "<u4"),
+    ("stride", "<u4"),
+    ("vertexCount", "<u4"),
+    ("indexCount", "<u4"),
+    ("submeshCount", "<u4")])
+
+SUBMESH_DTYPE = np.dtype([
+    ("name", "S32"),
+    ("vertexStart", "<u4"),
+    ("vertexCount", "<u4"),
+    ("indexStart", "<u4"),
+    ("indexCount", "<u4"),
+    ("diffuse", "<f4", (4,))])
+
+
+class Submesh:
+    """Views over the vertex and index data of one submesh, nothing is copied"""
+    def __init__(self, name, vertices, indices, diffuse, flags):
+        self.name = name
+        self.vertices = vertices
+        self.indices = indices
+        self.diffuse = diffuse
+
+        self.positions = vertices[:, 0:3]
+        self.uvs = None
+        self.normals = None
+
+        offset = 3
+        if flags & HAS_UV:
+            self.uvs = vertices[:, offset:offset + 2]
+            offset += 2
+        if flags & HAS_NORMALS:
+            self.normals = vertices[:, offset:offset + 3]
+
+
+class BinaryMesh:
+    def __init__(self, header, submeshes, vertices, indices):
+        self.header = header
+        self.flags = int(header["flags"])
+        self.stride = int(header["stride"])
+        self.vertices = vertices
+        self.indices = indices
+        self.submeshes = []
+
+        for entry in submeshes:
+            vertexStart = int(entry["vertexStart"])
+            indexStart = int(entry["indexStart"])
+            self.submeshes.append(Submesh(
+                entry["name"].decode("utf-8"),
+                vertices[vertexStart:vertexStart + int(entry["vertexCount"])],
+                indices[indexStart:indexStart + int(entry["indexCount"])],
+                entry["diffuse"],
+                self.flags))
+
+
+def _stride(flags):
+    return 3 + (2 if flags & HAS_UV else 0) + (3 if flags & HAS_NORMALS else 0)
+
+
+def loadBinaryMesh(filename):
+    """Maps a binary mesh file in memory. Vertices and indices are read lazily."""
+
+    header = np.fromfile(filename, dtype=HEADER_DTYPE, count=1)[0]
+    assert header["magic"] == MAGIC, "Not a binary mesh file"
+    assert header["version"] == VERSION, "Unsupported binary mesh version"
+
+    offset = HEADER_DTYPE.itemsize
+    submeshCount = int(header["submeshCount"])
+    submeshes = np.memmap(filename, dtype=SUBMESH_DTYPE, mode="r", offset=offset, shape=(submeshCount,))
+    offset += SUBMESH_DTYPE.itemsize * submeshCount
+
+    stride = int(header["stride"])
+    vertexCount = int(header["vertexCount"])
+    vertices = np.memmap(filename, dtype=np.float32, mode="r", offset=offset, shape=(vertexCount, stride))
+    offset += vertices.nbytes
+
+    indices = np.memmap(filename, dtype=np.uint32, mode="r", offset=offset, shape=(int(header["indexCount"]),))
+
+    return BinaryMesh(header, submeshes, vertices, indices)
+
+
+def saveBinaryMesh(filename, submeshes):
+    """Writes a binary mesh file.
+    submeshes is a list of dicts with keys name, positions, indices and
+    optionally uvs, normals and diffuse. All submeshes must define the same
+    optional attributes."""
+
+    flags = 0
+    if all(submesh.get("uvs") is not None for submesh in submeshes):
+        flags |= HAS_UV
+    if all(submesh.get("normals") is not None for submesh in submeshes):
+        flags |= HAS_NORMALS
+
+    table = np.zeros(len(submeshes), dtype=SUBMESH_DTYPE)
+    vertexBlocks = []
+    indexBlocks = []
+    vertexStart = 0
+    indexStart = 0
+
+    for i, submesh in enumerate(submeshes):
+        positions = np.asarray(submesh["positions"], dtype=np.float32).reshape(-1, 3)
+        columns = [positions]
+        if flags & HAS_UV:
+            columns.append(np.asarray(submesh["uvs"], dtype=np.float32).reshape(-1, 2))
+        if flags & HAS_NORMALS:
+            columns.append(np.asarray(submesh["normals"], dtype=np.float32).reshape(-1, 3))
+        indices = np.asarray(submesh["indices"], dtype=np.uint32).reshape(-1)
+
+        table[i]["name"] = str(submesh.get("name", i)).encode("utf-8")[:32]
+        table[i]["vertexStart"] = vertexStart
+        table[i]["vertexCount"] = len(positions)
+        table[i]["indexStart"] = indexStart
+        table[i]["indexCount"] = len(indices)
+        table[i]["diffuse"] = submesh.get("diffuse", (1, 1, 1, 1))
+
+        vertexBlocks.append(np.concatenate(columns, axis=1))
+        indexBlocks.append(indices)
+        vertexStart += len(positions)
+        indexStart += len(indices)
+
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header["magic"] = MAGIC
+    header["version"] = VERSION
+    header["flags"] = flags
+    header["stride"] = _stride(flags)
+    header["vertexCount"] = vertexStart
+    header["indexCount"] = indexStart
+    header["submeshCount"] = len(submeshes)
+
+    with open(filename, "wb") as file:
+        header.tofile(file)
+        table.tofile(file)
+        np.concatenate(vertexBlocks, axis=0).astype(np.float32).tofile(file)
+        np.concatenate(indexBlocks).astype(np.uint32).tofile(file)
+
+
+def convertMesh(inputFilename, outputFilename, normalize=True):
+    """Converts any format readable by trimesh into a binary mesh file.
+    With normalize, the mesh is centered and scaled as mesh_from_file does.
+    Textures are not stored, only the uv coordinates."""
+
+    import trimesh as tm
+    from trimesh.scene.scene import Scene
+    import grafica.transformations as tr
+
+    meshData = tm.load(inputFilename)
+    if normalize:
+        meshData.apply_transform(tr.uniformScale(2.0 / meshData.scale) @ tr.translate(*-meshData.centroid))
+
+    if type(meshData) is Scene:
+        geometries = list(meshData.geometry.items())
+    else:
+        geometries = [("model", meshData)]
+
+    submeshes = []
+    for name, geometry in geometries:
+        submesh = {
+            "name": name,
+            "positions": geometry.vertices,
+            "normals": geometry.vertex_normals,
+            "indices": geometry.faces}
+
+        if geometry.visual.kind == "texture" and geometry.visual.uv is not None:
+            submesh["uvs"] = geometry.visual.uv
+        elif geometry.visual.kind == "face" or geometry.visual.kind == "vertex":
+            submesh["diffuse"] = geometry.visual.main_color / 255.0
+
+        submeshes.append(submesh)
+
+    saveBinaryMesh(outputFilename, submeshes)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Converts a mesh file into the binary mesh format")
+    parser.add_argument("input", help="mesh file readable by trimesh (stl, obj, off, glb, ...)")
+    parser.add_argument("output", help="binary mesh file to write")
+    parser.add_argument("--no-normalize", action="store_true", help="keep the original position and scale")
+    args = parser.parse_args()
+
+    convertMesh(args.input, args.output, normalize=not args.no_normalize)
@@ -0,0 +1,182 @@
+# coding=utf-8
+"""Vectorized 2D physics for many circles: Euler integration, border
+reflection and elastic collisions found through a uniform grid
+
+Headless benchmark:
+    python -m grafica.circle_physics --count 10000 --steps 100
+"""
+
+import argparse
+import numpy as np
+from grafica.fixed_timestep import FixedTimestep
+
+__license__ = "MIT"
+
+# Half of the 3x3 neighbourhood of a cell, so every pair of cells is visited once
+_NEIGHBOUR_CELLS = ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1))
+
+
+class CirclePhysics:
+    """
+    Positions, velocities and radii of all circles are stored as arrays.
+    Collisions are elastic; masses are proportional to the area of each
+    circle unless given explicitly.
+    """
+
+    def __init__(self, positions, velocities, radii, masses=None, lower=(-1.0, -1.0), upper=(1.0, 1.0)):
+        self.positions = np.array(positions, dtype=np.float64).reshape(-1, 2)
+        self.velocities = np.array(velocities, dtype=np.float64).reshape(-1, 2)
+        self.radii = np.broadcast_to(np.asarray(radii, dtype=np.float64), len(self.positions)).copy()
+        self.masses = self.radii ** 2 if masses is None else np.broadcast_to(np.asarray(masses, dtype=np.float64), len(self.positions)).copy()
+        self.lower = np.array(lower, dtype=np.float64)
+        self.upper = np.array(upper, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def integrate(self, acceleration, deltaTime):
+        # Euler integration
+        self.velocities += deltaTime * np.asarray(acceleration)
+        self.positions += self.velocities * deltaTime
+
+    def collideWithBorders(self):
+        """Circles touching a border get their velocity pointing inwards"""
+        low = self.positions < self.lower + self.radii[:, None]
+        high = self.positions > self.upper - self.radii[:, None]
+        speed = np.abs(self.velocities)
+        self.velocities[low] = speed[low]
+        self.velocities[high] = -speed[high]
+
+    def findPairs(self):
+        """Returns two index arrays (i, j), i < j, with all overlapping circles"""
+        count = len(self.positions)
+        if count < 2:
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+
+        cellSize = 2.0 * self.radii.max()
+        gridShape = np.maximum(np.ceil((self.upper - self.lower) / cellSize).astype(np.int64), 1)
+        # Circles outside the domain are clamped to the border cells
+        cells = np.clip(((self.positions - self.lower) // cellSize).astype(np.int64), 0, gridShape - 1)
+        keys = cells[:, 0] * gridShape[1] + cells[:, 1]
+
+        order = np.argsort(keys, kind="stable")
+        sortedKeys = keys[order]
+
+        first = []
+        second = []
+        for dx, dy in _NEIGHBOUR_CELLS:
+            neighbour = cells + (dx, dy)
+            valid = np.all((neighbour >= 0) & (neighbour < gridShape), axis=1)
+            neighbourKeys = neighbour[:, 0] * gridShape[1] + neighbour[:, 1]
+
+            start = np.searchsorted(sortedKeys, neighbourKeys, side="left")
+            end = np.searchsorted(sortedKeys, neighbourKeys, side="right")
+            counts = np.where(valid, end - start, 0)
+
+            i = np.repeat(np.arange(count), counts)
+            offsets = np.arange(len(i)) - np.repeat(np.cumsum(counts) - counts, counts)
+            j = order[np.repeat(start, counts) + offsets]
+
+            if dx == 0 and dy == 0:
+                # Same cell: keep each pair once
+                keep = i < j
+                i, j = i[keep], j[keep]
+            first.append(i)
+            second.append(j)
+
+        i = np.concatenate(first)
+        j = np.concatenate(second)
+
+        difference = self.positions[j] - self.positions[i]
+        distance2 = np.einsum("ij,ij->i", difference, difference)
+        colliding = distance2 < (self.radii[i] + self.radii[j]) ** 2
+
+        i, j = i[colliding], j[colliding]
+        swap = i > j
+        i[swap], j[swap] = j[swap], i[swap]
+        return i, j
+
+    def resolveCollisions(self, i, j):
+        """Elastic impulses for the pairs (i, j) that are moving towards each other.
+        A circle touching several others would get too much energy if all its
+        impulses were computed from the same velocity, so pairs are processed
+        in rounds where no circle appears twice."""
+        pair = np.arange(len(i))
+        owner = np.empty(len(self.positions), dtype=np.intp)
+
+        while len(pair) > 0:
+            # A pair goes in this round if it is the first pending pair of both circles
+            owner[i] = len(self.positions)
+            owner[j] = len(self.positions)
+            np.minimum.at(owner, i, pair)
+            np.minimum.at(owner, j, pair)
+            now = (owner[i] == pair) & (owner[j] == pair)
+
+            self._exchange(i[now], j[now])
+            i, j = i[~now], j[~now]
+            pair = np.arange(len(i))
+
+    def _exchange(self, i, j):
+        normal = self.positions[j] - self.positions[i]
+        length = np.linalg.norm(normal, axis=1)
+        length[length == 0] = 1.0
+        normal /= length[:, None]
+
+        relative = np.einsum("ij,ij->i", self.velocities[j] - self.velocities[i], normal)
+        approaching = relative < 0.0
+        i, j, normal, relative = i[approaching], j[approaching], normal[approaching], relative[approaching]
+
+        # With equal masses this swaps the normal components of both velocities
+        impulse = (-2.0 * relative / (1.0 / self.masses[i] + 1.0 / self.masses[j]))[:, None] * normal
+        self.velocities[i] -= impulse / self.masses[i, None]
+        self.velocities[j] += impulse / self.masses[j, None]
+
+    def step(self, deltaTime, acceleration=(0.0, 0.0), circleCollisions=True):
+        """Advances the simulation by deltaTime, returns the number of colliding pairs"""
+        self.integrate(acceleration, deltaTime)
+        self.collideWithBorders()
+
+        if not circleCollisions:
+            return 0
+
+        i, j = self.findPairs()
+        self.resolveCollisions(i, j)
+        return len(i)
+
+
+def randomCircles(count, radius, lower=(-1.0, -1.0), upper=(1.0, 1.0), speed=1.0, seed=None):
+    """Circles with random positions inside the domain and random velocities"""
+    rng = np.random.default_rng(seed)
+    lower = np.asarray(lower, dtype=np.float64)
+    upper = np.asarray(upper, dtype=np.float64)
+    positions = rng.uniform(lower + radius, upper - radius, (count, 2))
+    velocities = rng.uniform(-speed, speed, (count, 2))
+    return CirclePhysics(positions, velocities, radius, lower=lower, upper=upper)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs the circle simulation without a window")
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument("--radius", type=float, default=None, help="defaults to a size that covers about 30% of the domain")
+    parser.add_argument("--dt", type=float, default=1.0 / 60.0)
+    args = parser.parse_args()
+
+    radius = args.radius if args.radius is not None else np.sqrt(0.3 * 4.0 / (np.pi * args.count))
+    physics = randomCircles(args.count, radius, seed=0)
+
+    def energy():
+        return 0.5 * np.sum(physics.masses * np.einsum("ij,ij->i", physics.velocities, physics.velocities))
+
+    initialEnergy = energy()
+    pairs = 0
+
+    def step(deltaTime):
+        global pairs
+        pairs += physics.step(deltaTime)
+
+    elapsed = FixedTimestep(step, args.dt).runHeadless(args.steps)
+
+    print(f"{args.count} circles, {args.steps} steps: {1000.0 * elapsed / args.steps:.2f} ms per step")
+    print(f"{pairs / args.steps:.1f} colliding pairs per step")
+    print(f"kinetic energy {initialEnergy:.4f} -> {energy():.4f}")
@@ -0,0 +1,114 @@
+# coding=utf-8
+"""Fixed timestep scheduler: the simulation always advances in steps of the
+same size, independently of the frame rate, and rendering interpolates
+between the last two simulated states"""
+
+import time
+import numpy as np
+
+__license__ = "MIT"
+
+
+class Interpolator:
+    """
+    Blends two consecutive simulation states for rendering.
+    capture() returns the current simulation state as an array, apply(state)
+    writes a blended state wherever it is drawn from (e.g. scene graph nodes)
+    """
+
+    def __init__(self, capture, apply):
+        self.capture = capture
+        self.apply = apply
+        self.current = np.array(capture(), dtype=np.float64)
+        self.previous = self.current.copy()
+
+    def reset(self):
+        """Forgets the previous state, e.g. after teleporting an object"""
+        self.current = np.array(self.capture(), dtype=np.float64)
+        self.previous[...] = self.current
+
+    def store(self):
+        # Called after each fixed step
+        self.previous, self.current = self.current, self.previous
+        self.current[...] = self.capture()
+
+    def blend(self, alpha):
+        self.apply(self.previous + alpha * (self.current - self.previous))
+
+
+class FixedTimestep:
+    """
+    Calls step(timeStep) as many times as needed to catch up with the real
+    time given to advance(). At most maxSubsteps steps are done per frame;
+    if the simulation can not keep up, the remaining time is dropped instead
+    of accumulating more work for the next frame.
+
+    alpha is the fraction of a step that is still pending, used to
+    interpolate the rendered state.
+    """
+
+    def __init__(self, step, timeStep=1.0 / 60.0, maxSubsteps=5):
+        self.step = step
+        self.timeStep = timeStep
+        self.maxSubsteps = maxSubsteps
+        self.accumulator = 0.0
+        self.alpha = 0.0
+        self.time = 0.0
+        self.steps = 0
+        self.droppedTime = 0.0
+        self.interpolators = []
+
+    def addInterpolator(self, capture, apply):
+        interpolator = Interpolator(capture, apply)
+        self.interpolators.append(interpolator)
+        return interpolator
+
+    def _doStep(self):
+        self.step(self.timeStep)
+        self.time += self.timeStep
+        self.steps += 1
+        for interpolator in self.interpolators:
+            interpolator.store()
+
+    def advance(self, elapsed):
+        """
+        It must be called once per frame with the real time since the
+        previous frame. Returns the number of steps done.
+        """
+        self.accumulator += elapsed
+        substeps = 0
+        while self.accumulator >= self.timeStep and substeps < self.maxSubsteps:
+            self._doStep()
+            self.accumulator -= self.timeStep
+            substeps += 1
+
+        if self.accumulator >= self.timeStep:
+            # Spiral of death: keep only the fraction of a step
+            kept = self.accumulator % self.timeStep
+            self.droppedTime += self.accumulator - kept
+            self.accumulator = kept
+
+        self.alpha = self.accumulator / self.timeStep
+        for interpolator in self.interpolators:
+            interpolator.blend(self.alpha)
+        return substeps
+
+    def __call__(self, elapsed, *args):
+        # So it can be given directly to pyglet.clock.schedule
+        return self.advance(elapsed)
+
+    def runHeadless(self, steps):
+        """
+        Runs steps fixed steps as fast as possible, without a window.
+        Returns the wall time spent, in seconds.
+        """
+        start = time.perf_counter()
+        for _ in range(steps):
+            self._doStep()
+        elapsed = time.perf_counter() - start
+
+        # Shows the last simulated state
+        self.alpha = 1.0
+        for interpolator in self.interpolators:
+            interpolator.blend(self.alpha)
+        return elapsed
@@ -0,0 +1,71 @@
+# coding=utf-8
+"""View frustum planes and visibility tests for axis aligned bounding boxes"""
+
+import numpy as np
+
+__license__ = "MIT"
+
+
+def frustumPlanes(projectionView):
+    """
+    Returns the 6 planes (left, right, bottom, top, near, far) of the frustum
+    defined by projection @ view, as a (6, 4) array (a, b, c, d) with unit
+    normals pointing inwards: a point p is inside when a*x + b*y + c*z + d >= 0.
+    Works for the matrices of tr.perspective, tr.frustum and tr.ortho.
+    """
+    m = np.asarray(projectionView, dtype=np.float64)
+    planes = np.array([
+        m[3] + m[0],
+        m[3] - m[0],
+        m[3] + m[1],
+        m[3] - m[1],
+        m[3] + m[2],
+        m[3] - m[2]])
+    planes /= np.linalg.norm(planes[:, :3], axis=1)[:, None]
+    return planes
+
+
+def boundingBox(vertices, stride=3):
+    """Returns (min, max) of the positions, taken as the first 3 values of each vertex"""
+    positions = np.asarray(vertices, dtype=np.float32).reshape(-1, stride)[:, :3]
+    if len(positions) == 0:
+        return np.full(3, np.inf, dtype=np.float32), np.full(3, -np.inf, dtype=np.float32)
+    return positions.min(axis=0), positions.max(axis=0)
+
+
+def transformBoxes(matrices, boxMin, boxMax):
+    """
+    Axis aligned boxes that contain each box (N, 3) after being transformed
+    by its (N, 4, 4) matrix. A single box or matrix is broadcast.
+    """
+    matrices = np.asarray(matrices)
+    boxMin = np.asarray(boxMin)
+    boxMax = np.asarray(boxMax)
+    center = 0.5 * (boxMin + boxMax)
+    extent = 0.5 * (boxMax - boxMin)
+
+    linear = matrices[..., :3, :3]
+    worldCenter = np.einsum("...ij,...j->...i", linear, center) + matrices[..., :3, 3]
+    worldExtent = np.einsum("...ij,...j->...i", np.abs(linear), extent)
+    return worldCenter - worldExtent, worldCenter + worldExtent
+
+
+def boxesInFrustum(planes, boxMin, boxMax):
+    """
+    Boolean array, False for the boxes that are completely outside of at
+    least one plane. Boxes that cross the frustum border are kept.
+    """
+    boxMin = np.asarray(boxMin)
+    boxMax = np.asarray(boxMax)
+    center = 0.5 * (boxMin + boxMax)
+    extent = 0.5 * (boxMax - boxMin)
+
+    normals = planes[:, :3]
+    # Signed distance from the center and projected radius of the box, for every plane
+    distance = center @ normals.T + planes[:, 3]
+    radius = extent @ np.abs(normals).T
+    return np.all(distance + radius >= 0.0, axis=-1)
+
+
+def boxInFrustum(planes, boxMin, boxMax):
+    return bool(boxesInFrustum(planes, boxMin, boxMax))
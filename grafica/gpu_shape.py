@@ -3,6 +3,7 @@
 
 #import OpenGL.GL as ogl
 from OpenGL.GL import *
+import ctypes
 import numpy as np
 
 __author__ = "Daniel Calderon"
@@ -12,6 +13,19 @@ __license__ = "MIT"
 # 1 byte = 8 bits
 SIZE_IN_BYTES = 4
 
+
+def asBufferData(data, dtype):
+    """
+    Returns data as a contiguous numpy array of dtype. Arrays, interleaved
+    (N, stride) ones included, and buffer protocol objects (array.array,
+    memoryview) that already have that type are used without a copy; raw
+    bytes are reinterpreted as dtype.
+    """
+    if isinstance(data, (bytes, bytearray)) or (isinstance(data, memoryview) and data.format in ("B", "b", "c")):
+        return np.frombuffer(data, dtype=dtype)
+    return np.ascontiguousarray(data, dtype=dtype)
+
+
 class GPUShape:
     def __init__(self):
         """VAO, VBO, EBO and texture handlers to GPU memory"""
@@ -21,6 +35,9 @@ class GPUShape:
         self.ebo = None
         self.texture = None
         self.size = None
+        # Optional local (min, max) box used for frustum culling, e.g.
+        # gpuShape.bounds = frustum.boundingBox(shape.vertices, stride)
+        self.bounds = None
 
     def initBuffers(self):
         """Convenience function for initialization of OpenGL buffers.
@@ -43,16 +60,17 @@ class GPUShape:
 
     def fillBuffers(self, vertices, indices, usage):
 
-        vertexData = np.array(vertices, dtype=np.float32)
-        indices = np.array(indices, dtype=np.uint32)
+        # float32 and uint32 arrays go straight to OpenGL, lists are converted
+        vertexData = asBufferData(vertices, np.float32)
+        indices = asBufferData(indices, np.uint32)
 
-        self.size = len(indices)
+        self.size = indices.size
 
         glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
-        glBufferData(GL_ARRAY_BUFFER, len(vertexData) * SIZE_IN_BYTES, vertexData, usage)
+        glBufferData(GL_ARRAY_BUFFER, vertexData.nbytes, vertexData, usage)
 
         glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ebo)
-        glBufferData(GL_ELEMENT_ARRAY_BUFFER, len(indices) * SIZE_IN_BYTES, indices, usage)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, usage)
 
     def clear(self):
         """Freeing GPU memory"""
@@ -70,6 +88,117 @@ class GPUShape:
             glDeleteVertexArrays(1, [self.vao])
 
 
+class StreamingBuffer:
+    """
+    A fixed capacity ring of buffer objects, for data rewritten every frame.
+    Each write goes to the next buffer of the ring, so it does not have to
+    wait for draws still reading the previous ones, and nothing is
+    reallocated. With a single buffer, it is orphaned before each write.
+
+    Data is converted with asBufferData, so contiguous arrays that already
+    have the buffer dtype are uploaded as they are, without a copy.
+    """
+    def __init__(self, capacity, target=GL_ARRAY_BUFFER, count=3, mapped=False, dtype=None, usage=GL_STREAM_DRAW):
+        """capacity is the number of elements of dtype (float32 for vertices, uint32 for indices)"""
+        if dtype is None:
+            dtype = np.uint32 if target == GL_ELEMENT_ARRAY_BUFFER else np.float32
+        self.dtype = np.dtype(dtype)
+        self.capacity = capacity
+        self.target = target
+        self.usage = usage
+        # glMapBufferRange instead of glBufferSubData
+        self.mapped = mapped
+        self.buffers = [glGenBuffers(1) for _ in range(count)]
+        self.sizes = [0] * count
+        self.slot = count - 1
+
+        for buffer in self.buffers:
+            glBindBuffer(target, buffer)
+            glBufferData(target, capacity * self.dtype.itemsize, None, usage)
+
+    @property
+    def buffer(self):
+        """The buffer written last"""
+        return self.buffers[self.slot]
+
+    @property
+    def size(self):
+        """Number of elements written last"""
+        return self.sizes[self.slot]
+
+    def write(self, data, slot=None):
+        """Writes data in the next buffer of the ring, or in slot. Returns the slot used"""
+        data = asBufferData(data, self.dtype)
+        if data.size > self.capacity:
+            raise ValueError("StreamingBuffer capacity is " + str(self.capacity) + ", got " + str(data.size) + " elements")
+
+        self.slot = (self.slot + 1) % len(self.buffers) if slot is None else slot
+        glBindBuffer(self.target, self.buffers[self.slot])
+
+        if len(self.buffers) == 1:
+            # Orphaning: the driver gives new storage if the old one is still in use
+            glBufferData(self.target, self.capacity * self.dtype.itemsize, None, self.usage)
+
+        if self.mapped:
+            # Nothing else uses this buffer now, no need to synchronize
+            access = GL_MAP_WRITE_BIT | GL_MAP_INVALIDATE_BUFFER_BIT | GL_MAP_UNSYNCHRONIZED_BIT
+            pointer = glMapBufferRange(self.target, 0, data.nbytes, access)
+            ctypes.memmove(pointer, data.ctypes.data, data.nbytes)
+            glUnmapBuffer(self.target)
+        else:
+            glBufferSubData(self.target, 0, data.nbytes, data)
+
+        self.sizes[self.slot] = data.size
+        return self.slot
+
+    def clear(self):
+        """Freeing GPU memory"""
+        glDeleteBuffers(len(self.buffers), self.buffers)
+        self.buffers = []
+
+
+class StreamingShape(GPUShape):
+    """
+    A GPUShape whose vertices (and optionally indices) change every frame.
+    There is a VAO for each buffer of the ring, and vao, vbo and ebo point
+    to the last ones written, so the usual pipeline.drawCall works.
+    Capacities are numbers of floats and of indices.
+    """
+    def __init__(self, pipeline, vertexCapacity, indexCapacity, count=3, mapped=False):
+        super().__init__()
+        self.vertexBuffer = StreamingBuffer(vertexCapacity, GL_ARRAY_BUFFER, count, mapped)
+        self.indexBuffer = StreamingBuffer(indexCapacity, GL_ELEMENT_ARRAY_BUFFER, count, mapped)
+        self.vaos = []
+        for vbo, ebo in zip(self.vertexBuffer.buffers, self.indexBuffer.buffers):
+            self.vao, self.vbo, self.ebo = glGenVertexArrays(1), vbo, ebo
+            pipeline.setupVAO(self)
+            self.vaos.append(self.vao)
+        self.size = 0
+
+    def fillIndices(self, indices):
+        """Writes the same indices in every buffer of the ring, for shapes that only move their vertices"""
+        for slot in range(len(self.vaos)):
+            self.indexBuffer.write(indices, slot)
+        self.size = self.indexBuffer.size
+
+    def update(self, vertices, indices=None):
+        """Writes new vertices, and new indices if given, in the next buffers of the ring"""
+        slot = self.vertexBuffer.write(vertices)
+        if indices is not None:
+            self.indexBuffer.write(indices, slot)
+        self.size = self.indexBuffer.sizes[slot]
+        self.vao, self.vbo, self.ebo = self.vaos[slot], self.vertexBuffer.buffers[slot], self.indexBuffer.buffers[slot]
+
+    def clear(self):
+        """Freeing GPU memory"""
+        if self.texture != None:
+            glDeleteTextures(1, [self.texture])
+        self.vertexBuffer.clear()
+        self.indexBuffer.clear()
+        glDeleteVertexArrays(len(self.vaos), self.vaos)
+        self.vaos = []
+
+
 def createGPUShape(pipeline, shape):
     """Shortcut for the typical way to create a GPUShape.
     Please consider that GL_STATIC_DRAW is not always the best way to draw.
@@ -0,0 +1,324 @@
+# coding=utf-8
+"""Mesh simplification by quadric error edge collapse (Garland & Heckbert),
+and chains of simplified meshes for level of detail
+
+Each pass computes the error quadric of every vertex, the cheapest collapse
+of every edge, and then collapses at once a set of edges that share no
+vertex, each one being the cheapest edge around both of its vertices.
+Collapses that would flip a triangle are rejected.
+
+Usage as a converter:
+    python -m grafica.mesh_simplification input.stl output.mesh --levels 3
+"""
+
+import argparse
+import numpy as np
+
+__license__ = "MIT"
+
+# Upper triangle of a symmetric 4x4 matrix, quadrics are stored as these 10 values
+_ROWS, _COLUMNS = np.triu_indices(4)
+
+
+def _faceNormals(positions, faces):
+    p0 = positions[faces[:, 0]]
+    cross = np.cross(positions[faces[:, 1]] - p0, positions[faces[:, 2]] - p0)
+    doubleArea = np.linalg.norm(cross, axis=1)
+    normals = cross / np.maximum(doubleArea, 1e-30)[:, None]
+    return normals, doubleArea
+
+
+def _planeQuadrics(planes, weights):
+    # (N, 10) upper triangles of weight * plane plane^T
+    return planes[:, _ROWS] * planes[:, _COLUMNS] * weights[:, None]
+
+
+def _accumulate(vertexCount, indices, quadrics):
+    result = np.empty((vertexCount, 10))
+    for column in range(10):
+        result[:, column] = np.bincount(indices, quadrics[:, column], minlength=vertexCount)
+    return result
+
+
+def _vertexQuadrics(positions, faces, boundaryWeight):
+    normals, doubleArea = _faceNormals(positions, faces)
+    planes = np.column_stack([normals, -np.einsum("ij,ij->i", normals, positions[faces[:, 0]])])
+    faceQuadrics = _planeQuadrics(planes, 0.5 * doubleArea)
+    quadrics = _accumulate(len(positions), faces.ravel(), np.repeat(faceQuadrics, 3, axis=0))
+
+    # Edges used by a single triangle are kept in place with a plane
+    # perpendicular to the triangle that contains the edge
+    halfEdges, boundary = _boundaryHalfEdges(faces)
+    if len(boundary) > 0:
+        a, b = halfEdges[boundary, 0], halfEdges[boundary, 1]
+        direction = positions[b] - positions[a]
+        length2 = np.einsum("ij,ij->i", direction, direction)
+        perpendicular = np.cross(direction, normals[boundary // 3])
+        perpendicular /= np.maximum(np.linalg.norm(perpendicular, axis=1), 1e-30)[:, None]
+        planes = np.column_stack([perpendicular, -np.einsum("ij,ij->i", perpendicular, positions[a])])
+        edgeQuadrics = _planeQuadrics(planes, boundaryWeight * length2)
+        quadrics += _accumulate(len(positions), np.concatenate([a, b]), np.concatenate([edgeQuadrics, edgeQuadrics]))
+
+    return quadrics, normals
+
+
+def _quadricError(quadrics, points):
+    # v^T Q v for homogeneous points v = (x, y, z, 1)
+    homogeneous = np.column_stack([points, np.ones(len(points))])
+    products = homogeneous[:, _ROWS] * homogeneous[:, _COLUMNS]
+    # Off diagonal terms appear twice in the full matrix
+    weights = np.where(_ROWS == _COLUMNS, 1.0, 2.0)
+    return (quadrics * products) @ weights
+
+
+def _uniqueRows(rows, **kwargs):
+    # Pairs and triples of vertex indices packed in one integer, much faster than unique with axis=0
+    count = rows.max(initial=0) + 1
+    keys = rows[:, 0]
+    for column in range(1, rows.shape[1]):
+        keys = keys * count + rows[:, column]
+    return np.unique(keys, **kwargs)
+
+
+def _boundaryHalfEdges(faces):
+    # Half edges (face corner to the next corner) and the ones used by a single triangle
+    halfEdges = np.stack([faces, np.roll(faces, -1, axis=1)], axis=2).reshape(-1, 2)
+    _, first, counts = _uniqueRows(np.sort(halfEdges, axis=1), return_index=True, return_counts=True)
+    return halfEdges, first[counts == 1]
+
+
+def _weld(positions):
+    # Vertices with the same position and the welded index of each vertex
+    welded, weld = np.unique(positions, axis=0, return_inverse=True)
+    return welded, weld.reshape(-1)
+
+
+def boundaryEdgeCount(positions, indices):
+    """
+    Edges used by a single triangle, 0 for a closed mesh. Vertices with the
+    same position count as one, so uv and normal seams are not boundaries
+    """
+    _, weld = _weld(np.asarray(positions).reshape(-1, 3))
+    faces = weld[np.asarray(indices, dtype=np.int64).reshape(-1, 3)]
+    return len(_boundaryHalfEdges(faces)[1])
+
+
+def _edges(faces):
+    halfEdges = np.sort(np.stack([faces, np.roll(faces, -1, axis=1)], axis=2).reshape(-1, 2), axis=1)
+    _, first = _uniqueRows(halfEdges, return_index=True)
+    return halfEdges[first]
+
+
+def _removeDegenerate(faces):
+    valid = (faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 2] != faces[:, 0])
+    faces = faces[valid]
+    # Two triangles over the same 3 vertices can appear when collapsing thin regions
+    _, unique = _uniqueRows(np.sort(faces, axis=1), return_index=True)
+    return faces[np.sort(unique)]
+
+
+def _collapsePass(positions, attributes, faces, needed, boundaryWeight):
+    """Collapses at most needed edges, returns the new faces or None if nothing could be collapsed"""
+    quadrics, normals = _vertexQuadrics(positions, faces, boundaryWeight)
+    edges = _edges(faces)
+    a, b = edges[:, 0], edges[:, 1]
+    edgeQuadrics = quadrics[a] + quadrics[b]
+
+    # Candidates: both endpoints and the midpoint
+    fractions = np.array([0.0, 1.0, 0.5])
+    costs = np.stack([
+        _quadricError(edgeQuadrics, positions[a] + t * (positions[b] - positions[a])) for t in fractions], axis=1)
+    choice = np.argmin(costs, axis=1)
+    cost = costs[np.arange(len(edges)), choice]
+    fraction = fractions[choice]
+
+    vertexCount = len(positions)
+    blocked = np.zeros(len(edges), dtype=bool)
+
+    for _ in range(8):
+        # Independent set: every selected edge is the cheapest one of both its vertices
+        order = np.flatnonzero(~blocked)
+        if len(order) == 0:
+            return None
+        order = order[np.argsort(cost[order], kind="stable")]
+        rank = np.full(len(edges), len(edges))
+        rank[order] = np.arange(len(order))
+        owner = np.full(vertexCount, len(edges))
+        np.minimum.at(owner, a[order], rank[order])
+        np.minimum.at(owner, b[order], rank[order])
+        selected = order[(owner[a[order]] == rank[order]) & (owner[b[order]] == rank[order])][:needed]
+        tried = selected
+
+        # Collapses that would flip a triangle are dropped until none is left
+        while len(selected) > 0:
+            sa, sb, t = a[selected], b[selected], fraction[selected][:, None]
+            remap = np.arange(vertexCount)
+            remap[sb] = sa
+            newPositions = positions.copy()
+            newPositions[sa] = positions[sa] + t * (positions[sb] - positions[sa])
+            newFaces = remap[faces]
+
+            collapseOf = np.full(vertexCount, -1)
+            collapseOf[sa] = np.arange(len(selected))
+            collapseOf[sb] = np.arange(len(selected))
+            touched = np.any(collapseOf[faces] >= 0, axis=1)
+            touched &= (newFaces[:, 0] != newFaces[:, 1]) & (newFaces[:, 1] != newFaces[:, 2]) & (newFaces[:, 2] != newFaces[:, 0])
+            newNormals, _ = _faceNormals(newPositions, newFaces[touched])
+            flipped = np.einsum("ij,ij->i", newNormals, normals[touched]) < 0.0
+
+            if not np.any(flipped):
+                positions[:] = newPositions
+                for attribute in attributes:
+                    attribute[sa] = attribute[sa] + t * (attribute[sb] - attribute[sa])
+                return _removeDegenerate(newFaces)
+
+            rejected = collapseOf[faces[touched][flipped]].ravel()
+            keep = np.ones(len(selected), dtype=bool)
+            keep[rejected[rejected >= 0]] = False
+            selected = selected[keep]
+
+        # Every selected collapse flipped something: try the next cheapest edges
+        blocked[tried] = True
+
+    return None
+
+
+def simplifyMesh(positions, indices, targetFaces, attributes=(), boundaryWeight=100.0):
+    """
+    Reduces the triangles (indices, flat or (F, 3)) to about targetFaces.
+    attributes are per vertex arrays (uvs, normals, ...) interpolated along
+    the collapsed edges. Returns (positions, indices (F, 3), attributes);
+    unused vertices are removed.
+    """
+    positions, faces, attributes, _ = _simplify(positions, indices, targetFaces, attributes, boundaryWeight)
+    return positions, faces, attributes
+
+
+def _simplify(positions, indices, targetFaces, attributes, boundaryWeight):
+    # simplifyMesh, also returning the original index of every vertex left
+    positions = np.array(positions, dtype=np.float64).reshape(-1, 3)
+    faces = np.array(indices, dtype=np.int64).reshape(-1, 3)
+    attributes = [np.array(attribute, dtype=np.float64).reshape(len(positions), -1) for attribute in attributes]
+    faces = _removeDegenerate(faces)
+
+    while len(faces) > targetFaces:
+        # Each collapse removes about 2 triangles
+        needed = max((len(faces) - targetFaces) // 2, 1)
+        newFaces = _collapsePass(positions, attributes, faces, needed, boundaryWeight)
+        if newFaces is None or len(newFaces) == len(faces):
+            break
+        faces = newFaces
+
+    used, faces = np.unique(faces, return_inverse=True)
+    faces = faces.reshape(-1, 3)
+    return positions[used], faces, [attribute[used] for attribute in attributes], used
+
+
+def lodChain(positions, indices, levels=3, ratio=0.5, attributes=(), boundaryWeight=100.0):
+    """
+    Returns a list of levels simplified meshes (positions, indices, attributes),
+    each one with ratio times the triangles of the previous one.
+
+    Meshes ready to draw repeat a vertex on every uv or normal seam, so the
+    vertices are first welded by position: otherwise the seams are open
+    edges and the simplified mesh tears along them. Each simplified vertex
+    is split again, per triangle, with the attributes of the original copy
+    whose triangles face the same way (see _splitSeams).
+    """
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    faces = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+    attributes = [np.asarray(attribute, dtype=np.float64).reshape(len(positions), -1) for attribute in attributes]
+
+    welded, weld = _weld(positions)
+
+    # Normal of each original vertex, from the triangles that use it
+    normals, doubleArea = _faceNormals(positions, faces)
+    cornerNormals = np.repeat(normals * doubleArea[:, None], 3, axis=0)
+    vertexNormals = np.column_stack([np.bincount(faces.ravel(), cornerNormals[:, axis], minlength=len(positions)) for axis in range(3)])
+    vertexNormals = normalizeRows(vertexNormals)
+
+    chain = []
+    faceCount = len(faces)
+    current = (welded, weld[faces])
+    origin = np.arange(len(welded))
+    for level in range(1, levels + 1):
+        lodPositions, lodFaces, _, used = _simplify(current[0], current[1], int(faceCount * ratio ** level), (), boundaryWeight)
+        origin = origin[used]
+        current = (lodPositions, lodFaces)
+        chain.append(_splitSeams(lodPositions, lodFaces, origin, weld, vertexNormals, attributes))
+    return chain
+
+
+def _splitSeams(positions, faces, origin, weld, vertexNormals, attributes):
+    """
+    Gives every corner of the simplified faces the attributes of one of the
+    original vertices welded into origin[vertex], the one whose normal is
+    closest to the face normal, and makes a vertex per (vertex, original) pair
+    """
+    if len(attributes) == 0:
+        return positions, faces, []
+
+    # Original vertices grouped by welded vertex
+    order = np.argsort(weld, kind="stable")
+    counts = np.bincount(weld)
+    starts = np.cumsum(counts) - counts
+
+    normals, _ = _faceNormals(positions, faces)
+    welded = origin[faces]
+    start, count = starts[welded], counts[welded]
+    best = order[start]
+    bestScore = np.einsum("fcj,fj->fc", vertexNormals[best], normals)
+    for k in range(1, count.max(initial=1)):
+        candidate = order[start + np.minimum(k, count - 1)]
+        score = np.einsum("fcj,fj->fc", vertexNormals[candidate], normals)
+        better = score > bestScore
+        best[better], bestScore[better] = candidate[better], score[better]
+
+    pairs = np.column_stack([faces.ravel(), best.ravel()])
+    _, first, inverse = _uniqueRows(pairs, return_index=True, return_inverse=True)
+    vertex, original = pairs[first, 0], pairs[first, 1]
+    return positions[vertex], inverse.reshape(-1, 3), [attribute[original] for attribute in attributes]
+
+
+def normalizeRows(vectors):
+    """Normals interpolated along collapsed edges must be normalized again"""
+    vectors = np.asarray(vectors, dtype=np.float64)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1), 1e-30)[:, None]
+
+
+if __name__ == "__main__":
+    from grafica.binary_mesh import convertMesh, loadBinaryMesh, saveBinaryMesh
+
+    parser = argparse.ArgumentParser(description="Writes a binary mesh with simplified versions of every submesh, named <name>_lod<i>")
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--levels", type=int, default=3)
+    parser.add_argument("--ratio", type=float, default=0.5)
+    args = parser.parse_args()
+
+    if args.input.endswith(".mesh"):
+        source = args.input
+    else:
+        convertMesh(args.input, args.output)
+        source = args.output
+
+    submeshes = []
+    for submesh in loadBinaryMesh(source).submeshes:
+        base = {"name": submesh.name, "positions": np.array(submesh.positions), "indices": np.array(submesh.indices), "diffuse": submesh.diffuse}
+        names = [key for key, value in (("uvs", submesh.uvs), ("normals", submesh.normals)) if value is not None]
+        for key in names:
+            base[key] = np.array(getattr(submesh, key))
+        submeshes.append(base)
+        closed = boundaryEdgeCount(base["positions"], base["indices"]) == 0
+
+        for level, (positions, faces, attributes) in enumerate(lodChain(base["positions"], base["indices"], args.levels, args.ratio, [base[key] for key in names]), start=1):
+            lod = {"name": f"{submesh.name[:26]}_lod{level}", "positions": positions, "indices": faces, "diffuse": submesh.diffuse}
+            for key, attribute in zip(names, attributes):
+                lod[key] = normalizeRows(attribute) if key == "normals" else attribute
+            submeshes.append(lod)
+            print(f"{submesh.name} lod {level}: {len(faces)} triangles ({len(base['indices']) // 3} originally)")
+            # Welded by position, a closed mesh must give closed simplified meshes
+            if closed and boundaryEdgeCount(positions, faces) > 0:
+                print(f"warning: {submesh.name} lod {level} is no longer closed")
+
+    saveBinaryMesh(args.output, submeshes)
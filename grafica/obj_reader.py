@@ -0,0 +1,162 @@
+# coding=utf-8
+"""Streaming reader for Wavefront OBJ files with indexed output"""
+
+import os.path
+import numpy as np
+import grafica.basic_shapes as bs
+
+__license__ = "MIT"
+
+
+def _resolveIndex(index, count):
+    # OBJ indices start at 1, negative values count from the last element read
+    index = int(index)
+    return index - 1 if index > 0 else count + index
+
+
+def _readFaceVertex(faceDescription, numVertices, numTextCoords, numNormals):
+    aux = faceDescription.split('/')
+
+    assert len(aux[0]), "Vertex index has not been defined."
+
+    vertex = _resolveIndex(aux[0], numVertices)
+    textCoord = -1
+    normal = -1
+
+    if len(aux) > 1 and len(aux[1]) != 0:
+        textCoord = _resolveIndex(aux[1], numTextCoords)
+
+    if len(aux) > 2 and len(aux[2]) != 0:
+        normal = _resolveIndex(aux[2], numNormals)
+
+    return vertex, textCoord, normal
+
+
+def loadOBJ(filename):
+    """Reads an OBJ file line by line.
+    Polygons are triangulated as fans and every distinct (v, vt, vn) tuple
+    becomes a single vertex, so the result is a compact indexed mesh.
+    Returns positions (N,3), textCoords (N,2), normals (N,3) and indices (M,),
+    as float32 and uint32 arrays."""
+
+    vertices = []
+    textCoords = []
+    normals = []
+
+    # Maps each (v, vt, vn) tuple to its index in the output
+    uniqueVertices = {}
+    indices = []
+
+    with open(filename, 'r') as file:
+        for line in file:
+            aux = line.split()
+            if len(aux) == 0:
+                continue
+
+            if aux[0] == 'v':
+                vertices.append(aux[1:4])
+
+            elif aux[0] == 'vn':
+                normals.append(aux[1:4])
+
+            elif aux[0] == 'vt':
+                textCoords.append(aux[1:3])
+
+            elif aux[0] == 'f':
+                polygon = []
+                for faceVertex in aux[1:]:
+                    key = _readFaceVertex(faceVertex, len(vertices), len(textCoords), len(normals))
+                    index = uniqueVertices.get(key)
+                    if index is None:
+                        index = len(uniqueVertices)
+                        uniqueVertices[key] = index
+                    polygon.append(index)
+
+                for i in range(1, len(polygon) - 1):
+                    indices += [polygon[0], polygon[i], polygon[i + 1]]
+
+    vertices = np.array(vertices, dtype=np.float32).reshape(-1, 3)
+    textCoords = np.array(textCoords, dtype=np.float32).reshape(-1, 2)
+    normals = np.array(normals, dtype=np.float32).reshape(-1, 3)
+    indices = np.array(indices, dtype=np.uint32)
+
+    keys = np.array(list(uniqueVertices.keys()), dtype=np.int64).reshape(-1, 3)
+
+    outPositions = vertices[keys[:, 0]]
+
+    outTextCoords = np.zeros((len(keys), 2), dtype=np.float32)
+    hasTextCoord = keys[:, 1] >= 0
+    outTextCoords[hasTextCoord] = textCoords[keys[hasTextCoord, 1]]
+
+    outNormals = np.zeros((len(keys), 3), dtype=np.float32)
+    hasNormal = keys[:, 2] >= 0
+    outNormals[hasNormal] = normals[keys[hasNormal, 2]]
+
+    if not np.all(hasNormal):
+        # Area weighted normals for the vertices the file does not define
+        triangles = indices.reshape(-1, 3)
+        res = np.cross(
+            outPositions[triangles[:, 1]] - outPositions[triangles[:, 0]],
+            outPositions[triangles[:, 2]] - outPositions[triangles[:, 0]])
+        computed = np.zeros_like(outNormals)
+        for i in range(3):
+            np.add.at(computed, triangles[:, i], res)
+        norms = np.linalg.norm(computed, axis=1)
+        norms[norms == 0] = 1
+        outNormals[~hasNormal] = (computed / norms[:, None])[~hasNormal]
+
+    return outPositions, outTextCoords, outNormals, indices
+
+
+def _cachePaths(filename):
+    return filename + ".vertices.npy", filename + ".indices.npy"
+
+
+def loadOBJCached(filename):
+    """Same as loadOBJ, but keeps a binary copy of the result next to the file.
+    The copy is memory mapped, so it is not read until it is used."""
+
+    verticesPath, indicesPath = _cachePaths(filename)
+    sourceTime = os.path.getmtime(filename)
+
+    if os.path.exists(verticesPath) and os.path.exists(indicesPath) \
+            and os.path.getmtime(verticesPath) >= sourceTime and os.path.getmtime(indicesPath) >= sourceTime:
+        vertexData = np.load(verticesPath, mmap_mode='r')
+        indices = np.load(indicesPath, mmap_mode='r')
+        return vertexData[:, 0:3], vertexData[:, 3:5], vertexData[:, 5:8], indices
+
+    positions, textCoords, normals, indices = loadOBJ(filename)
+    try:
+        np.save(verticesPath, np.concatenate((positions, textCoords, normals), axis=1))
+        np.save(indicesPath, indices)
+    except OSError:
+        pass
+
+    return positions, textCoords, normals, indices
+
+
+def readOBJ(filename, color, cache=False):
+    """Reads an OBJ file into a Shape with position, color and normal per vertex."""
+
+    if cache:
+        positions, textCoords, normals, indices = loadOBJCached(filename)
+    else:
+        positions, textCoords, normals, indices = loadOBJ(filename)
+
+    color = np.tile(np.asarray(color, dtype=np.float32), (len(positions), 1))
+    vertexData = np.concatenate((positions, color, normals), axis=1)
+
+    return bs.Shape(vertexData.reshape(-1), np.asarray(indices, dtype=np.uint32))
+
+
+def readTextureOBJ(filename, cache=False):
+    """Reads an OBJ file into a Shape with position, texture coordinates and normal per vertex."""
+
+    if cache:
+        positions, textCoords, normals, indices = loadOBJCached(filename)
+    else:
+        positions, textCoords, normals, indices = loadOBJ(filename)
+
+    vertexData = np.concatenate((positions, textCoords, normals), axis=1)
+
+    return bs.Shape(vertexData.reshape(-1), np.asarray(indices, dtype=np.uint32))
@@ -6,6 +6,7 @@ import OpenGL.GL.shaders
 import numpy as np
 import grafica.transformations as tr
 import grafica.gpu_shape as gs
+import grafica.frustum as fr
 
 __author__ = "Daniel Calderon"
 __license__ = "MIT"
@@ -22,6 +23,9 @@ class SceneGraphNode:
         self.name = name
         self.transform = tr.identity()
         self.childs = []
+        # Optional (min, max) box of the whole subtree, in the coordinates
+        # where its childs live (after applying transform). See computeBounds
+        self.bounds = None
 
     def clear(self):
         """Freeing GPU memory"""
@@ -85,16 +89,57 @@ def findPosition(node, name, parentTransform=tr.identity()):
     return None
 
 
-def drawSceneGraphNode(node, pipeline, transformName, parentTransform=tr.identity()):
+def computeBounds(node):
+    """
+    Sets node.bounds from the bounds of the GPUShapes below it, using the
+    current transforms. Only GPUShapes with bounds are considered, and the
+    result is valid while the transforms below node do not change, so it is
+    meant for static subtrees. Returns the bounds, or None.
+    """
+    if isinstance(node, gs.GPUShape):
+        return node.bounds
+
+    boxMin = np.full(3, np.inf)
+    boxMax = np.full(3, -np.inf)
+    for child in node.childs:
+        childBounds = computeBounds(child)
+        if childBounds is None:
+            continue
+        if isinstance(child, SceneGraphNode):
+            childBounds = fr.transformBoxes(child.transform, *childBounds)
+        boxMin = np.minimum(boxMin, childBounds[0])
+        boxMax = np.maximum(boxMax, childBounds[1])
+
+    node.bounds = (boxMin, boxMax) if np.all(boxMin <= boxMax) else None
+    return node.bounds
+
+
+def _isVisible(bounds, transform, frustumPlanes):
+    if frustumPlanes is None or bounds is None:
+        return True
+    return fr.boxInFrustum(frustumPlanes, *fr.transformBoxes(transform, *bounds))
+
+
+def drawSceneGraphNode(node, pipeline, transformName, parentTransform=tr.identity(), frustumPlanes=None):
+    """
+    Draws the subtree of node. With frustumPlanes (see grafica.frustum),
+    subtrees and GPUShapes with bounds outside of the view are skipped
+    """
     assert(isinstance(node, SceneGraphNode))
 
     # Composing the transformations through this path
     newTransform = np.matmul(parentTransform, node.transform)
 
+    # The whole subtree is discarded before any OpenGL call
+    if not _isVisible(node.bounds, newTransform, frustumPlanes):
+        return
+
     # If the child node is a leaf, it should be a GPUShape.
     # Hence, it can be drawn with drawCall
     if len(node.childs) == 1 and isinstance(node.childs[0], gs.GPUShape):
         leaf = node.childs[0]
+        if not _isVisible(leaf.bounds, newTransform, frustumPlanes):
+            return
         glUniformMatrix4fv(glGetUniformLocation(pipeline.shaderProgram, transformName), 1, GL_TRUE, newTransform)
         pipeline.drawCall(leaf)
 
@@ -102,5 +147,5 @@ def drawSceneGraphNode(node, pipeline, transformName, parentTransform=tr.identit
     # so this draw function is called recursively
     else:
         for child in node.childs:
-            drawSceneGraphNode(child, pipeline, transformName, newTransform)
+            drawSceneGraphNode(child, pipeline, transformName, newTransform, frustumPlanes)
 
@@ -0,0 +1,102 @@
+# coding=utf-8
+"""Static batching: many shapes that never move, merged into one buffer
+
+The transforms are applied to the vertices on the CPU, once, so the whole
+group is drawn with a single drawCall instead of one per shape.
+"""
+
+import numpy as np
+import grafica.basic_shapes as bs
+import grafica.gpu_shape as gs
+import grafica.frustum as fr
+import grafica.transformations as tr
+
+__license__ = "MIT"
+
+
+def transformVertices(vertices, stride, transform, normalOffset=None):
+    """
+    Returns the vertices as a (N, stride) float32 array with the first 3
+    values of each vertex (the position) transformed by the 4x4 transform.
+    If normalOffset is given, the 3 values starting there are transformed as
+    a normal, with the inverse transpose, and normalized again.
+    """
+    vertices = np.array(vertices, dtype=np.float32).reshape(-1, stride)
+    transform = np.asarray(transform, dtype=np.float32)
+
+    vertices[:, :3] = vertices[:, :3] @ transform[:3, :3].T + transform[:3, 3]
+
+    if normalOffset is not None:
+        normalMatrix = np.linalg.inv(transform[:3, :3]).T
+        normals = vertices[:, normalOffset:normalOffset + 3] @ normalMatrix.T
+        normals /= np.maximum(np.linalg.norm(normals, axis=1), 1e-30)[:, None]
+        vertices[:, normalOffset:normalOffset + 3] = normals
+
+    return vertices
+
+
+def mergeShapes(shapes, stride, transforms=None, normalOffset=None):
+    """
+    Merges the shapes in a single Shape, with vertices as a flat float32
+    array and indices as an uint32 array, ready for fillBuffers.
+    transforms is an optional 4x4 matrix per shape.
+    """
+    shapes = list(shapes)
+    if transforms is None:
+        transforms = [tr.identity()] * len(shapes)
+
+    vertices = []
+    indices = []
+    offset = 0
+    for shape, transform in zip(shapes, transforms):
+        shapeVertices = transformVertices(shape.vertices, stride, transform, normalOffset)
+        vertices.append(shapeVertices)
+        indices.append(np.asarray(shape.indices, dtype=np.uint32) + np.uint32(offset))
+        offset += len(shapeVertices)
+
+    if len(shapes) == 0:
+        return bs.Shape(np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.uint32))
+
+    return bs.Shape(np.concatenate(vertices).ravel(), np.concatenate(indices))
+
+
+def collectShapes(node, parentTransform=tr.identity()):
+    """
+    Returns the list of (shape, transform) of a SceneGraphNode subtree whose
+    leaves are basic_shapes.Shape instead of GPUShape
+    """
+    if isinstance(node, bs.Shape):
+        return [(node, parentTransform)]
+
+    if isinstance(node, gs.GPUShape):
+        raise ValueError("Static batching needs the vertices on the CPU: use basic_shapes.Shape leaves")
+
+    newTransform = np.matmul(parentTransform, node.transform)
+    collected = []
+    for child in node.childs:
+        collected += collectShapes(child, newTransform)
+    return collected
+
+
+def bakeSceneGraph(node, stride, normalOffset=None):
+    """
+    Merges every Shape below node, with its transform relative to node
+    (node.transform itself is not applied), into a single Shape
+    """
+    collected = []
+    for child in node.childs:
+        collected += collectShapes(child)
+    shapes = [shape for shape, _ in collected]
+    transforms = [transform for _, transform in collected]
+    return mergeShapes(shapes, stride, transforms, normalOffset)
+
+
+def createStaticGPUShape(pipeline, node, stride, normalOffset=None):
+    """
+    A single GPUShape with the whole subtree of node, with its bounds set.
+    Use it as the only child of a node with node.transform.
+    """
+    shape = bakeSceneGraph(node, stride, normalOffset)
+    gpuShape = gs.createGPUShape(pipeline, shape)
+    gpuShape.bounds = fr.boundingBox(shape.vertices, stride)
+    return gpuShape
@@ -218,3 +218,143 @@ def lookAt(eye, at, up):
             [-forward[0], -forward[1], -forward[2], np.dot(forward, eye)],
             [0,0,0,1]
         ], dtype = np.float32)
+
+
+# Batched variants: each parameter is an array of N values (scalars are
+# broadcast) and the result is a (N, 4, 4) float32 stack of matrices.
+
+def _batchSize(*params):
+    return np.broadcast(*[np.asarray(p) for p in params]).shape
+
+
+def _identityBatch(shape):
+    out = np.zeros(shape + (4, 4), dtype=np.float32)
+    out[..., 0, 0] = 1
+    out[..., 1, 1] = 1
+    out[..., 2, 2] = 1
+    out[..., 3, 3] = 1
+    return out
+
+
+def identityBatch(n):
+    return _identityBatch((n,))
+
+
+def translateBatch(tx, ty, tz):
+    out = _identityBatch(_batchSize(tx, ty, tz))
+    out[..., 0, 3] = tx
+    out[..., 1, 3] = ty
+    out[..., 2, 3] = tz
+    return out
+
+
+def scaleBatch(sx, sy, sz):
+    out = _identityBatch(_batchSize(sx, sy, sz))
+    out[..., 0, 0] = sx
+    out[..., 1, 1] = sy
+    out[..., 2, 2] = sz
+    return out
+
+
+def uniformScaleBatch(s):
+    return scaleBatch(s, s, s)
+
+
+def rotationXBatch(theta):
+    sin_theta = np.sin(theta)
+    cos_theta = np.cos(theta)
+
+    out = _identityBatch(np.shape(theta))
+    out[..., 1, 1] = cos_theta
+    out[..., 1, 2] = -sin_theta
+    out[..., 2, 1] = sin_theta
+    out[..., 2, 2] = cos_theta
+    return out
+
+
+def rotationYBatch(theta):
+    sin_theta = np.sin(theta)
+    cos_theta = np.cos(theta)
+
+    out = _identityBatch(np.shape(theta))
+    out[..., 0, 0] = cos_theta
+    out[..., 0, 2] = sin_theta
+    out[..., 2, 0] = -sin_theta
+    out[..., 2, 2] = cos_theta
+    return out
+
+
+def rotationZBatch(theta):
+    sin_theta = np.sin(theta)
+    cos_theta = np.cos(theta)
+
+    out = _identityBatch(np.shape(theta))
+    out[..., 0, 0] = cos_theta
+    out[..., 0, 1] = -sin_theta
+    out[..., 1, 0] = sin_theta
+    out[..., 1, 1] = cos_theta
+    return out
+
+
+def rotationABatch(theta, axis):
+    theta = np.asarray(theta)
+    axis = np.asarray(axis)
+
+    assert axis.shape[-1] == 3
+
+    s = np.sin(theta)
+    c = np.cos(theta)
+    t = 1 - c
+
+    x = axis[..., 0]
+    y = axis[..., 1]
+    z = axis[..., 2]
+
+    out = _identityBatch(_batchSize(theta, x))
+    # First row
+    out[..., 0, 0] = c + t * x * x
+    out[..., 0, 1] = t * x * y - s * z
+    out[..., 0, 2] = t * x * z + s * y
+    # Second row
+    out[..., 1, 0] = t * x * y + s * z
+    out[..., 1, 1] = c + t * y * y
+    out[..., 1, 2] = t * y * z - s * x
+    # Third row
+    out[..., 2, 0] = t * x * z - s * y
+    out[..., 2, 1] = t * y * z + s * x
+    out[..., 2, 2] = c + t * z * z
+    return out
+
+
+def lookAtBatch(eye, at, up):
+    eye = np.asarray(eye, dtype=np.float32)
+    at = np.asarray(at, dtype=np.float32)
+    up = np.asarray(up, dtype=np.float32)
+
+    forward = at - eye
+    forward = forward / np.linalg.norm(forward, axis=-1, keepdims=True)
+
+    side = np.cross(forward, up)
+    side = side / np.linalg.norm(side, axis=-1, keepdims=True)
+
+    newUp = np.cross(side, forward)
+    newUp = newUp / np.linalg.norm(newUp, axis=-1, keepdims=True)
+
+    out = _identityBatch(forward.shape[:-1])
+    out[..., 0, :3] = side
+    out[..., 1, :3] = newUp
+    out[..., 2, :3] = -forward
+    out[..., 0, 3] = -np.sum(side * eye, axis=-1)
+    out[..., 1, 3] = -np.sum(newUp * eye, axis=-1)
+    out[..., 2, 3] = np.sum(forward * eye, axis=-1)
+    return out
+
+
+def matmulBatch(mats):
+    # Stacks of shape (N, 4, 4) and single (4, 4) matrices can be mixed,
+    # single matrices are broadcast against the whole stack
+    out = np.asarray(mats[0], dtype=np.float32)
+    for i in range(1, len(mats)):
+        out = np.matmul(out, mats[i])
+
+    return out.astype(np.float32, copy=False)
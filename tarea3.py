@@ -2,8 +2,6 @@ import pyglet
 from OpenGL import GL
 import numpy as np
 import sys
-from Box2D import b2PolygonShape, b2World
-import grafica.transformations as tr
 
 if sys.path[0] != "":
     sys.path.insert(0, "")
@@ -13,7 +11,11 @@ import auxiliares.utils.shapes as shapes
 from auxiliares.utils.camera import FreeCamera
 from auxiliares.utils.scene_graph import SceneGraph
 from auxiliares.utils.drawables import Model, DirectionalLight, PointLight, SpotLight, Material
-from auxiliares.utils.helpers import init_axis, init_pipeline, mesh_from_file, get_path
+from auxiliares.utils.helpers import init_axis, init_pipeline, get_path
+from auxiliares.utils.async_loader import AsyncLoader
+from auxiliares.utils.physics_sync import BodySync
+from auxiliares.utils.car_scene import TAREA3_SCENE, build_world, apply_controls, step_world
+from grafica.fixed_timestep import FixedTimestep
 
 WIDTH = 720
 HEIGHT = 720
@@ -62,22 +64,24 @@ class Controller(pyglet.window.Window):
 class Car_info():
     def __init__(self, chassis, front_wheels, rear_wheels, i=0):
         self.car_number = i
-        self.chassis_mesh = mesh_from_file(chassis)[0]["mesh"]
+        # Los meshes se cargan en otro hilo, con 3 niveles de detalle que se
+        # eligen según la distancia; mientras tanto se dibuja un cubo
+        self.chassis_mesh = loader.load_mesh(chassis, proxy=cube, cache=True, lods=3)
         self.chassis_position = [0,0,0]
         self.chassis_scale = [1,1,1]
         self.chassis_material = None
-        self.front_wheels_mesh = mesh_from_file(front_wheels)[0]["mesh"]
+        self.front_wheels_mesh = loader.load_mesh(front_wheels, proxy=cube, cache=True, lods=3)
         self.front_wheels_position = [0,0,0]
         self.front_wheels_scale = [1,1,1]
         self.front_wheels_material = None
-        self.rear_wheels_mesh = mesh_from_file(rear_wheels)[0]["mesh"]
+        self.rear_wheels_mesh = loader.load_mesh(rear_wheels, proxy=cube, cache=True, lods=3)
         self.rear_wheels_position = [0,0,0]
         self.rear_wheels_scale = [1,1,1]
         self.rear_wheels_material = None
 
 class Platform_info():
     def __init__(self, platform):
-        self.mesh = mesh_from_file(platform)[0]["mesh"]
+        self.mesh = loader.load_mesh(platform, proxy=cube, cache=True, lods=3)
         self.position = [0,0,0]
         self.scale = [1,1,1]
         self.material = None
@@ -135,10 +139,16 @@ if __name__ == "__main__":
     color_mesh_lit_pipeline = init_pipeline(
         get_path("auxiliares/shaders/color_mesh_lit.vert"),
         get_path("auxiliares/shaders/color_mesh_lit.frag"))
+    # Plataformas y ruedas repetidas se dibujan con una llamada por grupo
+    color_mesh_lit_instanced_pipeline = init_pipeline(
+        get_path("auxiliares/shaders/color_mesh_lit_instanced.vert"),
+        get_path("auxiliares/shaders/color_mesh_lit.frag"))
 
     cube = Model(shapes.Cube["position"], shapes.Cube["uv"], shapes.Cube["normal"], index_data=shapes.Cube["indices"])
     quad = Model(shapes.Square["position"], shapes.Square["uv"], shapes.Square["normal"], index_data=shapes.Square["indices"])
     graph = SceneGraph(controller)
+    graph.register_instanced_pipeline(color_mesh_lit_pipeline, color_mesh_lit_instanced_pipeline)
+    loader = AsyncLoader()
 
 #--------------------------------------------------------------------------------------
 # Materiales
@@ -380,79 +390,49 @@ if __name__ == "__main__":
 # Simulación Física
 #--------------------------------------------------------------------
 
-    world = b2World(gravity=(0, 0))
-
-    # Objetos estáticos
-    wall1_body = world.CreateStaticBody(position=(-20, 0))
-    wall1_body.CreatePolygonFixture(box=(0.5, 20), density=1, friction=1)
-
-    wall2_body = world.CreateStaticBody(position=(20, 0))
-    wall2_body.CreatePolygonFixture(box=(0.5, 20), density=1, friction=1)
-
-    wall3_body = world.CreateStaticBody(position=(0, -20))
-    wall3_body.CreatePolygonFixture(box=(20, 0.5), density=1, friction=1)
-
-    wall4_body = world.CreateStaticBody(position=(0, 20))
-    wall4_body.CreatePolygonFixture(box=(20, 0.5), density=1, friction=1)
-
-    winzone_body = world.CreateStaticBody(position=(0, 8))
-    winzoneFixture = winzone_body.CreateCircleFixture(radius=1, density=1, friction=1)
-    winzoneFixture.sensor = True # No interactúa con otros objetos en la simulación física, solo detecta colisiones
-
-    # Objetos dinámicos
-    car_0_body = world.CreateDynamicBody(position=(2, 0), angle=0, linearDamping=0.75, angularDamping=0.5)
-    car_0_body.CreatePolygonFixture(box=(0.5, 0.5), density=1, friction=1)
-
-    car_1_body = world.CreateDynamicBody(position=(-2,0), angle=0, linearDamping=0.75, angularDamping=0.5)
-    car_1_body.CreatePolygonFixture(box=(0.5, 0.5), density=4, friction=1)
-
-    car_2_body = world.CreateDynamicBody(position=(0,-2), angle=0, linearDamping=0.75, angularDamping=0.5)
-    car_2_body.CreatePolygonFixture(box=(0.5, 0.5), density=1, friction=1)
-
-    car_3_body = world.CreateDynamicBody(position=(0,2), angle=0, linearDamping=0.75, angularDamping=0.5)
-    car_3_body.CreatePolygonFixture(box=(0.5, 0.5), density=1, friction=1)
+    # La escena física está descrita en auxiliares/utils/car_scene.py, para
+    # poder simularla también sin ventana
+    world, bodies = build_world(TAREA3_SCENE)
+    car_0_body = bodies["car_0"]
+    car_1_body = bodies["car_1"]
+    car_2_body = bodies["car_2"]
+    car_3_body = bodies["car_3"]
 
     # Se guardan los cuerpos en el controller para poder acceder a ellos desde el loop de simulación
     controller.program_state["world"] = world
-    controller.program_state["bodies"]["car_0"] = car_0_body
-    controller.program_state["bodies"]["car_1"] = car_1_body
-    controller.program_state["bodies"]["car_2"] = car_2_body
-    controller.program_state["bodies"]["car_3"] = car_3_body
-    controller.program_state["bodies"]["winzone"] = winzone_body
+    controller.program_state["bodies"].update(bodies)
 
     #######################################
 
-    def update_world(dt):
-        world = controller.program_state["world"]
-        world.Step(
-            dt, controller.program_state["vel_iters"], controller.program_state["pos_iters"]
-        )
-        world.ClearForces()
-
     car_control_body = car_0_body
     k=0
+
+    def update_world(dt):
+        # Un paso fijo de la simulación: las fuerzas se aplican en cada paso,
+        # ya que world.ClearForces() las borra
+        throttle = controller.is_key_pressed(pyglet.window.key.W) - controller.is_key_pressed(pyglet.window.key.S)
+        steer = controller.is_key_pressed(pyglet.window.key.D) - controller.is_key_pressed(pyglet.window.key.A)
+        apply_controls(car_control_body, throttle, steer, TAREA3_SCENE["control"])
+
+        step_world(controller.program_state["world"], TAREA3_SCENE, dt)
+
+    # La física avanza en pasos de 1/60 s sin importar los fps; los autos se
+    # dibujan interpolando entre los dos últimos pasos
+    simulation = FixedTimestep(update_world, timeStep=1/60, maxSubsteps=5)
+    # Cada auto se registra una vez; sus matrices se arman todas juntas
+    car_sync = BodySync(graph)
+    car_sync.add_many([controller.program_state["bodies"]["car_" + str(i)] for i in range(4)],
+                      ["car_system_" + str(i) for i in range(4)])
+    car_interpolator = simulation.addInterpolator(car_sync.capture, car_sync.apply)
+
     def update(dt):
         global car_control_body
         global k
         controller.program_state["total_time"] += dt
         camera = controller.program_state["camera"]
 
-        # Actualización física del car 0
-        car_0_body = controller.program_state["bodies"]["car_0"]
-        graph["car_system_0"]["transform"] = tr.translate(car_0_body.position[0], 0, car_0_body.position[1]) @ tr.rotationY(-car_0_body.angle)
-
-        # Actualización física del car 1
-        car_1_body = controller.program_state["bodies"]["car_1"]
-        graph["car_system_1"]["transform"] = tr.translate(car_1_body.position[0], 0, car_1_body.position[1]) @ tr.rotationY(-car_1_body.angle)
-
-        # Actualización física del car 2
-        car_2_body = controller.program_state["bodies"]["car_2"]
-        graph["car_system_2"]["transform"] = tr.translate(car_2_body.position[0], 0, car_2_body.position[1]) @ tr.rotationY(-car_2_body.angle)
-
-        # Actualización física del car 3
-        car_3_body = controller.program_state["bodies"]["car_3"]
-        graph["car_system_3"]["transform"] = tr.translate(car_3_body.position[0], 0, car_3_body.position[1]) @ tr.rotationY(-car_3_body.angle)
-
+        # Sube a la GPU los meshes que ya terminaron de cargarse
+        loader.process_uploads()
 
         if controller.is_key_pressed(pyglet.window.key._0):
             k=0
@@ -471,26 +451,15 @@ if __name__ == "__main__":
         if winzone_body.fixtures[0].TestPoint(car_0_body.position):
             print("Ganaste!")
             pyglet.app.exit()
-        
 
-        # Modificar la fuerza y el torque del car con las teclas
+        # Física con paso fijo e interpolación de los autos
+        simulation.advance(dt)
 
-        
-        car_control_forward = np.array([np.sin(-car_control_body.angle), 0, np.cos(-car_control_body.angle)])
-        if controller.is_key_pressed(pyglet.window.key.A):
-            car_control_body.ApplyTorque(-0.5, True)
-        if controller.is_key_pressed(pyglet.window.key.D):
-            car_control_body.ApplyTorque(0.5, True)
-        if controller.is_key_pressed(pyglet.window.key.W):
-            car_control_body.ApplyForce((car_control_forward[0], car_control_forward[2]), car_control_body.worldCenter, True)
-        if controller.is_key_pressed(pyglet.window.key.S):
-            car_control_body.ApplyForce((-car_control_forward[0], -car_control_forward[2]), car_control_body.worldCenter, True)
         camera.position[0] = car_control_body.position[0] + 2 * np.sin(car_control_body.angle)
         camera.position[1] = 2
         camera.position[2] = car_control_body.position[1] - 2 * np.cos(car_control_body.angle)
         camera.yaw = car_control_body.angle + np.pi / 2
         camera.update()
-        update_world(dt)
 
     # posiciones = [[2,1.5,2], [-2,1.5,2] , [6,1.5,2], [-6,1.5,2]]
     # k=0
@@ -538,6 +507,8 @@ if __name__ == "__main__":
             car_control_body.angle = 0
             car_control_body.linearVelocity = (0, 0)
             car_control_body.angularVelocity = 0
+            # Sin esto el auto se vería viajando hasta la posición inicial
+            car_interpolator.reset()
     @controller.event
     def on_resize(width, height):
         controller.program_state["camera"].resize(width, height)
@@ -122,10 +122,15 @@ if __name__ == "__main__":
     color_mesh_lit_pipeline = init_pipeline(
         get_path("auxiliares/shaders/color_mesh_lit.vert"),
         get_path("auxiliares/shaders/color_mesh_lit.frag"))
+    # Plataformas y ruedas repetidas se dibujan con una llamada por grupo
+    color_mesh_lit_instanced_pipeline = init_pipeline(
+        get_path("auxiliares/shaders/color_mesh_lit_instanced.vert"),
+        get_path("auxiliares/shaders/color_mesh_lit.frag"))
 
     cube = Model(shapes.Cube["position"], shapes.Cube["uv"], shapes.Cube["normal"], index_data=shapes.Cube["indices"])
 
     graph = SceneGraph(controller)
+    graph.register_instanced_pipeline(color_mesh_lit_pipeline, color_mesh_lit_instanced_pipeline)
 
 #--------------------------------------------------------------------------------------
 # Materiales
@@ -0,0 +1,42 @@
+import argparse
+import os
+import sys
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname((os.path.abspath(__file__)))))
+from auxiliares.utils.car_scene import TAREA3_SCENE, parameter_sweep
+
+#------------------------------------------------------------
+# Barrido de parámetros de los autos de tarea3 sin ventana,
+# cada combinación en su propio proceso
+# Uso: python testeo/benchmark_car_scene.py --steps 600
+#------------------------------------------------------------
+
+def scripted_controls(steps):
+    # Acelera todo el tiempo y gira a la derecha durante el segundo cuarto
+    controls = np.zeros((steps, 2))
+    controls[:, 0] = 1
+    controls[steps // 4: steps // 2, 1] = 1
+    return controls
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Barrido de parámetros de la escena de tarea3")
+    parser.add_argument("--steps", type=int, default=600)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--output", default=None, help="archivo .npz donde guardar las trayectorias")
+    args = parser.parse_args()
+
+    combinations, trajectories, elapsed = parameter_sweep(
+        TAREA3_SCENE, scripted_controls(args.steps), bodies=["car_0"], processes=args.processes,
+        linear_damping=[0.25, 0.75, 1.5], density=[0.5, 1, 4], torque=[0.5, 1])
+
+    total_steps = len(combinations) * args.steps
+    print(f"{len(combinations)} escenas, {total_steps} pasos en {elapsed:.2f} s: {total_steps / elapsed:.0f} pasos por segundo")
+
+    # car_0 es el primer cuerpo dinámico
+    for combination, trajectory in zip(combinations, trajectories):
+        x, y = trajectory[-1, 0, :2]
+        distance = np.sum(np.linalg.norm(np.diff(trajectory[:, 0, :2], axis=0), axis=1))
+        print(combination, f"final ({x:.2f}, {y:.2f}), recorrido {distance:.2f}")
+
+    if args.output is not None:
+        np.savez(args.output, trajectories=trajectories, combinations=[list(c.values()) for c in combinations], names=list(combinations[0]))
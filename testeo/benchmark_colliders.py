@@ -0,0 +1,88 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname((os.path.abspath(__file__)))))
+from auxiliares.utils.colliders import AABB, Sphere, CollisionManager, ColliderWorld
+
+#------------------------------------------------------------
+# Compara AABB/Sphere + CollisionManager con ColliderWorld
+# Uso: python testeo/benchmark_colliders.py --count 2000
+#------------------------------------------------------------
+
+def timed(function, repeat=3):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return result, best * 1000
+
+def random_colliders(count, extent, seed):
+    rng = np.random.default_rng(seed)
+    colliders = []
+    for i in range(count):
+        if rng.random() < 0.5:
+            collider = AABB(f"box_{i}", -rng.uniform(0.1, 1, 3), rng.uniform(0.1, 1, 3))
+        else:
+            collider = Sphere(f"sphere_{i}", rng.uniform(0.1, 1))
+        collider.set_position(rng.uniform(0, extent, 3))
+        colliders.append(collider)
+    positions = rng.uniform(0, extent, (count, 3))
+    return colliders, positions
+
+def all_pairs(colliders):
+    result = []
+    for i, a in enumerate(colliders):
+        for b in colliders[i + 1:]:
+            if a.detect_collision(b):
+                result.append((a.name, b.name))
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--extent", type=float, default=None, help="tamaño del cubo donde se reparten los colliders")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # Densidad constante: unas pocas colisiones por collider
+    extent = args.extent if args.extent is not None else 4 * args.count ** (1 / 3)
+    colliders, positions = random_colliders(args.count, extent, args.seed)
+
+    manager = CollisionManager()
+    world = ColliderWorld()
+    for collider in colliders:
+        manager.add_collider(collider)
+        world.add_collider(collider)
+
+    print(f"{args.count} colliders")
+
+    def move_objects():
+        for collider, position in zip(colliders, positions):
+            collider.set_position(position)
+
+    _, ms = timed(move_objects)
+    print(f"set_position, objetos:         {ms:8.2f} ms")
+    _, ms = timed(lambda: world.set_positions(slice(None), positions))
+    print(f"set_positions, ColliderWorld:  {ms:8.2f} ms")
+
+    expected, ms = timed(lambda: all_pairs(colliders), repeat=1)
+    print(f"todos los pares, objetos:      {ms:8.2f} ms")
+    pairs, ms = timed(manager.check_all)
+    print(f"CollisionManager.check_all:    {ms:8.2f} ms")
+    (a, b), ms = timed(world.check_all)
+    print(f"ColliderWorld.check_all:       {ms:8.2f} ms")
+
+    expected = set(frozenset(pair) for pair in expected)
+    assert set(frozenset(pair) for pair in pairs) == expected
+    assert set(frozenset((world.names[i], world.names[j])) for i, j in zip(a, b)) == expected
+    print(f"{len(expected)} pares, mismos resultados")
+
+    name = colliders[0].name
+    result, ms = timed(lambda: manager.check_collision(name))
+    print(f"CollisionManager.check_collision: {ms:8.2f} ms")
+    world_result, ms = timed(lambda: world.check_collision(name))
+    print(f"ColliderWorld.check_collision:    {ms:8.2f} ms")
+    assert sorted(result) == sorted(world_result)
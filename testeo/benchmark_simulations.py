@@ -0,0 +1,35 @@
+import argparse
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname((os.path.abspath(__file__)))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname((os.path.abspath(__file__)))), "examples_for_lessons", "cloth"))
+from grafica.fixed_timestep import FixedTimestep
+from grafica.circle_physics import randomCircles
+from examples_for_lessons.particles.particle_utils import ParticleSystem
+
+#------------------------------------------------------------
+# Corre las simulaciones sin ventana, con pasos fijos, lo más
+# rápido posible
+# Uso: python testeo/benchmark_simulations.py --steps 600
+#------------------------------------------------------------
+
+def report(name, steps, seconds):
+    print(f"{name:<12} {steps} pasos: {1000 * seconds / steps:.3f} ms por paso")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulaciones sin ventana")
+    parser.add_argument("--steps", type=int, default=600)
+    parser.add_argument("--dt", type=float, default=1 / 60)
+    args = parser.parse_args()
+
+    particles = ParticleSystem(capacity=100000, gravity=(0.0, -50.0, 0.0))
+    particles.emit(100000, (300.0, 300.0, 0.0), ttl=1e9, spread=20.0)
+    report("partículas", args.steps, FixedTimestep(particles.update, args.dt).runHeadless(args.steps))
+
+    circles = randomCircles(2000, 0.01, seed=0)
+    report("círculos", args.steps, FixedTimestep(circles.step, args.dt).runHeadless(args.steps))
+
+    # La tela importa pyglet.math
+    from cloth_utils import VerletClothGrid
+    cloth = VerletClothGrid(1920, 1080, (360, 1026), 80, 50, 15)
+    report("tela", args.steps, FixedTimestep(cloth.update, args.dt).runHeadless(args.steps))